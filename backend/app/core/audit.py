@@ -0,0 +1,346 @@
+"""转账和工具调用的审计日志
+
+请求处理只做一次非阻塞入队；后台写入线程按提交窗口攒批，整批写入追加式分段文件后只做一次 fsync（组提交）。
+
+查询：python -m app.core.audit var/audit --user 1
+     python -m app.core.audit var/audit --signature mock_tx_0123456789abcdef
+     python -m app.core.audit var/audit --session sess-1 --limit 20
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 索引项：(记录时间, 分段文件路径, 行起始偏移)
+Location = Tuple[float, str, int]
+
+SEGMENT_PATTERN = "audit-*.jsonl"
+
+# 写入失败后重启写入循环前的等待时间（秒）
+RESTART_DELAY_SECONDS = 1.0
+
+
+class AuditLog:
+    """审计日志的后台写入线程
+
+    append 只构造记录并入队，不触碰磁盘；写入线程取到第一条记录后最多再等待 commit_window，
+    把期间到达的记录（不超过 max_batch 条）一次写入并 fsync。提交窗口越长，每批记录越多、fsync 越少，
+    单条记录落盘的延迟也越大。分段文件只追加不修改，超过 segment_bytes 后切换新分段。
+    写入失败（磁盘满、目录被删等）时记录日志、丢弃该批并在新分段上重启写入循环，失败次数见 stats。
+    """
+
+    def __init__(self, directory: str, commit_window_ms: float, max_batch: int,
+                 segment_bytes: int, queue_size: int, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self.commit_window = commit_window_ms / 1000
+        self.max_batch = max_batch
+        self.segment_bytes = segment_bytes
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._segment_written = 0
+        self.stats = {"appended": 0, "dropped": 0, "written": 0, "commits": 0, "segments": 0,
+                      "max_batch": 0, "last_fsync_ms": 0.0, "max_fsync_ms": 0.0,
+                      "failures": 0, "lost": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def append(self, kind: str, user_id: Any, session_id: Optional[str] = None,
+               signature: Optional[str] = None, **data: Any) -> None:
+        """非阻塞提交一条审计记录；队列满时计入 dropped"""
+        if not self.enabled:
+            return
+        record = {"t": round(time.time(), 6), "kind": kind, "user": user_id}
+        if session_id is not None:
+            record["session"] = session_id
+        if signature is not None:
+            record["sig"] = signature
+        record.update(data)
+        try:
+            self._queue.put_nowait(record)
+            self.stats["appended"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def start(self) -> None:
+        if self.running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """写完队列中剩余的记录后退出"""
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        """写入线程入口：写入循环因异常退出时记录日志并重启，收到停止信号后正常退出"""
+        try:
+            while True:
+                try:
+                    self._write_loop()
+                    return
+                except Exception:
+                    self.stats["failures"] += 1
+                    logger.exception("审计日志写入失败，%.0f 秒后重启写入循环", RESTART_DELAY_SECONDS)
+                    self._discard_segment()
+                    time.sleep(RESTART_DELAY_SECONDS)
+        finally:
+            self._discard_segment()
+
+    def _write_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                record = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if record is None:
+                break
+            batch, stopping = self._collect(record)
+            try:
+                self._commit(batch)
+            except Exception:
+                self.stats["lost"] += len(batch)
+                raise
+
+    def _collect(self, first: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+        """从第一条记录起攒批，返回 (批次, 是否收到停止信号)"""
+        batch = [first]
+        deadline = time.monotonic() + self.commit_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                record = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    def _commit(self, batch: List[Dict[str, Any]]) -> None:
+        data = b"".join(
+            (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            for record in batch
+        )
+        if self._file is not None and self._segment_written >= self.segment_bytes:
+            self._close_segment()
+        if self._file is None:
+            self._open_segment()
+        started = time.perf_counter()
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        fsync_ms = round((time.perf_counter() - started) * 1000, 3)
+        self._segment_written += len(data)
+        self.stats["written"] += len(batch)
+        self.stats["commits"] += 1
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        self.stats["last_fsync_ms"] = fsync_ms
+        self.stats["max_fsync_ms"] = max(self.stats["max_fsync_ms"], fsync_ms)
+
+    def _open_segment(self) -> None:
+        name = f"audit-{datetime.utcnow():%Y%m%d-%H%M%S}-{os.getpid()}-{self.stats['segments']}.jsonl"
+        self._file = open(os.path.join(self.directory, name), "ab")
+        self._segment_written = 0
+        self.stats["segments"] += 1
+        # 新分段的目录项也要落盘，否则崩溃后整个文件可能丢失
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _discard_segment(self) -> None:
+        """关闭当前分段并忽略关闭时的错误，之后的写入从新分段开始"""
+        try:
+            self._close_segment()
+        except OSError:
+            self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        commits = self.stats["commits"]
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "avg_batch": round(self.stats["written"] / commits, 1) if commits else 0.0,
+            **self.stats,
+        }
+
+
+class AuditReader:
+    """审计日志的索引读取器
+
+    按用户、交易签名和会话 ID 建立内存索引（只保存记录时间、所在分段和偏移）。每次查询前增量扫描各分段
+    上次读到的位置之后新写入的完整行，末尾未写完的行留到下次；命中后按记录时间排序、按偏移读取记录，
+    最新的在前。多个工作进程各写各的分段，索引顺序不等于时间顺序，所以排序依据是记录里的时间 t。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._offsets: Dict[str, int] = {}
+        self._by_user: Dict[Any, List[Location]] = defaultdict(list)
+        self._by_session: Dict[str, List[Location]] = defaultdict(list)
+        self._by_signature: Dict[str, List[Location]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.stats = {"indexed": 0, "corrupt": 0, "queries": 0}
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, SEGMENT_PATTERN)))
+
+    def refresh(self) -> int:
+        """索引新写入的记录，返回新增条数"""
+        added = 0
+        with self._lock:
+            for path in self._segments():
+                added += self._scan(path)
+        return added
+
+    def _scan(self, path: str) -> int:
+        offset = self._offsets.get(path, 0)
+        try:
+            if os.path.getsize(path) <= offset:
+                return 0
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return 0
+        end = data.rfind(b"\n") + 1
+        added = 0
+        position = 0
+        while position < end:
+            newline = data.index(b"\n", position)
+            try:
+                record = json.loads(data[position:newline])
+            except ValueError:
+                self.stats["corrupt"] += 1
+            else:
+                location = (record.get("t", 0.0), path, offset + position)
+                self._by_user[record.get("user")].append(location)
+                if "session" in record:
+                    self._by_session[record["session"]].append(location)
+                if "sig" in record:
+                    self._by_signature[record["sig"]].append(location)
+                added += 1
+            position = newline + 1
+        self._offsets[path] = offset + end
+        self.stats["indexed"] += added
+        return added
+
+    @staticmethod
+    def _iter_records(locations: List[Location]) -> Iterator[Dict[str, Any]]:
+        """按给定顺序逐条读取记录，调用方取够即可停止"""
+        handles: Dict[str, Any] = {}
+        try:
+            for _, path, offset in locations:
+                f = handles.get(path)
+                if f is None:
+                    f = handles[path] = open(path, "rb")
+                f.seek(offset)
+                yield json.loads(f.readline())
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def query(self, user_id: Any = None, signature: Optional[str] = None,
+              session_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """按条件查询（条件之间为且），最新的在前"""
+        if user_id is None and signature is None and session_id is None:
+            raise ValueError("至少需要一个查询条件：user_id、signature 或 session_id")
+        self.refresh()
+        with self._lock:
+            self.stats["queries"] += 1
+            # 先用最有选择性的索引取候选，其余条件在读出记录后过滤
+            if signature is not None:
+                candidates = list(self._by_signature.get(signature, ()))
+            elif session_id is not None:
+                candidates = list(self._by_session.get(session_id, ()))
+            else:
+                candidates = list(self._by_user.get(user_id, ()))
+
+        # 每个分段内按时间追加，候选是若干有序段拼接，排序接近线性
+        candidates.sort(reverse=True)
+        results = []
+        records = self._iter_records(candidates)
+        for record in records:
+            if user_id is not None and record.get("user") != user_id:
+                continue
+            if session_id is not None and record.get("session") != session_id:
+                continue
+            if signature is not None and record.get("sig") != signature:
+                continue
+            results.append(record)
+            if len(results) >= limit:
+                break
+        records.close()
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "segments": len(self._offsets),
+            "users": len(self._by_user),
+            "sessions": len(self._by_session),
+            "signatures": len(self._by_signature),
+            **self.stats,
+        }
+
+
+audit_log = AuditLog(
+    directory=settings.AUDIT_DIR,
+    commit_window_ms=settings.AUDIT_COMMIT_WINDOW_MS,
+    max_batch=settings.AUDIT_MAX_BATCH,
+    segment_bytes=settings.AUDIT_SEGMENT_BYTES,
+    queue_size=settings.AUDIT_QUEUE_SIZE,
+    enabled=settings.AUDIT_ENABLED,
+)
+
+audit_reader = AuditReader(settings.AUDIT_DIR)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="查询审计日志")
+    parser.add_argument("directory", nargs="?", default=settings.AUDIT_DIR, help="审计日志目录")
+    parser.add_argument("--user", type=int, default=None, help="用户 ID")
+    parser.add_argument("--signature", default=None, help="交易签名")
+    parser.add_argument("--session", default=None, help="会话 ID")
+    parser.add_argument("--limit", type=int, default=100, help="最多返回条数")
+    args = parser.parse_args(argv)
+
+    reader = AuditReader(args.directory)
+    try:
+        records = reader.query(args.user, args.signature, args.session, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False))
+    print(json.dumps(reader.get_stats(), ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from app.core.config import settings
+
+# 落盘前需要清除的请求头和字段
+SCRUB_HEADERS = {"authorization", "cookie", "x-api-key"}
+SCRUB_FIELDS = {"password", "access_token", "refresh_token", "token", "private_key"}
+REDACTED = "[REDACTED]"
+
+
+def _scrub(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SCRUB_FIELDS else _scrub(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub(v) for v in value]
+    return value
+
+
+def _scrub_query(query: str) -> str:
+    """清洗 URL 编码的键值对（查询字符串和表单）"""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(k, REDACTED if k.lower() in SCRUB_FIELDS else v) for k, v in pairs])
+
+
+def _token_claims(authorization: str) -> Optional[Dict[str, Any]]:
+    """从 Bearer 令牌中取出用户声明（不验签，仅用于回放时重新签发令牌）"""
+    try:
+        token = authorization.split(" ", 1)[1]
+        segment = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except (IndexError, ValueError):
+        return None
+    return {k: claims[k] for k in ("sub", "user_id", "role") if k in claims}
+
+
+def _encode_body(body: bytes, content_type: str) -> Tuple[str, Optional[str]]:
+    """清洗请求体，返回 (编码方式, 内容)"""
+    if not body:
+        return "none", None
+    if "application/json" in content_type:
+        try:
+            return "json", json.dumps(_scrub(json.loads(body)), ensure_ascii=False)
+        except ValueError:
+            # 无法解析就无法清洗，只保留长度和摘要，不落盘原文
+            return "redacted", f"{REDACTED} length={len(body)} sha256={hashlib.sha256(body).hexdigest()}"
+    if "application/x-www-form-urlencoded" in content_type:
+        return "form", _scrub_query(body.decode("utf-8", "replace"))
+    return "base64", base64.b64encode(body).decode("ascii")
+
+
+class CaptureWriter:
+    """流量采集的后台写入线程
+
+    请求线程只做一次非阻塞入队，队列满时直接丢弃样本；
+    清洗、序列化、压缩和落盘都在写入线程完成，按大小或时间轮转分段。
+    """
+
+    def __init__(self, directory: str, segment_bytes: int, segment_seconds: float,
+                 max_segments: int, queue_size: int):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_segments = max_segments
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._file: Optional[gzip.GzipFile] = None
+        self._segment_written = 0
+        self._segment_opened_at = 0.0
+        self.stats = {"captured": 0, "dropped": 0, "written": 0, "segments": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, record: Dict[str, Any]) -> None:
+        """非阻塞提交一条采集记录"""
+        try:
+            self._queue.put_nowait(record)
+            self.stats["captured"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def start(self) -> None:
+        if self.running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    record = self._queue.get(timeout=1)
+                except queue.Empty:
+                    self._maybe_rotate()
+                    continue
+                if record is None:
+                    break
+                self._write(record)
+        finally:
+            self._close_segment()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._maybe_rotate()
+        if self._file is None:
+            self._open_segment()
+        line = (json.dumps(self._serialize(record), ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._file.write(line)
+        self._segment_written += len(line)
+        self.stats["written"] += 1
+
+    def _serialize(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {}
+        auth = None
+        for name, value in record["headers"]:
+            name = name.decode("latin-1").lower()
+            value = value.decode("latin-1")
+            if name == "authorization":
+                auth = _token_claims(value)
+            if name in SCRUB_HEADERS:
+                continue
+            headers[name] = value
+        encoding, body = _encode_body(record["body"], headers.get("content-type", ""))
+        return {
+            "t": record["t"],
+            "method": record["method"],
+            "path": record["path"],
+            "query": _scrub_query(record["query"]) if record["query"] else "",
+            "headers": headers,
+            "auth": auth,
+            "body_encoding": encoding,
+            "body": body,
+            "truncated": record["truncated"],
+            "status": record["status"],
+            "latency_ms": record["latency_ms"],
+        }
+
+    def _maybe_rotate(self) -> None:
+        if self._file is None:
+            return
+        if (self._segment_written >= self.segment_bytes
+                or time.monotonic() - self._segment_opened_at >= self.segment_seconds):
+            self._close_segment()
+
+    def _open_segment(self) -> None:
+        name = f"capture-{datetime.utcnow():%Y%m%d-%H%M%S}-{os.getpid()}-{self.stats['segments']}.jsonl.gz"
+        self._file = gzip.open(os.path.join(self.directory, name), "wb", compresslevel=6)
+        self._segment_written = 0
+        self._segment_opened_at = time.monotonic()
+        self.stats["segments"] += 1
+        segments = sorted(glob.glob(os.path.join(self.directory, "capture-*.jsonl.gz")), key=os.path.getmtime)
+        for old in segments[:-self.max_segments]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"running": self.running, "queued": self._queue.qsize(), **self.stats}
+
+
+class TrafficCaptureMiddleware:
+    """按采样率采集指定路径的请求，用于回放复现线上流量"""
+
+    def __init__(self, app, writer: CaptureWriter, sample_rate: float, path_prefixes: List[str],
+                 max_body_bytes: int):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.path_prefixes = tuple(path_prefixes)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http"
+                or not scope["path"].startswith(self.path_prefixes)
+                or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        truncated = False
+        status_code = 0
+
+        async def capture_receive():
+            nonlocal truncated
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                room = self.max_body_bytes - len(body)
+                if len(chunk) > room:
+                    truncated = True
+                body.extend(chunk[:max(room, 0)])
+            return message
+
+        async def capture_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            self.writer.submit({
+                "t": started_at,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": list(scope["headers"]),
+                "body": bytes(body),
+                "truncated": truncated,
+                "status": status_code or 500,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+capture_writer = CaptureWriter(
+    directory=settings.CAPTURE_DIR,
+    segment_bytes=settings.CAPTURE_SEGMENT_BYTES,
+    segment_seconds=settings.CAPTURE_SEGMENT_SECONDS,
+    max_segments=settings.CAPTURE_MAX_SEGMENTS,
+    queue_size=settings.CAPTURE_QUEUE_SIZE,
+)
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Generic, Hashable, Tuple, Type, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 暂不可用（熔断中），{retry_after:.1f} 秒后重试")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """熔断器（closed / open / half_open）
+
+    - closed：统计最近 window 次调用，失败和慢调用占比达到 failure_rate 且样本数不少于 min_calls 时打开
+    - open：直接拒绝，不等待上游超时；reset_timeout 秒后进入 half_open
+    - half_open：放行最多 half_open_calls 次试探调用，全部成功则关闭，任一失败重新打开
+    """
+
+    def __init__(self, name: str, failure_rate: float, slow_call_ms: float, window: int,
+                 min_calls: int, reset_timeout: float, half_open_calls: int):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call_ms / 1000
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        self.stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self._outcomes.clear()
+        self._failures = 0
+        self._trials = 0
+        self._trial_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats["opened"] += 1
+
+    def allow(self) -> bool:
+        """是否放行本次调用；放行后必须调用 record_success 或 record_failure"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.stats["rejected"] += 1
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trials >= self.half_open_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._trials += 1
+        self.stats["calls"] += 1
+        return True
+
+    def check(self) -> None:
+        """不放行时抛出 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self, duration: float) -> None:
+        if duration > self.slow_call:
+            self.stats["slow_calls"] += 1
+            self._record(False)
+        else:
+            self._record(True)
+
+    def record_failure(self) -> None:
+        self.stats["failures"] += 1
+        self._record(False)
+
+    def record_cancelled(self) -> None:
+        """调用被取消，不计入结果，只归还试探名额"""
+        if self.state == HALF_OPEN and self._trials > 0:
+            self._trials -= 1
+
+    def _record(self, ok: bool) -> None:
+        if self.state == HALF_OPEN:
+            if not ok:
+                self._transition(OPEN)
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        if self.state != CLOSED:
+            return
+
+        if len(self._outcomes) == self._outcomes.maxlen and not self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(ok)
+        if not ok:
+            self._failures += 1
+        if len(self._outcomes) >= self.min_calls and self._failures / len(self._outcomes) >= self.failure_rate:
+            self._transition(OPEN)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """经过熔断器执行异步调用"""
+        self.check()
+        started = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            self.record_cancelled()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        window = len(self._outcomes)
+        return {
+            "state": self.state,
+            "failure_ratio": round(self._failures / window, 3) if window else 0.0,
+            "retry_after": round(self.retry_after(), 1),
+            **self.stats,
+        }
+
+
+class LastGoodCache(Generic[T]):
+    """按键保存最近一次成功的结果，上游失败或熔断时返回旧值并标记为过期"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._values: "OrderedDict[Hashable, T]" = OrderedDict()
+        self.stats = {"fresh": 0, "stale": 0}
+
+    async def fetch(self, key: Hashable, func: Callable[[], Awaitable[T]],
+                    fallback_on: Tuple[Type[BaseException], ...]) -> Tuple[T, bool]:
+        """返回 (结果, 是否为旧值)；没有旧值可用时抛出原异常"""
+        try:
+            value = await func()
+        except fallback_on:
+            if key not in self._values:
+                raise
+            self.stats["stale"] += 1
+            return self._values[key], True
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_entries:
+            self._values.popitem(last=False)
+        self.stats["fresh"] += 1
+        return value, False
+
+
+# 各依赖的默认参数，可通过 CIRCUIT_BREAKER_OVERRIDES 覆盖
+DEPENDENCY_DEFAULTS: Dict[str, Dict[str, float]] = {
+    "solana_rpc": {"slow_call_ms": 2000},
+    "llm": {"slow_call_ms": 1500},
+}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取（按需创建）某个外部依赖的熔断器"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        options = {
+            "failure_rate": settings.CIRCUIT_FAILURE_RATE,
+            "slow_call_ms": settings.CIRCUIT_SLOW_CALL_MS,
+            "window": settings.CIRCUIT_WINDOW,
+            "min_calls": settings.CIRCUIT_MIN_CALLS,
+            "reset_timeout": settings.CIRCUIT_RESET_SECONDS,
+            "half_open_calls": settings.CIRCUIT_HALF_OPEN_CALLS,
+            **DEPENDENCY_DEFAULTS.get(name, {}),
+            **settings.CIRCUIT_BREAKER_OVERRIDES.get(name, {}),
+        }
+        options["window"] = int(options["window"])
+        options["min_calls"] = int(options["min_calls"])
+        options["half_open_calls"] = int(options["half_open_calls"])
+        breaker = _breakers[name] = CircuitBreaker(name, **options)
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.get_stats() for name, breaker in _breakers.items()}
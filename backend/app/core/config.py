@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 class Settings(BaseSettings):
@@ -11,6 +11,12 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    
+    # 令牌吊销配置
+    REVOCATION_FILTER_CAPACITY: int = 100000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_ENABLED: bool = False
     
     # API Keys
     OPENAI_API_KEY: str = ""
@@ -19,6 +25,28 @@ class Settings(BaseSettings):
     # Solana 配置
     SOLANA_RPC_URL: str = "https://api.devnet.solana.com"
     SOLANA_PRIVATE_KEY: str = ""
+    SOLANA_COMMITMENT: str = "confirmed"
+    SOLANA_RPC_TIMEOUT_SECONDS: float = 10
+    # 未指定地址时查询的钱包（模拟）
+    MOCK_WALLET_ADDRESS: str = "So11111111111111111111111111111111111111112"
+    
+    # 交易参数预取配置（区块哈希约 60 秒过期）
+    BLOCKHASH_PREFETCH_ENABLED: bool = False
+    # 未开启预取时是否在转账时按需拉取（关闭时转账不发起 RPC 请求，结果标记为 degraded）
+    BLOCKHASH_ON_DEMAND_FETCH: bool = False
+    BLOCKHASH_REFRESH_SECONDS: float = 10
+    BLOCKHASH_MAX_AGE_SECONDS: float = 45
+    PRIORITY_FEE_PERCENTILE: float = 75
+    
+    # 熔断配置（按依赖覆盖：CIRCUIT_BREAKER_OVERRIDES={"solana_rpc": {"slow_call_ms": 1000}}）
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_SLOW_CALL_MS: float = 2000
+    CIRCUIT_WINDOW: int = 20
+    CIRCUIT_MIN_CALLS: int = 10
+    CIRCUIT_RESET_SECONDS: float = 15
+    CIRCUIT_HALF_OPEN_CALLS: int = 3
+    CIRCUIT_BREAKER_OVERRIDES: Dict[str, Dict[str, float]] = {}
+    PRICE_STALE_SECONDS: float = 60
     
     # 应用配置
     DEBUG: bool = True
@@ -34,6 +62,107 @@ class Settings(BaseSettings):
         "http://127.0.0.1:3003",
     ]
     
+    # 事件循环监控配置
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: float = 100
+    LOOP_BLOCK_THRESHOLD_MS: float = 200
+    
+    # 流式音频配置
+    ASR_BACKEND: str = "stub"
+    ASR_STUB_TRANSCRIPT: str = "查询余额"
+    AUDIO_FRAME_MS: int = 20
+    AUDIO_RING_BUFFER_BYTES: int = 64 * 1024
+    VAD_THRESHOLD_DB: float = -45.0
+    VAD_HANGOVER_FRAMES: int = 8
+    
+    # 语音合成缓存配置
+    TTS_SYNTHESIZER: str = "stub"
+    TTS_CACHE_DIR: str = "var/tts_cache"
+    TTS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    TTS_CACHE_MAX_OPEN_MAPS: int = 64
+    TTS_MAX_TEXT_LENGTH: int = 500
+    
+    # 大模型兜底解析配置（OpenAI 兼容接口）
+    LLM_FALLBACK_ENABLED: bool = False
+    LLM_BASE_URL: str = "https://api.openai.com/v1"
+    LLM_MODEL: str = "gpt-4o-mini"
+    LLM_TIMEOUT_MS: float = 1500
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 10
+    LLM_CACHE_SIZE: int = 1024
+    LLM_CACHE_TTL_SECONDS: float = 3600
+    
+    # 用户设置存储配置
+    SETTINGS_STORAGE_DIR: str = "var/user_settings"
+    SETTINGS_FLUSH_INTERVAL_MS: float = 500
+    SETTINGS_RELOAD_INTERVAL_MS: float = 2000
+    PRICE_ALERTS_STORAGE_DIR: str = "var/price_alerts"
+    
+    # 批量意图解析配置（BATCH_WORKERS 为 0 时使用 CPU 核数）
+    BATCH_WORKERS: int = 0
+    BATCH_CHUNK_SIZE: int = 500
+    
+    # 支出统计配置（自定义区间最多覆盖的天数）
+    SPENDING_MAX_RANGE_DAYS: int = 3660
+    
+    # 流量采集配置（用于回放复现性能问题）
+    CAPTURE_ENABLED: bool = False
+    CAPTURE_SAMPLE_RATE: float = 0.1
+    # 相对 /{API_VERSION}/api 的路径前缀
+    CAPTURE_PATH_PREFIXES: List[str] = [
+        "/interpret",
+        "/execute",
+        "/blockchain",
+        "/user",
+    ]
+    CAPTURE_DIR: str = "var/capture"
+    CAPTURE_SEGMENT_BYTES: int = 16 * 1024 * 1024
+    CAPTURE_SEGMENT_SECONDS: float = 3600
+    CAPTURE_MAX_SEGMENTS: int = 48
+    CAPTURE_QUEUE_SIZE: int = 10000
+    CAPTURE_MAX_BODY_BYTES: int = 64 * 1024
+    
+    # 行情配置
+    PRICE_FEED_SIMULATED: bool = True
+    PRICE_FEED_INTERVAL_SECONDS: float = 5
+    PRICE_FEED_VOLATILITY: float = 0.002
+    
+    # 通知推送配置
+    NOTIFY_QUEUE_SIZE: int = 64
+    NOTIFY_HEARTBEAT_SECONDS: float = 15
+    NOTIFY_REPLAY_SIZE: int = 32
+    NOTIFY_MAX_CONNECTIONS: int = 50000
+    NOTIFY_MAX_CONNECTIONS_PER_USER: int = 5
+    # 多个工作进程时通过 Redis 转发事件（未开启时只能单进程运行）
+    NOTIFY_FANOUT_ENABLED: bool = False
+    
+    # 联系人导入导出配置
+    CONTACT_IMPORT_CHUNK_SIZE: int = 500
+    CONTACT_IMPORT_MAX_ROWS: int = 100000
+    CONTACT_IMPORT_MAX_RECORD_BYTES: int = 16 * 1024
+    CONTACT_ADDRESS_CACHE_SIZE: int = 65536
+    
+    # 工具目录配置
+    TOOL_REGISTRY_PATH: str = "var/tool_registry.json"
+    TOOL_REGISTRY_POLL_SECONDS: float = 1.0
+    
+    # 审计日志配置（组提交：每批一次 fsync）
+    AUDIT_ENABLED: bool = True
+    AUDIT_DIR: str = "var/audit"
+    AUDIT_COMMIT_WINDOW_MS: float = 5
+    AUDIT_MAX_BATCH: int = 512
+    AUDIT_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    AUDIT_QUEUE_SIZE: int = 100000
+    
+    # 本地意图分类器配置（低于 INTENT_MIN_CONFIDENCE 走兜底，低于 INTENT_CONFIRM_CONFIDENCE 需要确认，
+    # 规则未命中时分类器置信度不低于 INTENT_CLASSIFIER_ONLY_CONFIDENCE 才单独决定意图）
+    INTENT_CLASSIFIER_ENABLED: bool = True
+    INTENT_TRAINING_DATA: str = "app/data/intent_utterances.jsonl"
+    INTENT_MODEL_PATH: str = "var/intent_model.npz"
+    INTENT_HASH_FEATURES: int = 2 ** 14
+    INTENT_MIN_CONFIDENCE: float = 0.5
+    INTENT_CONFIRM_CONFIDENCE: float = 0.8
+    INTENT_CLASSIFIER_ONLY_CONFIDENCE: float = 0.8
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,138 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """计算已排序序列的百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoopMonitor:
+    """事件循环延迟监控器
+
+    - 协程探针按固定间隔休眠，实际唤醒时间与预期之差即为事件循环延迟
+    - 看门狗线程检查探针心跳，事件循环被阻塞超过阈值时抓取循环线程的调用栈
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = 100,
+        block_threshold_ms: float = 200,
+        window_size: int = 600,
+        max_offenders: int = 50,
+    ):
+        self.interval = interval_ms / 1000
+        self.block_threshold = block_threshold_ms / 1000
+        self.samples: Deque[float] = deque(maxlen=window_size)
+        self.max_lag_ms = 0.0
+        # 以调用栈文本为键聚合阻塞记录，避免同一位置反复阻塞撑爆内存
+        self.offenders: Dict[str, Dict[str, Any]] = {}
+        self.max_offenders = max_offenders
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._probe_task is not None and not self._probe_task.done()
+
+    def start(self) -> None:
+        """在当前事件循环中启动探针和看门狗线程"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """停止监控"""
+        self._stop.set()
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - expected) * 1000)
+            self.samples.append(lag_ms)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        # 同一次阻塞只记录一次调用栈
+        captured_for: Optional[float] = None
+        check_interval = min(self.interval, self.block_threshold) / 2
+        while not self._stop.wait(check_interval):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled >= self.block_threshold and captured_for != heartbeat:
+                captured_for = heartbeat
+                self._capture(stalled * 1000)
+
+    def _capture(self, blocked_ms: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        offender = self.offenders.get(stack)
+        if offender is None:
+            if len(self.offenders) >= self.max_offenders:
+                # 丢弃最早出现的记录
+                self.offenders.pop(next(iter(self.offenders)))
+            offender = {"count": 0, "max_blocked_ms": 0.0, "stack": stack}
+            self.offenders[stack] = offender
+        offender["count"] += 1
+        offender["max_blocked_ms"] = round(max(offender["max_blocked_ms"], blocked_ms), 2)
+        offender["last_seen"] = time.time()
+
+    def lag_summary(self) -> Dict[str, Any]:
+        """事件循环延迟统计（毫秒）"""
+        values = sorted(self.samples)
+        return {
+            "running": self.running,
+            "samples": len(values),
+            "p50_ms": round(_percentile(values, 50), 3),
+            "p95_ms": round(_percentile(values, 95), 3),
+            "p99_ms": round(_percentile(values, 99), 3),
+            "max_ms": round(self.max_lag_ms, 3),
+        }
+
+    def offender_report(self) -> List[Dict[str, Any]]:
+        """阻塞事件循环的调用栈，按最大阻塞时长排序"""
+        return sorted(
+            (dict(o) for o in self.offenders.values()),
+            key=lambda o: o["max_blocked_ms"],
+            reverse=True,
+        )
+
+
+loop_monitor = LoopMonitor(
+    interval_ms=settings.LOOP_MONITOR_INTERVAL_MS,
+    block_threshold_ms=settings.LOOP_BLOCK_THRESHOLD_MS,
+)
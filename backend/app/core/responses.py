@@ -0,0 +1,14 @@
+from fastapi.responses import StreamingResponse
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """边读请求体边输出的流式响应
+
+    StreamingResponse 会并发监听断开事件并消费请求体消息，这里去掉该监听，
+    客户端断开时由读取请求体或发送响应时的异常结束处理。
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 订阅断开后的重连间隔（秒），指数退避到上限
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+
+
+class RevocationFilter:
+    """令牌吊销过滤器：布隆过滤器 + 精确集合
+
+    绝大多数令牌未被吊销，只需检查布隆过滤器的 k 个比特位即可放行；
+    命中布隆过滤器时再查精确集合排除误判。过期的吊销记录会被清理并重建过滤器。
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._hash_range = range(self.num_hashes)
+        # jti -> 过期时间戳
+        self._revoked: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def _seeds(self, jti: str):
+        # jti 为 uuid4 十六进制串，本身即均匀随机，直接拆成两个 64 位种子做双重哈希
+        try:
+            value = int(jti, 16)
+        except ValueError:
+            value = int.from_bytes(hashlib.blake2b(jti.encode(), digest_size=16).digest(), "big")
+        return value & 0xFFFFFFFFFFFFFFFF, (value >> 64) | 1
+
+    def _set_bits(self, jti: str) -> None:
+        h1, h2 = self._seeds(jti)
+        bits, m = self._bits, self.num_bits
+        for i in self._hash_range:
+            pos = (h1 + i * h2) % m
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def add(self, jti: str, expires_at: float) -> None:
+        """记录被吊销的令牌"""
+        if jti in self._revoked:
+            return
+        self._revoked[jti] = expires_at
+        self._set_bits(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        """检查令牌是否已被吊销"""
+        h1, h2 = self._seeds(jti)
+        bits, m = self._bits, self.num_bits
+        for i in self._hash_range:
+            pos = (h1 + i * h2) % m
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return jti in self._revoked
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """清理已过期的吊销记录并重建过滤器，返回清理数量"""
+        now = now or time.time()
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        if not expired:
+            return 0
+        for jti in expired:
+            del self._revoked[jti]
+        self._bits = bytearray(len(self._bits))
+        for jti in self._revoked:
+            self._set_bits(jti)
+        return len(expired)
+
+
+class RevocationRegistry:
+    """吊销记录的进程内过滤器及跨 worker 同步
+
+    启用 Redis 同步时，吊销记录写入有序集合（分数为过期时间）并通过频道广播，
+    各 worker 启动时加载全量记录，运行中订阅增量。订阅断开后按指数退避重连，
+    重连时先订阅再重新加载全量记录，断开期间的吊销不会遗漏。Redis 不可用时退化为进程内吊销。
+    """
+
+    KEY = "auth:revoked_jti"
+    CHANNEL = "auth:revocations"
+
+    def __init__(self, revocation_filter: RevocationFilter, redis_url: str, sync_enabled: bool):
+        self.filter = revocation_filter
+        self.redis_url = redis_url
+        self.sync_enabled = sync_enabled
+        self._redis = None
+        self._tasks = []
+        self.listening = False
+        self.stats = {"syncs": 0, "reconnects": 0, "received": 0}
+
+    def is_revoked(self, jti: str) -> bool:
+        return self.filter.is_revoked(jti)
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """吊销令牌并广播给其他 worker"""
+        self.filter.add(jti, expires_at)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.zadd(self.KEY, {jti: expires_at})
+            await self._redis.publish(self.CHANNEL, f"{jti}:{expires_at}")
+        except Exception as e:
+            logger.warning("吊销记录同步失败: %s", e)
+
+    async def claim(self, jti: str, expires_at: float) -> bool:
+        """原子地占用一次性令牌（刷新令牌轮换），返回是否为第一个使用者
+
+        先在进程内标记，再用 ZADD NX 在 Redis 中占用：其他 worker 已占用时返回 False，
+        避免“先检查再写入”之间同一个刷新令牌被两个 worker 同时接受。
+        """
+        if self.filter.is_revoked(jti):
+            return False
+        self.filter.add(jti, expires_at)
+        if self._redis is None:
+            return True
+        try:
+            added = await self._redis.zadd(self.KEY, {jti: expires_at}, nx=True)
+        except Exception as e:
+            logger.warning("吊销记录同步失败，仅在当前进程占用令牌: %s", e)
+            return True
+        if not added:
+            return False
+        try:
+            await self._redis.publish(self.CHANNEL, f"{jti}:{expires_at}")
+        except Exception as e:
+            logger.warning("吊销记录广播失败: %s", e)
+        return True
+
+    async def start(self, client=None) -> None:
+        """启动清理任务；开启同步时连接 Redis（client 可在测试时传入）并启动订阅任务"""
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._prune_loop()))
+        if not self.sync_enabled:
+            return
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(self.redis_url, decode_responses=True, socket_connect_timeout=2)
+        self._redis = client
+        try:
+            pubsub = await self._subscribe()
+        except Exception as e:
+            logger.warning("无法连接 Redis，重连成功前令牌吊销仅在当前进程生效: %s", e)
+            pubsub = None
+        self._tasks.append(loop.create_task(self._listen(pubsub)))
+
+    async def _subscribe(self):
+        """订阅增量后再加载全量记录，两者之间的吊销不会遗漏"""
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(self.CHANNEL)
+            await self._sync()
+        except Exception:
+            await pubsub.aclose()
+            raise
+        return pubsub
+
+    async def _sync(self) -> None:
+        now = time.time()
+        await self._redis.zremrangebyscore(self.KEY, "-inf", now)
+        for jti, expires_at in await self._redis.zrangebyscore(self.KEY, now, "+inf", withscores=True):
+            self.filter.add(jti, expires_at)
+        self.stats["syncs"] += 1
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks.clear()
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _listen(self, pubsub=None) -> None:
+        """订阅其他 worker 的吊销，连接断开后重连并重新同步"""
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                self.listening = True
+                delay = RECONNECT_DELAY_SECONDS
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    jti, _, expires_at = message["data"].rpartition(":")
+                    try:
+                        self.filter.add(jti, float(expires_at))
+                    except ValueError:
+                        logger.warning("忽略无法解析的吊销消息: %r", message["data"])
+                        continue
+                    self.stats["received"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("吊销订阅断开，%.0f 秒后重连: %s", delay, e)
+            finally:
+                self.listening = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+                    pubsub = None
+            self.stats["reconnects"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(60)
+            self.filter.prune()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "revoked": len(self.filter),
+            "filter_bits": self.filter.num_bits,
+            "filter_hashes": self.filter.num_hashes,
+            "synced": self.listening,
+            **self.stats,
+        }
+
+
+revocation_registry = RevocationRegistry(
+    RevocationFilter(settings.REVOCATION_FILTER_CAPACITY, settings.REVOCATION_FILTER_ERROR_RATE),
+    redis_url=settings.REDIS_URL,
+    sync_enabled=settings.REVOCATION_SYNC_ENABLED,
+)
@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta
 from typing import Optional, Any
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.revocation import revocation_registry
 
 # 密码哈希上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -16,33 +18,62 @@ def get_password_hash(password: str) -> str:
     """生成密码哈希"""
     return pwd_context.hash(password)
 
+def _encode_token(data: dict, token_type: str, expire: datetime) -> str:
+    to_encode = data.copy()
+    to_encode.update({"exp": expire, "type": token_type, "jti": uuid.uuid4().hex})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
-    to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return _encode_token(data, "access", expire)
 
-def verify_token(token: str) -> dict:
-    """验证访问令牌"""
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """创建刷新令牌"""
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    
+    return _encode_token(data, "refresh", expire)
+
+def verify_token(token: str, token_type: str = "access") -> dict:
+    """验证令牌（类型匹配且未被吊销）"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return payload
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise credentials_exception
+    
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    # 旧版本签发的访问令牌没有 type 字段
+    if payload.get("type", "access") != token_type:
+        raise credentials_exception
+    jti = payload.get("jti")
+    if jti is not None and revocation_registry.is_revoked(jti):
+        raise credentials_exception
+    return payload
+
+async def revoke_token(payload: dict) -> None:
+    """吊销已验证的令牌"""
+    jti = payload.get("jti")
+    if jti is None:
+        return
+    await revocation_registry.revoke(jti, float(payload["exp"]))
+
+async def claim_token(payload: dict) -> bool:
+    """占用一次性令牌，已被使用（包括其他 worker 并发使用）时返回 False"""
+    jti = payload.get("jti")
+    if jti is None:
+        return False
+    return await revocation_registry.claim(jti, float(payload["exp"]))
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from app.schemas.schemas import Token, UserCreate, UserResponse
-from app.core.security import verify_password, get_password_hash, create_access_token
+from typing import Optional
+from app.schemas.schemas import Token, RefreshRequest, UserCreate, UserResponse
+from app.core.security import (
+    verify_password, get_password_hash, create_access_token, create_refresh_token,
+    verify_token, revoke_token, claim_token
+)
 from app.core.config import settings
+from app.services.notifications import notification_hub
 
 router = APIRouter()
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # 模拟用户数据库
 fake_users_db = {
@@ -49,25 +55,18 @@ def authenticate_user(username: str, password: str):
         return False
     return user
 
-@router.post("/token", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    """用户登录"""
-    user = authenticate_user(form_data.username, form_data.password)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户名或密码错误",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+def issue_tokens(user: dict) -> dict:
+    """签发访问令牌和刷新令牌"""
+    claims = {"sub": user["username"], "user_id": user["id"], "role": user["role"]}
     access_token = create_access_token(
-        data={"sub": user["username"], "user_id": user["id"], "role": user["role"]},
-        expires_delta=access_token_expires
+        data=claims,
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+    refresh_token = create_refresh_token(data=claims)
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         "user_id": user["id"],
@@ -75,31 +74,72 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         "role": user["role"]
     }
 
-@router.post("/refresh")
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """刷新令牌"""
-    from app.core.security import verify_token
+@router.post("/token", response_model=Token)
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """用户登录"""
+    client_ip = request.client.host if request.client else None
+    user = authenticate_user(form_data.username, form_data.password)
+    if not user:
+        known_user = fake_users_db.get(form_data.username)
+        if known_user:
+            notification_hub.publish(known_user["id"], "security", {"type": "login_failed", "ip": client_ip})
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户名或密码错误",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    notification_hub.publish(user["id"], "security", {"type": "login", "ip": client_ip})
+    return issue_tokens(user)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(
+    request: Optional[RefreshRequest] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """刷新令牌（刷新令牌一次性使用，每次刷新都会轮换）"""
+    token = request.refresh_token if request and request.refresh_token else None
+    if token is None and credentials is not None:
+        token = credentials.credentials
+    if token is None:
+        raise HTTPException(status_code=401, detail="缺少刷新令牌")
     
     try:
-        payload = verify_token(credentials.credentials)
-        username = payload.get("sub")
-        user = fake_users_db.get(username)
-        
-        if not user:
-            raise HTTPException(status_code=401, detail="用户不存在")
-        
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user["username"], "user_id": user["id"], "role": user["role"]},
-            expires_delta=access_token_expires
-        )
-        
-        return {
-            "access_token": access_token,
-            "token_type": "bearer"
-        }
-    except Exception as e:
+        payload = verify_token(token, token_type="refresh")
+    except HTTPException:
         raise HTTPException(status_code=401, detail="无效的令牌")
+    
+    user = fake_users_db.get(payload.get("sub"))
+    if not user or not user["is_active"]:
+        raise HTTPException(status_code=401, detail="用户不存在")
+    
+    # 轮换：先原子地占用旧的刷新令牌，并发重复使用时只有一个请求能换到新令牌
+    if not await claim_token(payload):
+        raise HTTPException(status_code=401, detail="刷新令牌已被使用")
+    
+    return issue_tokens(user)
+
+@router.post("/logout")
+async def logout(
+    request: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """退出登录，吊销访问令牌和刷新令牌"""
+    payload = verify_token(credentials.credentials)
+    await revoke_token(payload)
+    
+    if request and request.refresh_token:
+        try:
+            await revoke_token(verify_token(request.refresh_token, token_type="refresh"))
+        except HTTPException:
+            pass
+    
+    notification_hub.publish(payload.get("user_id"), "security", {"type": "logout"})
+    
+    return {
+        "success": True,
+        "message": "已退出登录"
+    }
 
 @router.post("/register", response_model=UserResponse)
 async def register(user: UserCreate):
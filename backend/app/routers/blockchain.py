@@ -1,8 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.schemas.schemas import TransferRequest, BalanceResponse, TransactionResponse
+from app.schemas.schemas import TransferRequest, BalanceResponse, PortfolioResponse, TransactionResponse
+from app.core.config import settings
 from app.core.security import verify_token
-from typing import List
+from app.core.audit import audit_log
+from app.services.spending import spending_aggregates, check_range, resolve_period, PERIODS
+from app.services.prices import price_cache
+from app.services.notifications import notification_hub
+from app.services.portfolio import fetch_portfolio
+from app.services.solana_rpc import RPCError
+from app.services.tx_prefetch import blockhash_prefetcher
+from typing import List, Optional
+from datetime import date
 import uuid
 
 router = APIRouter()
@@ -20,29 +29,37 @@ async def get_balance(
 ):
     """获取钱包余额"""
     try:
-        # 模拟钱包地址
-        mock_address = "So11111111111111111111111111111111111111112"
-        
         # 模拟余额数据
         if currency.upper() == "SOL":
             balance = 42.5
-            usd_value = balance * 20.5  # 假设 SOL 价格为 $20.5
         elif currency.upper() == "USDC":
             balance = 150.0
-            usd_value = balance * 1.0  # USDC 价格为 $1
         else:
             raise HTTPException(status_code=400, detail="不支持的货币类型")
+        usd_value = balance * price_cache.get(currency)
         
         return BalanceResponse(
-            address=mock_address,
+            address=settings.MOCK_WALLET_ADDRESS,
             balance=balance,
             currency=currency.upper(),
-            usd_value=usd_value
+            usd_value=usd_value,
+            stale=price_cache.is_stale(currency, settings.PRICE_STALE_SECONDS)
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取余额失败: {str(e)}")
 
+@router.get("/portfolio", response_model=PortfolioResponse)
+async def get_portfolio(
+    address: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """获取钱包全部资产（SOL 和 SPL 代币，一次批量 RPC 请求）"""
+    try:
+        return await fetch_portfolio(address or settings.MOCK_WALLET_ADDRESS)
+    except RPCError as e:
+        raise HTTPException(status_code=502, detail=f"获取资产失败: {str(e)}")
+
 @router.post("/transfer")
 async def transfer_tokens(
     request: TransferRequest,
@@ -59,25 +76,47 @@ async def transfer_tokens(
         if request.amount > 1000:
             raise HTTPException(status_code=400, detail="转账金额过大")
         
+        # 签名所需的区块哈希和手续费取自后台预取，不再逐笔请求 RPC
+        context = await blockhash_prefetcher.acquire()
+        
         # 模拟交易签名
         transaction_signature = f"mock_tx_{uuid.uuid4().hex[:16]}"
         
+        spending_aggregates.record(
+            current_user.get("user_id"), request.recipient, request.currency, request.amount
+        )
+        
+        transaction = {
+            "signature": transaction_signature,
+            "status": "confirmed",
+            "amount": request.amount,
+            "currency": request.currency,
+            "recipient": request.recipient,
+            "memo": request.memo,
+            "timestamp": "2025-06-16T14:30:00Z"
+        }
+        if context is not None:
+            transaction.update(context.to_dict())
+        else:
+            # 未取得区块哈希，交易未按真实链上参数签名
+            transaction["degraded"] = True
+        notification_hub.publish(current_user.get("user_id"), "transaction", transaction)
+        audit_log.append(
+            "transfer", current_user.get("user_id"), signature=transaction_signature,
+            amount=request.amount, currency=request.currency, recipient=request.recipient,
+            blockhash=context.blockhash if context is not None else None
+        )
+        
         return {
             "success": True,
             "message": f"成功向 {request.recipient} 转账 {request.amount} {request.currency}",
-            "transaction": {
-                "signature": transaction_signature,
-                "status": "confirmed",
-                "amount": request.amount,
-                "currency": request.currency,
-                "recipient": request.recipient,
-                "memo": request.memo,
-                "timestamp": "2025-06-16T14:30:00Z"
-            }
+            "transaction": transaction
         }
         
     except HTTPException:
         raise
+    except RPCError as e:
+        raise HTTPException(status_code=502, detail=f"转账失败: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"转账失败: {str(e)}")
 
@@ -129,11 +168,38 @@ async def get_transactions(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取交易历史失败: {str(e)}")
 
+@router.get("/spending/summary")
+async def get_spending_summary(
+    period: str = "this_month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    counterparty: Optional[str] = None,
+    currency: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """获取支出统计（指定 start/end 时忽略 period，区间为 [start, end)）"""
+    if start or end:
+        if not (start and end):
+            raise HTTPException(status_code=400, detail="start 和 end 必须同时指定")
+        try:
+            check_range(start, end, settings.SPENDING_MAX_RANGE_DAYS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        try:
+            start, end = resolve_period(period)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"period 必须是 {', '.join(PERIODS)} 之一")
+    
+    return spending_aggregates.summarize(
+        current_user.get("user_id"), start, end, counterparty=counterparty, currency=currency
+    )
+
 @router.get("/address")
 async def get_wallet_address(current_user: dict = Depends(get_current_user)):
     """获取钱包地址"""
     return {
-        "address": "So11111111111111111111111111111111111111112",
+        "address": settings.MOCK_WALLET_ADDRESS,
         "network": "devnet",
         "user_id": current_user.get("user_id")
     }
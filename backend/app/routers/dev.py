@@ -0,0 +1,93 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.security import verify_token
+from app.schemas.schemas import ToolDefinition, ToolUpdate
+from app.services.tool_registry import tool_registry, RegistrySnapshot
+from typing import Dict, Any, Optional
+
+router = APIRouter()
+security = HTTPBearer()
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """获取当前用户"""
+    payload = verify_token(credentials.credentials)
+    return payload
+
+def require_developer(current_user: dict = Depends(get_current_user)):
+    """仅开发者和管理员可以管理工具"""
+    if current_user.get("role") not in ("developer", "admin"):
+        raise HTTPException(status_code=403, detail="需要开发者权限")
+    return current_user
+
+def check_parameters(parameters: Optional[Dict[str, Any]]) -> None:
+    if parameters is not None and parameters.get("type") != "object":
+        raise HTTPException(status_code=400, detail="parameters 必须是 type 为 object 的 JSON Schema")
+
+async def apply_change(change) -> RegistrySnapshot:
+    """执行目录变更，将错误转换为 HTTP 响应"""
+    try:
+        return await change
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/tools")
+async def list_dev_tools(current_user: dict = Depends(require_developer)):
+    """获取工具目录（含内置标记和目录版本）"""
+    snapshot = tool_registry.snapshot
+    return {
+        "tools": [{**tool, "builtin": tool_registry.is_builtin(tool["id"])} for tool in snapshot.tools],
+        "total": len(snapshot.tools),
+        "version": snapshot.version
+    }
+
+@router.post("/tools")
+async def create_tool(
+    tool: ToolDefinition,
+    current_user: dict = Depends(require_developer)
+):
+    """创建工具"""
+    check_parameters(tool.parameters)
+    snapshot = await apply_change(tool_registry.create(tool.model_dump()))
+
+    return {
+        "success": True,
+        "message": "工具创建成功",
+        "tool": snapshot.get(tool.id),
+        "version": snapshot.version
+    }
+
+@router.put("/tools/{tool_id}")
+async def update_tool(
+    tool_id: str,
+    tool: ToolUpdate,
+    current_user: dict = Depends(require_developer)
+):
+    """更新工具"""
+    check_parameters(tool.parameters)
+    changes = tool.model_dump(exclude_unset=True, exclude_none=True)
+    snapshot = await apply_change(tool_registry.update(tool_id, changes))
+
+    return {
+        "success": True,
+        "message": "工具更新成功",
+        "tool": snapshot.get(tool_id),
+        "version": snapshot.version
+    }
+
+@router.delete("/tools/{tool_id}")
+async def delete_tool(
+    tool_id: str,
+    current_user: dict = Depends(require_developer)
+):
+    """删除工具"""
+    snapshot = await apply_change(tool_registry.delete(tool_id))
+
+    return {
+        "success": True,
+        "message": "工具删除成功",
+        "version": snapshot.version
+    }
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.security import verify_token
+from app.services.notifications import notification_hub, CATEGORIES
+from typing import Optional
+
+router = APIRouter()
+optional_security = HTTPBearer(auto_error=False)
+
+def get_current_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """获取当前用户（浏览器 EventSource 无法设置请求头，也接受 ?token= 参数）"""
+    if credentials is not None:
+        token = credentials.credentials
+    if token is None:
+        raise HTTPException(status_code=401, detail="未提供认证令牌")
+    payload = verify_token(token)
+    return payload
+
+@router.get("/stream")
+async def notification_stream(
+    topics: Optional[str] = None,
+    last_event_id: Optional[int] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """订阅通知（Server-Sent Events）
+
+    事件类别：transaction、security、price_alert，可用 topics=transaction,security 过滤。
+    断线重连时浏览器会带上 Last-Event-ID，服务端补发之后的事件；
+    连接过慢导致事件被丢弃时会先收到 dropped 事件，客户端应重新拉取交易列表。
+    """
+    requested = None
+    if topics:
+        requested = {topic.strip() for topic in topics.split(",") if topic.strip()}
+        unknown = requested - CATEGORIES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的通知类别: {', '.join(sorted(unknown))}")
+
+    if not notification_hub.admit():
+        raise HTTPException(status_code=503, detail="推送连接数已达上限，请稍后重试")
+
+    return StreamingResponse(
+        notification_hub.stream(current_user.get("user_id"), topics=requested, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def notification_stats(current_user: dict = Depends(get_current_user)):
+    """获取推送连接统计（管理员）"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="需要管理员权限")
+    return notification_hub.get_stats()
@@ -1,7 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import ValidationError
+from app.core.config import settings
 from app.core.security import verify_token
-from typing import Dict, Any
+from app.core.audit import audit_reader
+from app.core.responses import DuplexStreamingResponse
+from app.services.settings_store import settings_store
+from app.services.alerts import alert_engine, load_user_alerts, save_user_alerts
+from app.services.prices import price_cache
+from app.services.contacts import (
+    address_error, validate_contact, aiter_csv_records, aiter_jsonl_records,
+    import_records, export_contacts
+)
+from app.services.batch import aiter_lines
+from app.schemas.schemas import PriceAlertCreate, VoiceSettings
+from typing import Dict, Any, List, Optional
+import asyncio
+import itertools
+import json
 
 router = APIRouter()
 security = HTTPBearer()
@@ -11,6 +28,18 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     payload = verify_token(credentials.credentials)
     return payload
 
+def check_voice_settings(patch: Dict[str, Any]) -> None:
+    """校验设置补丁中的语音参数范围（null 表示删除，不校验）"""
+    voice = patch.get("voice_settings")
+    if voice is None:
+        return
+    if not isinstance(voice, dict):
+        raise HTTPException(status_code=400, detail="voice_settings 必须是对象")
+    try:
+        VoiceSettings.model_validate({k: v for k, v in voice.items() if v is not None})
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="语音设置超出允许范围")
+
 # 模拟联系人数据
 MOCK_CONTACTS = [
     {
@@ -33,21 +62,13 @@ MOCK_CONTACTS = [
     }
 ]
 
-# 模拟用户设置
-MOCK_SETTINGS = {
-    "theme": "dark",
-    "language": "zh-CN",
-    "voice_settings": {
-        "rate": 1.0,
-        "pitch": 1.0,
-        "volume": 1.0
-    },
-    "notifications": {
-        "transaction_notifications": True,
-        "price_alerts": True,
-        "security_alerts": True
-    }
-}
+_contact_ids = itertools.count(len(MOCK_CONTACTS) + 1)
+
+def insert_contacts(contacts: List[Dict[str, str]]) -> None:
+    """分配 ID 并写入联系人"""
+    # 在实际应用中，这里会批量写入数据库
+    for contact in contacts:
+        MOCK_CONTACTS.append({"id": str(next(_contact_ids)), **contact})
 
 @router.get("/profile")
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
@@ -72,7 +93,7 @@ async def get_user_config(current_user: dict = Depends(get_current_user)):
     """获取用户配置"""
     return {
         "contacts": MOCK_CONTACTS,
-        "settings": MOCK_SETTINGS
+        "settings": settings_store.get(current_user.get("user_id"))
     }
 
 @router.put("/config")
@@ -81,12 +102,18 @@ async def update_user_config(
     current_user: dict = Depends(get_current_user)
 ):
     """更新用户配置"""
-    # 在实际应用中，这里会保存到数据库
-    # 现在我们只是模拟更新成功
+    user_settings = config.get("settings")
+    if user_settings is not None and not isinstance(user_settings, dict):
+        raise HTTPException(status_code=400, detail="settings 必须是对象")
+    
+    if user_settings:
+        check_voice_settings(user_settings)
+        settings_store.update(current_user.get("user_id"), user_settings)
     
     return {
         "success": True,
         "message": "配置更新成功",
+        "settings": settings_store.get(current_user.get("user_id")),
         "updated_at": "2025-06-16T14:30:00Z"
     }
 
@@ -104,20 +131,16 @@ async def add_contact(
     current_user: dict = Depends(get_current_user)
 ):
     """添加联系人"""
-    required_fields = ["name", "address"]
-    for field in required_fields:
-        if field not in contact:
-            raise HTTPException(status_code=400, detail=f"缺少必需字段: {field}")
-    
-    new_contact = {
-        "id": str(len(MOCK_CONTACTS) + 1),
-        "name": contact["name"],
-        "address": contact["address"],
-        "note": contact.get("note", "")
-    }
+    error = validate_contact(contact) or address_error(contact["address"].strip())
+    if error:
+        raise HTTPException(status_code=400, detail=error)
     
-    # 在实际应用中，这里会保存到数据库
-    MOCK_CONTACTS.append(new_contact)
+    insert_contacts([{
+        "name": contact["name"].strip(),
+        "address": contact["address"].strip(),
+        "note": contact.get("note", "")
+    }])
+    new_contact = MOCK_CONTACTS[-1]
     
     return {
         "success": True,
@@ -125,6 +148,51 @@ async def add_contact(
         "contact": new_contact
     }
 
+@router.post("/contacts/import")
+async def import_contacts(
+    request: Request,
+    format: str = "csv",
+    current_user: dict = Depends(get_current_user)
+):
+    """批量导入联系人
+
+    请求体为 CSV（表头 name,address,note）或 JSONL 流，边读边解析，按块校验地址并写入；
+    响应为 JSONL 流，逐行返回失败的行号和原因，最后一行为导入汇总。
+    """
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format 必须是 csv 或 jsonl")
+    
+    max_bytes = settings.CONTACT_IMPORT_MAX_RECORD_BYTES
+    lines = aiter_lines(request.stream(), max_line_bytes=max_bytes)
+    records = aiter_csv_records(lines, max_bytes) if format == "csv" else aiter_jsonl_records(lines)
+    known_addresses = {c["address"] for c in MOCK_CONTACTS}
+    
+    async def report():
+        async for item in import_records(
+            records, known_addresses, insert_contacts,
+            chunk_size=settings.CONTACT_IMPORT_CHUNK_SIZE,
+            max_rows=settings.CONTACT_IMPORT_MAX_ROWS
+        ):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+    
+    return DuplexStreamingResponse(report(), media_type="application/x-ndjson")
+
+@router.get("/contacts/export")
+async def export_contacts_file(
+    format: str = "csv",
+    current_user: dict = Depends(get_current_user)
+):
+    """导出联系人（CSV 或 JSONL，分块输出）"""
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format 必须是 csv 或 jsonl")
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_contacts(list(MOCK_CONTACTS), format, chunk_size=settings.CONTACT_IMPORT_CHUNK_SIZE),
+        media_type=f"{media_type}; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename=contacts.{format}"}
+    )
+
 @router.put("/contacts/{contact_id}")
 async def update_contact(
     contact_id: str,
@@ -137,11 +205,17 @@ async def update_contact(
     if not existing_contact:
         raise HTTPException(status_code=404, detail="联系人不存在")
     
-    # 更新联系人信息
+    error = validate_contact({**existing_contact, **contact})
+    if error is None and "address" in contact:
+        error = address_error(contact["address"].strip())
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    # 更新联系人信息（与新增时一样去掉首尾空白）
     if "name" in contact:
-        existing_contact["name"] = contact["name"]
+        existing_contact["name"] = contact["name"].strip()
     if "address" in contact:
-        existing_contact["address"] = contact["address"]
+        existing_contact["address"] = contact["address"].strip()
     if "note" in contact:
         existing_contact["note"] = contact["note"]
     
@@ -174,22 +248,93 @@ async def delete_contact(
 @router.get("/settings")
 async def get_user_settings(current_user: dict = Depends(get_current_user)):
     """获取用户设置"""
-    return MOCK_SETTINGS
+    return settings_store.get(current_user.get("user_id"))
 
 @router.put("/settings")
 async def update_user_settings(
     settings: Dict[str, Any],
     current_user: dict = Depends(get_current_user)
 ):
-    """更新用户设置"""
-    # 在实际应用中，这里会保存到数据库
-    # 现在我们只是模拟更新成功
-    
-    # 合并设置
-    MOCK_SETTINGS.update(settings)
+    """更新用户设置（JSON Merge Patch：只更新提交的字段，值为 null 表示删除）"""
+    check_voice_settings(settings)
+    updated = settings_store.update(current_user.get("user_id"), settings)
     
     return {
         "success": True,
         "message": "设置更新成功",
-        "settings": MOCK_SETTINGS
+        "settings": updated
+    }
+
+@router.get("/settings/price-alerts")
+async def get_price_alerts(current_user: dict = Depends(get_current_user)):
+    """获取价格提醒及最近触发记录"""
+    user_id = current_user.get("user_id")
+    alerts = load_user_alerts(user_id)
+    
+    return {
+        "enabled": settings_store.get(user_id).get("notifications", {}).get("price_alerts", False),
+        "alerts": alerts,
+        "total": len(alerts),
+        "recent_triggers": alert_engine.recent_triggers(user_id)
+    }
+
+@router.post("/settings/price-alerts")
+async def add_price_alert(
+    alert: PriceAlertCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """添加价格提醒（价格穿越阈值时触发一次）"""
+    if price_cache.get(alert.currency) is None:
+        raise HTTPException(status_code=400, detail="不支持的货币类型")
+    
+    user_id = current_user.get("user_id")
+    if len(load_user_alerts(user_id)) >= 100:
+        raise HTTPException(status_code=400, detail="价格提醒数量已达上限")
+    
+    new_alert = alert_engine.add_alert(user_id, alert.currency, alert.direction, alert.threshold)
+    save_user_alerts(user_id, added=[new_alert])
+    
+    return {
+        "success": True,
+        "message": "价格提醒添加成功",
+        "alert": new_alert,
+        "current_price": price_cache.get(alert.currency)
+    }
+
+@router.delete("/settings/price-alerts/{alert_id}")
+async def delete_price_alert(
+    alert_id: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """删除价格提醒"""
+    user_id = current_user.get("user_id")
+    # 提醒可能由其他工作进程创建，本进程引擎中没有时以存储为准
+    removed = alert_engine.remove_alert(alert_id, user_id=user_id)
+    if not removed and all(alert["id"] != alert_id for alert in load_user_alerts(user_id)):
+        raise HTTPException(status_code=404, detail="价格提醒不存在")
+    save_user_alerts(user_id, removed=[alert_id])
+    
+    return {
+        "success": True,
+        "message": "价格提醒删除成功"
+    }
+
+@router.get("/audit")
+async def get_audit_records(
+    signature: Optional[str] = None,
+    session_id: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """查询本人的转账和工具调用审计记录（可按交易签名或会话 ID 过滤），最新的在前"""
+    if limit <= 0 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit 必须在 1 到 500 之间")
+    
+    records = await asyncio.to_thread(
+        audit_reader.query, current_user.get("user_id"), signature, session_id, limit
+    )
+    
+    return {
+        "records": records,
+        "total": len(records)
     }
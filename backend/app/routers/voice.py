@@ -1,10 +1,33 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.schemas.schemas import VoiceInterpretRequest, VoiceInterpretResponse, ToolExecuteRequest, ToolExecuteResponse
+from pydantic import ValidationError
+from app.schemas.schemas import (
+    VoiceInterpretRequest, VoiceInterpretResponse, VoiceStreamResponse, TTSRequest,
+    ToolExecuteRequest, ToolExecuteResponse, VoiceSettings
+)
+from app.core.config import settings
 from app.core.security import verify_token
+from app.core.audit import audit_log
+from app.core.responses import DuplexStreamingResponse
+from app.services.audio import AudioStream
+from app.services.tts import tts_cache
+from app.services.llm import llm_interpreter
+from app.services.settings_store import settings_store, DEFAULT_SETTINGS
+from app.services.spending import spending_aggregates, resolve_period
+from app.services.prices import price_cache
+from app.services.notifications import notification_hub
+from app.services.portfolio import fetch_portfolio
+from app.services.solana_rpc import RPCError
+from app.services.tx_prefetch import blockhash_prefetcher
+from app.services.batch import BatchSummary, aiter_lines, get_executor, interpret_stream
+from app.services.tool_registry import tool_registry
+from app.services.intent_classifier import intent_classifier
+from app.services.intents import apply_confidence, parse_voice_intent
+import mmap
+import json
 import uuid
-import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 router = APIRouter()
 security = HTTPBearer()
@@ -14,89 +37,53 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     payload = verify_token(credentials.credentials)
     return payload
 
-def parse_voice_intent(query: str) -> Dict[str, Any]:
-    """解析语音意图"""
-    query = query.lower().strip()
-    
-    # 转账意图
-    transfer_patterns = [
-        r'(?:转账|发送|转给|给)\s*([a-zA-Z0-9\u4e00-\u9fa5]{2,20})\s*(\d+(?:\.\d+)?)\s*(?:个)?(?:sol|usdc)?',
-        r'向\s*([a-zA-Z0-9\u4e00-\u9fa5]{2,20})\s*转账\s*(\d+(?:\.\d+)?)\s*(?:个)?(?:sol|usdc)?'
-    ]
-    
-    for pattern in transfer_patterns:
-        match = re.search(pattern, query)
-        if match:
-            recipient = match.group(1)
-            amount = float(match.group(2))
-            currency = "SOL"  # 默认为 SOL
-            
-            if "usdc" in query:
-                currency = "USDC"
-            
-            return {
-                "intent": "transfer",
-                "requires_confirmation": True,
-                "tool_calls": [{
-                    "id": "transfer_sol",
-                    "function": {
-                        "name": "transfer_sol",
-                        "arguments": {
-                            "recipient": recipient,
-                            "amount": amount,
-                            "currency": currency
-                        }
-                    }
-                }],
-                "confirmation_message": f"您要向 {recipient} 转账 {amount} {currency}，是否确认？"
-            }
+# 统计区间 -> 播报用的说法
+SPENDING_LABELS = {
+    "today": "今天",
+    "last_7_days": "最近7天",
+    "last_30_days": "最近30天",
+    "this_month": "本月",
+    "last_month": "上个月",
+    "this_year": "今年",
+}
+
+async def interpret_query(query: str) -> Dict[str, Any]:
+    """分层意图解析：先走规则和本地分类器，规则未命中或置信度过低时再走大模型兜底"""
+    prediction = intent_classifier.classify(query) if settings.INTENT_CLASSIFIER_ENABLED else None
+    intent_data = apply_confidence(query, parse_voice_intent(query), prediction)
     
-    # 余额查询意图
-    if any(word in query for word in ["余额", "账户", "钱包", "balance"]):
-        currency = "SOL"
-        if "usdc" in query:
-            currency = "USDC"
-        
-        return {
-            "intent": "query_balance",
-            "requires_confirmation": False,
-            "tool_calls": [{
-                "id": "query_balance",
-                "function": {
-                    "name": "query_balance",
-                    "arguments": {
-                        "currency": currency
-                    }
-                }
-            }],
-            "confirmation_message": f"您要查询 {currency} 余额，是否确认？"
-        }
+    # 追问的意图也交给大模型兜底，它可能从规则提取不了的说法（如中文数字金额）中拿到参数
+    needs_fallback = intent_data["intent"] in ("direct_response", "clarify") or intent_data.get("low_confidence")
+    if needs_fallback and llm_interpreter.enabled:
+        snapshot = tool_registry.snapshot
+        llm_data = await llm_interpreter.interpret(query, snapshot.tools, catalog_version=snapshot.version)
+        if llm_data is not None:
+            return llm_data
     
-    # 交易记录查询
-    if any(word in query for word in ["交易记录", "历史记录", "交易历史"]):
-        return {
-            "intent": "query_transactions",
-            "requires_confirmation": False,
-            "tool_calls": [{
-                "id": "query_transactions",
-                "function": {
-                    "name": "query_transactions",
-                    "arguments": {
-                        "limit": 10,
-                        "offset": 0
-                    }
-                }
-            }],
-            "confirmation_message": "您要查看交易记录，是否确认？"
-        }
+    return intent_data
+
+async def build_interpret_response(query: str, session_id: Optional[str] = None) -> VoiceInterpretResponse:
+    """解析意图并构造响应"""
+    intent_data = await interpret_query(query)
     
-    # 默认为直接响应
-    return {
-        "intent": "direct_response",
-        "requires_confirmation": False,
-        "message": "您好！我是您的语音助手，有什么可以帮助您的吗？",
-        "tool_calls": None
-    }
+    return VoiceInterpretResponse(
+        intent=intent_data["intent"],
+        requires_confirmation=intent_data["requires_confirmation"],
+        confirmation_message=intent_data.get("confirmation_message"),
+        message=intent_data.get("message"),
+        tool_calls=intent_data.get("tool_calls"),
+        session_id=session_id or str(uuid.uuid4()),
+        confidence=intent_data.get("confidence")
+    )
+
+async def finish_audio_stream(stream: AudioStream, session_id: Optional[str]) -> VoiceStreamResponse:
+    """结束音频流，将识别结果送入意图解析"""
+    transcript = stream.finish()
+    return VoiceStreamResponse(
+        transcript=transcript,
+        audio=stream.stats(),
+        result=await build_interpret_response(transcript, session_id) if transcript else None
+    )
 
 @router.post("/interpret", response_model=VoiceInterpretResponse)
 async def interpret_voice(
@@ -105,22 +92,7 @@ async def interpret_voice(
 ):
     """语音意图解析"""
     try:
-        # 生成会话 ID
-        session_id = request.session_id or str(uuid.uuid4())
-        
-        # 解析意图
-        intent_data = parse_voice_intent(request.query)
-        
-        response = VoiceInterpretResponse(
-            intent=intent_data["intent"],
-            requires_confirmation=intent_data["requires_confirmation"],
-            confirmation_message=intent_data.get("confirmation_message"),
-            tool_calls=intent_data.get("tool_calls"),
-            session_id=session_id,
-            confidence=0.95
-        )
-        
-        return response
+        return await build_interpret_response(request.query, request.session_id)
         
     except Exception as e:
         raise HTTPException(
@@ -128,6 +100,164 @@ async def interpret_voice(
             detail=f"意图解析失败: {str(e)}"
         )
 
+@router.post("/interpret/batch")
+async def interpret_batch(
+    request: Request,
+    chunk_size: int = settings.BATCH_CHUNK_SIZE,
+    current_user: dict = Depends(get_current_user)
+):
+    """批量意图解析（管理员）
+
+    请求体为 JSONL 流，每行 {"id": ..., "query": "..."}；
+    响应为 JSONL 流，逐行返回解析结果，最后一行为意图分布汇总。
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="需要管理员权限")
+    if not 1 <= chunk_size <= 10000:
+        raise HTTPException(status_code=400, detail="chunk_size 必须在 1 到 10000 之间")
+    
+    async def results():
+        summary = BatchSummary()
+        lines = aiter_lines(request.stream())
+        async for result in interpret_stream(lines, get_executor(), chunk_size, summary):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"summary": summary.to_dict()}, ensure_ascii=False) + "\n"
+    
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post("/voice/stream", response_model=VoiceStreamResponse)
+async def stream_voice(
+    request: Request,
+    sample_rate: int = 16000,
+    encoding: str = "pcm_s16le",
+    session_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """流式音频识别（分块 HTTP 上传）"""
+    try:
+        stream = AudioStream(sample_rate=sample_rate, encoding=encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async for chunk in request.stream():
+        stream.push(chunk)
+    
+    return await finish_audio_stream(stream, session_id)
+
+@router.websocket("/voice/stream")
+async def stream_voice_ws(
+    websocket: WebSocket,
+    token: str,
+    sample_rate: int = 16000,
+    encoding: str = "pcm_s16le",
+    session_id: Optional[str] = None
+):
+    """流式音频识别（WebSocket）
+
+    客户端发送二进制音频帧，发送文本 "end" 表示语音结束，服务端返回识别和解析结果。
+    """
+    try:
+        verify_token(token)
+        stream = AudioStream(sample_rate=sample_rate, encoding=encoding)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    except ValueError as e:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e))
+        return
+    
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                stream.push(message["bytes"])
+            elif message.get("text") == "end":
+                break
+        
+        response = await finish_audio_stream(stream, session_id)
+        await websocket.send_json(response.model_dump(mode="json"))
+        await websocket.close()
+    except WebSocketDisconnect:
+        return
+
+TTS_CHUNK_SIZE = 64 * 1024
+
+def iter_mapped_audio(mapped: mmap.mmap):
+    """按块输出内存映射的音频，不复制整个文件"""
+    view = memoryview(mapped)
+    try:
+        for start in range(0, len(view), TTS_CHUNK_SIZE):
+            yield bytes(view[start:start + TTS_CHUNK_SIZE])
+    finally:
+        view.release()
+
+def tts_response(key: str, mapped: mmap.mmap, cached: bool) -> StreamingResponse:
+    """构造 TTS 音频响应"""
+    return StreamingResponse(
+        iter_mapped_audio(mapped),
+        media_type="audio/wav",
+        headers={
+            "Content-Length": str(len(mapped)),
+            "ETag": f'"{key}"',
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "X-TTS-Cache": "hit" if cached else "miss"
+        }
+    )
+
+@router.post("/tts")
+async def synthesize_speech(
+    request: TTSRequest,
+    http_request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """语音合成（内容寻址缓存）"""
+    text = request.text.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="文本不能为空")
+    if len(text) > settings.TTS_MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail="文本过长")
+    
+    # 未指定的语音参数使用用户设置
+    user_settings = settings_store.get(current_user.get("user_id"))
+    voice = {**DEFAULT_SETTINGS["voice_settings"], **user_settings.get("voice_settings", {})}
+    if request.voice_settings:
+        voice.update(request.voice_settings.model_dump(exclude_none=True))
+    # 用户设置中保存的值同样要在允许范围内
+    try:
+        VoiceSettings.model_validate(voice)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="语音设置超出允许范围")
+    
+    key = tts_cache.key_for(text, voice["rate"], voice["pitch"], voice["volume"])
+    if http_request.headers.get("if-none-match") == f'"{key}"':
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+    
+    try:
+        entry = await tts_cache.get_or_synthesize(text, voice["rate"], voice["pitch"], voice["volume"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"语音合成失败: {str(e)}")
+    
+    return tts_response(entry["key"], entry["audio"], entry["cached"])
+
+@router.get("/tts/{key}")
+async def get_cached_speech(
+    key: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """按内容地址获取已缓存的语音"""
+    if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+        raise HTTPException(status_code=400, detail="无效的缓存键")
+    
+    mapped = tts_cache.lookup(key)
+    if mapped is None:
+        raise HTTPException(status_code=404, detail="语音不存在")
+    
+    tts_cache.hits += 1
+    return tts_response(key, mapped, True)
+
 @router.post("/execute", response_model=ToolExecuteResponse)
 async def execute_tool(
     request: ToolExecuteRequest,
@@ -140,24 +270,48 @@ async def execute_tool(
         
         # 模拟工具执行
         if tool_id == "transfer_sol":
-            # 模拟转账
-            result = {
-                "success": True,
-                "message": f"成功向 {params['recipient']} 转账 {params['amount']} {params.get('currency', 'SOL')}",
-                "data": {
-                    "transaction_hash": f"mock_tx_{uuid.uuid4().hex[:16]}",
-                    "recipient": params["recipient"],
-                    "amount": params["amount"],
-                    "currency": params.get("currency", "SOL"),
-                    "timestamp": "2025-06-16T14:30:00Z"
+            # 模拟转账，签名参数取自后台预取
+            try:
+                context = await blockhash_prefetcher.acquire()
+            except RPCError as e:
+                result = {
+                    "success": False,
+                    "error": {"code": "RPC_ERROR", "message": f"转账失败: {str(e)}"}
                 }
-            }
+            else:
+                spending_aggregates.record(
+                    current_user.get("user_id"), params["recipient"],
+                    params.get("currency", "SOL"), float(params["amount"])
+                )
+                result = {
+                    "success": True,
+                    "message": f"成功向 {params['recipient']} 转账 {params['amount']} {params.get('currency', 'SOL')}",
+                    "data": {
+                        "transaction_hash": f"mock_tx_{uuid.uuid4().hex[:16]}",
+                        "recipient": params["recipient"],
+                        "amount": params["amount"],
+                        "currency": params.get("currency", "SOL"),
+                        "timestamp": "2025-06-16T14:30:00Z"
+                    }
+                }
+                if context is not None:
+                    result["data"].update(context.to_dict())
+                else:
+                    # 未取得区块哈希，交易未按真实链上参数签名
+                    result["data"]["degraded"] = True
+                notification_hub.publish(current_user.get("user_id"), "transaction", {
+                    "signature": result["data"]["transaction_hash"],
+                    "status": "confirmed",
+                    "amount": params["amount"],
+                    "currency": result["data"]["currency"],
+                    "recipient": params["recipient"]
+                })
         
         elif tool_id == "query_balance":
             # 模拟余额查询
             currency = params.get("currency", "SOL")
             balance = 42.5 if currency == "SOL" else 150.0
-            usd_value = balance * 20.5 if currency == "SOL" else balance
+            usd_value = balance * (price_cache.get(currency) or 0.0)
             
             result = {
                 "success": True,
@@ -166,10 +320,42 @@ async def execute_tool(
                     "currency": currency,
                     "balance": balance,
                     "usd_value": usd_value,
+                    "stale": price_cache.is_stale(currency, settings.PRICE_STALE_SECONDS),
                     "timestamp": "2025-06-16T14:30:00Z"
                 }
             }
         
+        elif tool_id == "query_portfolio":
+            try:
+                portfolio = await fetch_portfolio(params.get("address", settings.MOCK_WALLET_ADDRESS))
+                holdings = "，".join(f"{asset['balance']:g} {asset['currency']}" for asset in portfolio["assets"])
+                result = {
+                    "success": True,
+                    "message": f"您的资产共约 ${portfolio['total_usd_value']:,.2f}：{holdings}",
+                    "data": portfolio
+                }
+            except RPCError as e:
+                result = {
+                    "success": False,
+                    "error": {"code": "RPC_ERROR", "message": f"获取资产失败: {str(e)}"}
+                }
+        
+        elif tool_id == "query_spending":
+            period = params.get("period", "this_month")
+            start, end = resolve_period(period)
+            summary = spending_aggregates.summarize(
+                current_user.get("user_id"), start, end,
+                counterparty=params.get("counterparty"), currency=params.get("currency")
+            )
+            target = f"向 {params['counterparty']} " if params.get("counterparty") else ""
+            amounts = "，".join(f"{total} {cur}" for cur, total in summary["totals"].items()) or "0"
+            
+            result = {
+                "success": True,
+                "message": f"{SPENDING_LABELS.get(period, period)}您{target}共转账 {amounts}",
+                "data": {"period": period, **summary}
+            }
+        
         elif tool_id == "query_transactions":
             # 模拟交易记录查询
             result = {
@@ -209,6 +395,13 @@ async def execute_tool(
                 }
             }
         
+        audit_log.append(
+            "tool", current_user.get("user_id"), session_id=request.session_id,
+            signature=(result.get("data") or {}).get("transaction_hash"),
+            tool=tool_id, params=params, success=result["success"],
+            error=(result.get("error") or {}).get("code")
+        )
+        
         return ToolExecuteResponse(
             success=result["success"],
             tool_id=tool_id,
@@ -218,6 +411,10 @@ async def execute_tool(
         )
         
     except Exception as e:
+        audit_log.append(
+            "tool", current_user.get("user_id"), session_id=request.session_id,
+            tool=request.tool_id, params=request.parameters, success=False, error="EXECUTION_ERROR"
+        )
         return ToolExecuteResponse(
             success=False,
             tool_id=request.tool_id,
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 # 用户相关模式
@@ -20,12 +20,16 @@ class UserResponse(UserBase):
 # 认证相关模式
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
     expires_in: int
     user_id: int
     username: str
     role: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -40,10 +44,30 @@ class VoiceInterpretResponse(BaseModel):
     intent: str
     requires_confirmation: bool
     confirmation_message: Optional[str] = None
+    message: Optional[str] = None
     tool_calls: Optional[List[Dict[str, Any]]] = None
     session_id: str
     confidence: Optional[float] = None
 
+class AudioStreamStats(BaseModel):
+    total_ms: int
+    voiced_ms: int
+    trimmed_ms: int
+
+class VoiceStreamResponse(BaseModel):
+    transcript: str
+    audio: AudioStreamStats
+    result: Optional[VoiceInterpretResponse] = None
+
+class VoiceSettings(BaseModel):
+    rate: Optional[float] = Field(None, ge=0.5, le=2.0)
+    pitch: Optional[float] = Field(None, ge=0.5, le=2.0)
+    volume: Optional[float] = Field(None, ge=0.0, le=1.0)
+
+class TTSRequest(BaseModel):
+    text: str
+    voice_settings: Optional[VoiceSettings] = None
+
 # 工具执行相关模式
 class ToolExecuteRequest(BaseModel):
     tool_id: str
@@ -70,6 +94,25 @@ class BalanceResponse(BaseModel):
     balance: float
     currency: str
     usd_value: Optional[float] = None
+    stale: bool = False
+
+class PortfolioAsset(BaseModel):
+    currency: str
+    balance: float
+    decimals: int
+    price: Optional[float] = None
+    usd_value: Optional[float] = None
+    price_stale: bool = False
+    mint: Optional[str] = None
+    accounts: Optional[int] = None
+
+class PortfolioResponse(BaseModel):
+    address: str
+    slot: int
+    assets: List[PortfolioAsset]
+    total_usd_value: float
+    unpriced_assets: int
+    stale: bool = False
 
 class TransactionResponse(BaseModel):
     signature: str
@@ -78,3 +121,23 @@ class TransactionResponse(BaseModel):
     currency: str
     recipient: str
     timestamp: datetime
+
+# 价格提醒相关模式
+class PriceAlertCreate(BaseModel):
+    currency: str = "SOL"
+    direction: Literal["above", "below"]
+    threshold: float = Field(gt=0)
+
+# 开发者工具相关模式
+class ToolDefinition(BaseModel):
+    id: str = Field(pattern=r"^[a-z][a-z0-9_]{1,63}$")
+    name: str = Field(min_length=1, max_length=64)
+    description: str = Field(min_length=1, max_length=512)
+    category: str = "custom"
+    parameters: Dict[str, Any] = {"type": "object", "properties": {}}
+
+class ToolUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=64)
+    description: Optional[str] = Field(None, min_length=1, max_length=512)
+    category: Optional[str] = None
+    parameters: Optional[Dict[str, Any]] = None
@@ -0,0 +1 @@
+# 空文件，让 Python 识别为包
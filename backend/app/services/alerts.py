@@ -0,0 +1,421 @@
+"""价格提醒引擎
+
+基准测试：python -m app.services.alerts --alerts 1000000 --ticks 2000
+用模拟行情驱动引擎，对比有序索引与逐条扫描的单次行情耗时。
+"""
+import argparse
+import heapq
+import json
+import random
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.prices import PriceCache, SimulatedPriceFeed, price_cache
+from app.services.settings_store import UserSettingsStore
+
+DIRECTIONS = ("above", "below")
+
+# (user_id, currency, direction, threshold)
+AlertRecord = Tuple[Any, str, str, float]
+AlertListener = Callable[[List[Dict[str, Any]]], None]
+
+
+def new_alert_id() -> int:
+    """随机 53 位 ID：多个工作进程各自分配也不会冲突，且在 JavaScript 中不丢精度"""
+    return uuid.uuid4().int >> 75
+
+
+class ThresholdIndex:
+    """单个币种、单个方向的提醒索引（双堆 + 惰性删除）
+
+    以索引记录的价格为界把阈值分成两个堆：armed 是价格朝触发方向移动时会穿越的阈值，
+    parked 是已在价格另一侧的阈值。价格移动时只弹出堆顶落在新旧价格之间的元素：
+    朝触发方向移动时取出 armed 中被穿越的阈值，反方向移动时把 parked 中被穿越的阈值移回 armed。
+    一次行情 O((k + m) log n)，k 为触发数，m 为反向穿越数；删除只从存活集合移除，出堆时跳过。
+
+    边界：above 在价格从 low 升到 high 时取出 (low, high]，below 在价格从 high 降到 low 时取出 [low, high)。
+    """
+
+    def __init__(self, direction: str, price: Optional[float] = None):
+        # above 以 t 为键、below 以 -t 为键，两个方向共用同一套比较
+        self._sign = 1 if direction == "above" else -1
+        self.price = price
+        self._armed: List[Tuple[float, int]] = []
+        self._parked: List[Tuple[float, int]] = []
+        # 价格未知时暂存，第一次行情时再分堆
+        self._unplaced: List[Tuple[float, int]] = []
+        self._live: Set[int] = set()
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def _place(self, threshold: float, alert_id: int) -> None:
+        key = self._sign * threshold
+        if self.price is None:
+            self._unplaced.append((threshold, alert_id))
+        elif key > self._sign * self.price:
+            heapq.heappush(self._armed, (key, alert_id))
+        else:
+            heapq.heappush(self._parked, (-key, alert_id))
+
+    def add(self, threshold: float, alert_id: int) -> None:
+        self._live.add(alert_id)
+        self._place(threshold, alert_id)
+
+    def bulk_add(self, pairs: Iterable[Tuple[float, int]]) -> None:
+        """批量加入后整体建堆（O(n)），比逐个插入快"""
+        pairs = list(pairs)
+        self._live.update(alert_id for _, alert_id in pairs)
+        if self.price is None:
+            self._unplaced.extend(pairs)
+            return
+        bound = self._sign * self.price
+        for threshold, alert_id in pairs:
+            key = self._sign * threshold
+            if key > bound:
+                self._armed.append((key, alert_id))
+            else:
+                self._parked.append((-key, alert_id))
+        heapq.heapify(self._armed)
+        heapq.heapify(self._parked)
+
+    def remove(self, threshold: float, alert_id: int) -> bool:
+        if alert_id not in self._live:
+            return False
+        self._live.remove(alert_id)
+        self._dead += 1
+        if self._dead > max(len(self._live), 1024):
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        """墓碑过多时重建两个堆"""
+        live = self._live
+        self._armed = [entry for entry in self._armed if entry[1] in live]
+        self._parked = [entry for entry in self._parked if entry[1] in live]
+        self._unplaced = [entry for entry in self._unplaced if entry[1] in live]
+        heapq.heapify(self._armed)
+        heapq.heapify(self._parked)
+        self._dead = 0
+
+    def move(self, price: float, fire: bool = True) -> List[int]:
+        """价格移动到 price，取出被穿越的提醒；fire 为 False 时只调整基准，不触发"""
+        if self.price is None:
+            self.price = price
+            unplaced, self._unplaced = self._unplaced, []
+            self.bulk_add((t, i) for t, i in unplaced if i in self._live)
+            self._dead = 0
+            return []
+
+        sign, live = self._sign, self._live
+        crossed: List[int] = []
+        if sign * price > sign * self.price:
+            limit = sign * price
+            while self._armed and self._armed[0][0] <= limit:
+                key, alert_id = heapq.heappop(self._armed)
+                if alert_id not in live:
+                    self._dead -= 1
+                elif fire:
+                    live.remove(alert_id)
+                    crossed.append(alert_id)
+                else:
+                    heapq.heappush(self._parked, (-key, alert_id))
+        elif sign * price < sign * self.price:
+            limit = -sign * price
+            while self._parked and self._parked[0][0] < limit:
+                key, alert_id = heapq.heappop(self._parked)
+                if alert_id not in live:
+                    self._dead -= 1
+                else:
+                    heapq.heappush(self._armed, (-key, alert_id))
+        self.price = price
+        return crossed
+
+
+class PriceAlertEngine:
+    """价格提醒引擎
+
+    每个币种按方向维护阈值索引。价格从 p0 变为 p1 时只弹出阈值落在两者之间的提醒，
+    单次行情 O((k + m) log n)，不逐条比较；没有阈值被穿越的行情只比较两个堆顶。
+    提醒触发一次后即移除。
+    """
+
+    def __init__(self, recent_size: int = 20):
+        self._indexes: Dict[Tuple[str, str], ThresholdIndex] = {}
+        self._alerts: Dict[int, AlertRecord] = {}
+        # 值只占位，用字典保持每个用户提醒的添加顺序
+        self._by_user: Dict[Any, Dict[int, None]] = defaultdict(dict)
+        self._last_price: Dict[str, float] = {}
+        self._recent: Dict[Any, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=recent_size))
+        self._listeners: List[AlertListener] = []
+        self.stats = {"ticks": 0, "triggered": 0}
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def subscribe(self, listener: AlertListener) -> None:
+        """订阅触发事件"""
+        self._listeners.append(listener)
+
+    def _index(self, currency: str, direction: str) -> ThresholdIndex:
+        index = self._indexes.get((currency, direction))
+        if index is None:
+            index = ThresholdIndex(direction, self._last_price.get(currency))
+            self._indexes[(currency, direction)] = index
+        return index
+
+    def _new_id(self) -> int:
+        alert_id = new_alert_id()
+        while alert_id in self._alerts:
+            alert_id = new_alert_id()
+        return alert_id
+
+    def add_alert(self, user_id: Any, currency: str, direction: str, threshold: float) -> Dict[str, Any]:
+        """注册提醒"""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction 必须是 {', '.join(DIRECTIONS)} 之一")
+        currency = currency.upper()
+        alert_id = self._new_id()
+        self._alerts[alert_id] = (user_id, currency, direction, threshold)
+        self._by_user[user_id][alert_id] = None
+        self._index(currency, direction).add(threshold, alert_id)
+        return self._to_dict(alert_id)
+
+    def add_alerts_bulk(self, alerts: Iterable[AlertRecord]) -> int:
+        """批量注册提醒，返回注册数量"""
+        pending: Dict[Tuple[str, str], List[Tuple[float, int]]] = defaultdict(list)
+        count = 0
+        for user_id, currency, direction, threshold in alerts:
+            currency = currency.upper()
+            alert_id = self._new_id()
+            self._alerts[alert_id] = (user_id, currency, direction, threshold)
+            self._by_user[user_id][alert_id] = None
+            pending[(currency, direction)].append((threshold, alert_id))
+            count += 1
+        for key, pairs in pending.items():
+            self._index(*key).bulk_add(pairs)
+        return count
+
+    def restore(self, alerts: Iterable[Tuple[int, AlertRecord]]) -> int:
+        """按原 ID 恢复已持久化的提醒"""
+        pending: Dict[Tuple[str, str], List[Tuple[float, int]]] = defaultdict(list)
+        for alert_id, (user_id, currency, direction, threshold) in alerts:
+            if alert_id in self._alerts or direction not in DIRECTIONS:
+                continue
+            currency = currency.upper()
+            self._alerts[alert_id] = (user_id, currency, direction, threshold)
+            self._by_user[user_id][alert_id] = None
+            pending[(currency, direction)].append((threshold, alert_id))
+        for key, pairs in pending.items():
+            self._index(*key).bulk_add(pairs)
+        return sum(len(pairs) for pairs in pending.values())
+
+    def remove_alert(self, alert_id: int, user_id: Any = None) -> bool:
+        """删除提醒；指定 user_id 时只能删除该用户的提醒"""
+        record = self._alerts.get(alert_id)
+        if record is None or (user_id is not None and record[0] != user_id):
+            return False
+        owner, currency, direction, threshold = record
+        self._indexes[(currency, direction)].remove(threshold, alert_id)
+        self._forget(alert_id, owner)
+        return True
+
+    def _forget(self, alert_id: int, owner: Any) -> None:
+        del self._alerts[alert_id]
+        user_alerts = self._by_user.get(owner)
+        if user_alerts is not None:
+            user_alerts.pop(alert_id, None)
+            if not user_alerts:
+                del self._by_user[owner]
+
+    def list_alerts(self, user_id: Any) -> List[Dict[str, Any]]:
+        return [self._to_dict(alert_id) for alert_id in self._by_user.get(user_id, ())]
+
+    def recent_triggers(self, user_id: Any) -> List[Dict[str, Any]]:
+        return list(self._recent.get(user_id, ()))
+
+    def _to_dict(self, alert_id: int) -> Dict[str, Any]:
+        user_id, currency, direction, threshold = self._alerts[alert_id]
+        return {"id": alert_id, "currency": currency, "direction": direction, "threshold": threshold}
+
+    def seed_price(self, currency: str, price: float) -> None:
+        """设置基准价格，之后的行情与之比较判断是否穿越阈值"""
+        currency = currency.upper()
+        self._last_price[currency] = price
+        for direction in DIRECTIONS:
+            index = self._indexes.get((currency, direction))
+            if index is not None:
+                index.move(price, fire=False)
+
+    def on_price(self, currency: str, price: float) -> List[Dict[str, Any]]:
+        """处理一次行情，返回被触发的提醒"""
+        currency = currency.upper()
+        self.stats["ticks"] += 1
+        self._last_price[currency] = price
+        # 两个方向都要移动基准：一个方向触发，另一个方向把反向穿越的阈值重新挂起
+        crossed: List[int] = []
+        for direction in DIRECTIONS:
+            index = self._indexes.get((currency, direction))
+            if index is not None:
+                crossed.extend(index.move(price))
+        if not crossed:
+            return []
+
+        triggered_at = time.time()
+        triggered = []
+        for alert_id in crossed:
+            event = {**self._to_dict(alert_id), "price": price, "triggered_at": triggered_at}
+            owner = self._alerts[alert_id][0]
+            self._forget(alert_id, owner)
+            self._recent[owner].append(event)
+            triggered.append({"user_id": owner, **event})
+        self.stats["triggered"] += len(triggered)
+
+        for listener in self._listeners:
+            listener(triggered)
+        return triggered
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"alerts": len(self._alerts), "users": len(self._by_user), **self.stats}
+
+
+alert_engine = PriceAlertEngine()
+for _currency, _quote in price_cache.snapshot().items():
+    alert_engine.seed_price(_currency, _quote["price"])
+price_cache.subscribe(alert_engine.on_price)
+
+# 提醒按用户落盘，复用用户设置的存储（合并窗口内批量写入，其他工作进程的写入会重新加载）。
+# 存储是所有工作进程共享的提醒列表，各进程只把自己的增删合并进去，不整体覆盖。
+alert_store = UserSettingsStore(
+    defaults={"alerts": []},
+    storage_dir=settings.PRICE_ALERTS_STORAGE_DIR,
+    flush_interval_ms=settings.SETTINGS_FLUSH_INTERVAL_MS,
+    reload_interval_ms=settings.SETTINGS_RELOAD_INTERVAL_MS,
+)
+
+
+def load_user_alerts(user_id: Any) -> List[Dict[str, Any]]:
+    """用户在所有工作进程中的提醒（先重新加载其他工作进程的写入）"""
+    alert_store.refresh(user_id)
+    return alert_store.get(user_id)["alerts"]
+
+
+def save_user_alerts(user_id: Any, added: Iterable[Dict[str, Any]] = (),
+                     removed: Iterable[int] = ()) -> List[Dict[str, Any]]:
+    """把本进程新增和删除（含触发）的提醒合并进存储，返回合并后的列表"""
+    removed = set(removed)
+    alerts = [alert for alert in load_user_alerts(user_id) if alert["id"] not in removed]
+    known = {alert["id"] for alert in alerts}
+    alerts.extend(alert for alert in added if alert["id"] not in known)
+    alert_store.update(user_id, {"alerts": alerts})
+    return alerts
+
+
+def _save_triggered(events: List[Dict[str, Any]]) -> None:
+    removed: Dict[Any, List[int]] = defaultdict(list)
+    for event in events:
+        removed[event["user_id"]].append(event["id"])
+    for user_id, alert_ids in removed.items():
+        save_user_alerts(user_id, removed=alert_ids)
+
+
+alert_engine.subscribe(_save_triggered)
+
+
+def start_alert_store() -> int:
+    """启动提醒存储并恢复已持久化的提醒，返回恢复数量"""
+    alert_store.start()
+    return alert_engine.restore(
+        (alert["id"], (user_id, alert["currency"], alert["direction"], alert["threshold"]))
+        for user_id in alert_store.user_ids()
+        for alert in alert_store.get(user_id)["alerts"]
+    )
+
+
+def _naive_scan(alerts: Dict[int, AlertRecord], currency: str, last: float, price: float) -> List[int]:
+    """逐条检查所有提醒，仅用于基准对比"""
+    crossed = []
+    for alert_id, (_, alert_currency, direction, threshold) in alerts.items():
+        if alert_currency != currency:
+            continue
+        if direction == "above" and last < threshold <= price:
+            crossed.append(alert_id)
+        elif direction == "below" and price <= threshold < last:
+            crossed.append(alert_id)
+    return crossed
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def benchmark(alert_count: int, ticks: int, users: int, volatility: float,
+              naive_ticks: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    random.seed(seed)
+    base = 20.5
+    cache = PriceCache({"SOL": base})
+    engine = PriceAlertEngine()
+    engine.seed_price("SOL", base)
+
+    started = time.perf_counter()
+    engine.add_alerts_bulk(
+        (rng.randrange(users), "SOL", rng.choice(DIRECTIONS), round(base * rng.uniform(0.5, 1.5), 4))
+        for _ in range(alert_count)
+    )
+    load_seconds = time.perf_counter() - started
+    naive_alerts = dict(engine._alerts)
+
+    latencies: List[float] = []
+
+    def timed(currency: str, price: float) -> None:
+        t0 = time.perf_counter()
+        engine.on_price(currency, price)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+
+    cache.subscribe(timed)
+    feed = SimulatedPriceFeed(cache, interval=0, volatility=volatility)
+    prices = [base]
+    for _ in range(ticks):
+        feed.tick()
+        prices.append(cache.get("SOL"))
+
+    naive_latencies = []
+    for last, price in zip(prices, prices[1:naive_ticks + 1]):
+        t0 = time.perf_counter()
+        _naive_scan(naive_alerts, "SOL", last, price)
+        naive_latencies.append((time.perf_counter() - t0) * 1e6)
+
+    return {
+        "alerts": alert_count,
+        "ticks": ticks,
+        "load_seconds": round(load_seconds, 3),
+        "triggered": engine.stats["triggered"],
+        "remaining": len(engine),
+        "indexed_us": {f"p{p}": round(_percentile(latencies, p), 1) for p in (50, 95, 99)},
+        "naive_us": {f"p{p}": round(_percentile(naive_latencies, p), 1) for p in (50, 95, 99)},
+        "price_range": [round(min(prices), 4), round(max(prices), 4)],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="价格提醒引擎基准测试")
+    parser.add_argument("--alerts", type=int, default=1_000_000, help="提醒总数")
+    parser.add_argument("--ticks", type=int, default=2000, help="模拟行情次数")
+    parser.add_argument("--users", type=int, default=100_000, help="用户数")
+    parser.add_argument("--volatility", type=float, default=0.002, help="每次行情的对数收益标准差")
+    parser.add_argument("--naive-ticks", type=int, default=20, help="逐条扫描对比的行情次数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.alerts, args.ticks, args.users, args.volatility, args.naive_ticks, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
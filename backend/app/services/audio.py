@@ -0,0 +1,189 @@
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+# 仅支持 16-bit little-endian 单声道 PCM；Opus 需先由客户端或网关解码
+SUPPORTED_ENCODINGS = {"pcm_s16le"}
+SAMPLE_WIDTH = 2
+
+
+class RingBuffer:
+    """固定容量的字节环形缓冲区
+
+    写入和读取都基于 memoryview，不会随语音长度增长分配内存。
+    """
+
+    def __init__(self, capacity: int):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self.capacity = capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self._size
+
+    def write(self, data: memoryview) -> int:
+        """写入数据，返回实际写入的字节数（缓冲区满时截断）"""
+        n = min(len(data), self.free)
+        if n == 0:
+            return 0
+        end = (self._start + self._size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._view[end:end + first] = data[:first]
+        if n > first:
+            self._view[:n - first] = data[first:n]
+        self._size += n
+        return n
+
+    def read_into(self, out: memoryview) -> int:
+        """读取数据到预分配的缓冲区，返回读取的字节数"""
+        n = min(len(out), self._size)
+        first = min(n, self.capacity - self._start)
+        out[:first] = self._view[self._start:self._start + first]
+        if n > first:
+            out[first:n] = self._view[:n - first]
+        self._start = (self._start + n) % self.capacity
+        self._size -= n
+        return n
+
+
+class EnergyVAD:
+    """基于帧能量的语音活动检测
+
+    连续静音超过 hangover 帧后才判定为静音，避免截断字间停顿。
+    """
+
+    def __init__(self, threshold_db: float = -45.0, hangover_frames: int = 8):
+        # 以 int16 满幅为 0 dBFS 的 RMS 阈值
+        self.threshold = 32768 * 10 ** (threshold_db / 20)
+        self.hangover_frames = hangover_frames
+        self._silent_run = hangover_frames
+        self.speech_started = False
+
+    def is_speech(self, frame: memoryview) -> bool:
+        # 直接在帧缓冲区上做向量化计算，转 float64 避免 int16 平方溢出
+        samples = np.frombuffer(frame, dtype="<i2")
+        if samples.size == 0:
+            return False
+        energy = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+        if energy >= self.threshold:
+            self._silent_run = 0
+            self.speech_started = True
+            return True
+        self._silent_run += 1
+        return self._silent_run <= self.hangover_frames
+
+
+class ASRBackend:
+    """流式语音识别后端接口"""
+
+    name = "base"
+
+    def feed(self, frame: memoryview) -> None:
+        """送入一帧有声音频"""
+        raise NotImplementedError
+
+    def finalize(self) -> str:
+        """结束识别并返回文本"""
+        raise NotImplementedError
+
+
+class StubASRBackend(ASRBackend):
+    """本地开发用的识别桩：只统计有声帧，返回预设文本"""
+
+    name = "stub"
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.voiced_bytes = 0
+
+    def feed(self, frame: memoryview) -> None:
+        self.voiced_bytes += len(frame)
+
+    def finalize(self) -> str:
+        if self.voiced_bytes == 0:
+            return ""
+        return settings.ASR_STUB_TRANSCRIPT
+
+
+ASR_BACKENDS: Dict[str, Callable[[int], ASRBackend]] = {
+    "stub": StubASRBackend,
+}
+
+
+def register_asr_backend(name: str, factory: Callable[[int], ASRBackend]) -> None:
+    """注册语音识别后端"""
+    ASR_BACKENDS[name] = factory
+
+
+def create_asr_backend(sample_rate: int, name: Optional[str] = None) -> ASRBackend:
+    """按名称创建语音识别后端实例"""
+    factory = ASR_BACKENDS.get(name or settings.ASR_BACKEND)
+    if factory is None:
+        raise ValueError(f"未知的语音识别后端: {name or settings.ASR_BACKEND}")
+    return factory(sample_rate)
+
+
+class AudioStream:
+    """单个音频流的处理管线：环形缓冲 -> 分帧 -> VAD -> ASR
+
+    所有缓冲区在创建时一次性分配，内存占用与语音长度无关。
+    """
+
+    def __init__(self, sample_rate: int = 16000, encoding: str = "pcm_s16le", backend: Optional[str] = None):
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"不支持的音频编码: {encoding}")
+        if not 8000 <= sample_rate <= 48000:
+            raise ValueError(f"不支持的采样率: {sample_rate}")
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * settings.AUDIO_FRAME_MS // 1000 * SAMPLE_WIDTH
+        capacity = max(settings.AUDIO_RING_BUFFER_BYTES, self.frame_bytes * 2)
+        self.ring = RingBuffer(capacity)
+        self._frame = memoryview(bytearray(self.frame_bytes))
+        self.vad = EnergyVAD(settings.VAD_THRESHOLD_DB, settings.VAD_HANGOVER_FRAMES)
+        self.asr = create_asr_backend(sample_rate, backend)
+        self.total_frames = 0
+        self.voiced_frames = 0
+
+    def push(self, chunk: bytes) -> None:
+        """写入一段音频数据，按帧送入 VAD 和 ASR"""
+        view = memoryview(chunk)
+        while view:
+            written = self.ring.write(view)
+            view = view[written:]
+            self._drain()
+
+    def _drain(self) -> None:
+        while len(self.ring) >= self.frame_bytes:
+            self.ring.read_into(self._frame)
+            self._process(self._frame)
+
+    def _process(self, frame: memoryview) -> None:
+        self.total_frames += 1
+        if self.vad.is_speech(frame):
+            self.voiced_frames += 1
+            self.asr.feed(frame)
+
+    def finish(self) -> str:
+        """处理剩余的不完整帧并返回识别文本"""
+        remaining = len(self.ring) - len(self.ring) % SAMPLE_WIDTH
+        if remaining:
+            tail = self._frame[:remaining]
+            self.ring.read_into(tail)
+            self._process(tail)
+        return self.asr.finalize().strip()
+
+    def stats(self) -> Dict[str, float]:
+        frame_ms = settings.AUDIO_FRAME_MS
+        return {
+            "total_ms": self.total_frames * frame_ms,
+            "voiced_ms": self.voiced_frames * frame_ms,
+            "trimmed_ms": (self.total_frames - self.voiced_frames) * frame_ms,
+        }
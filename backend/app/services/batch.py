@@ -0,0 +1,245 @@
+"""离线批量意图解析
+
+用法：python -m app.services.batch utterances.jsonl -o results.jsonl --workers 8 --chunk-size 500
+
+输入每行一个 JSON 对象（{"id": ..., "query": "..."}）或 JSON 字符串，
+输出每行一条解析结果，意图分布汇总写到标准错误。
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional
+
+from app.core.config import settings
+
+
+def interpret_chunk(lines: List[str]) -> List[Dict[str, Any]]:
+    """在工作进程中解析一批语音文本（规则解析，整批一次矩阵运算给出分类置信度）"""
+    from app.services.intent_classifier import intent_classifier
+    from app.services.intents import apply_confidence, parse_voice_intent
+
+    results: List[Dict[str, Any]] = []
+    parsed = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            if not isinstance(record, dict):
+                raise ValueError("每行必须是 JSON 对象或字符串")
+            if not isinstance(record.get("query"), str):
+                raise ValueError("query 必须是字符串")
+        except Exception as e:
+            # 只有字符串进入分类器，一条坏记录不会拖垮整块
+            results.append({"line": line, "error": str(e)})
+            continue
+        parsed.append((len(results), record.get("id"), record["query"]))
+        results.append({})
+
+    queries = [query for _, _, query in parsed]
+    predictions = (intent_classifier.classify_batch(queries) if settings.INTENT_CLASSIFIER_ENABLED
+                   else [None] * len(queries))
+    for (position, record_id, query), prediction in zip(parsed, predictions):
+        try:
+            intent_data = apply_confidence(query, parse_voice_intent(query), prediction)
+            results[position] = {
+                "id": record_id,
+                "query": query,
+                "intent": intent_data["intent"],
+                "confidence": intent_data.get("confidence"),
+                "tool_calls": intent_data.get("tool_calls"),
+            }
+        except Exception as e:
+            results[position] = {"id": record_id, "query": query, "error": str(e)}
+    return results
+
+
+class BatchSummary:
+    """意图分布统计"""
+
+    def __init__(self):
+        self.intents: Counter = Counter()
+        self.errors = 0
+        self.low_confidence = 0
+        self.started_at = time.perf_counter()
+
+    def add(self, result: Dict[str, Any]) -> None:
+        if "error" in result:
+            self.errors += 1
+        else:
+            self.intents[result["intent"]] += 1
+            confidence = result.get("confidence")
+            if confidence is not None and confidence < settings.INTENT_MIN_CONFIDENCE:
+                self.low_confidence += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = sum(self.intents.values()) + self.errors
+        elapsed = time.perf_counter() - self.started_at
+        matched = total - self.errors - self.intents.get("direct_response", 0) - self.intents.get("clarify", 0)
+        return {
+            "total": total,
+            "errors": self.errors,
+            "coverage": round(matched / total, 4) if total else 0.0,
+            "low_confidence": self.low_confidence,
+            "intents": dict(self.intents.most_common()),
+            "elapsed_seconds": round(elapsed, 3),
+            "per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """工作进程数：显式指定 > BATCH_WORKERS > CPU 核数"""
+    return workers or settings.BATCH_WORKERS or os.cpu_count() or 1
+
+
+def create_executor(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """创建批量解析进程池（spawn 方式，避免 fork 带上事件循环和后台线程）"""
+    return ProcessPoolExecutor(
+        max_workers=resolve_workers(workers),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """获取服务进程内共享的批量解析进程池"""
+    global _executor
+    if _executor is None:
+        _executor = create_executor()
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def iter_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class LineTooLongError(ValueError):
+    """单行长度超过上限"""
+
+
+async def aiter_lines(byte_chunks: AsyncIterator[bytes], max_line_bytes: int = 0) -> AsyncIterator[str]:
+    """将字节流增量切分为文本行
+
+    按字节切分后再逐行解码（UTF-8 多字节字符不含 0x0A，不会被切断）；
+    max_line_bytes 大于 0 时，单行超过上限即抛出 LineTooLongError，未完成的行不会无限累积。
+    """
+    pending = b""
+    async for data in byte_chunks:
+        *lines, pending = (pending + data).split(b"\n")
+        for line in lines:
+            if max_line_bytes and len(line) > max_line_bytes:
+                raise LineTooLongError(f"单行超过 {max_line_bytes} 字节上限")
+            yield line.decode("utf-8")
+        if max_line_bytes and len(pending) > max_line_bytes:
+            raise LineTooLongError(f"单行超过 {max_line_bytes} 字节上限")
+    if pending:
+        yield pending.decode("utf-8")
+
+
+async def interpret_stream(
+    lines: AsyncIterator[str],
+    executor: Executor,
+    chunk_size: int,
+    summary: BatchSummary,
+    workers: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """分块提交到进程池并按输入顺序输出结果，同时在途的块数受限以控制内存
+
+    workers 为创建 executor 时使用的工作进程数，在途块数上限为其两倍。
+    """
+    loop = asyncio.get_running_loop()
+    max_inflight = resolve_workers(workers) * 2
+    inflight: Deque[asyncio.Future] = deque()
+    chunk: List[str] = []
+
+    async def drain(limit: int):
+        while len(inflight) > limit:
+            for result in await inflight.popleft():
+                summary.add(result)
+                yield result
+
+    async for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            inflight.append(loop.run_in_executor(executor, interpret_chunk, chunk))
+            chunk = []
+            async for result in drain(max_inflight):
+                yield result
+
+    if chunk:
+        inflight.append(loop.run_in_executor(executor, interpret_chunk, chunk))
+    async for result in drain(0):
+        yield result
+
+
+def run_batch(lines: Iterable[str], output, workers: Optional[int], chunk_size: int) -> Dict[str, Any]:
+    """同步批量解析，结果逐行写入 output"""
+    summary = BatchSummary()
+    workers = resolve_workers(workers)
+    with create_executor(workers) as executor:
+        max_inflight = workers * 2
+        inflight: Deque = deque()
+
+        def drain(limit: int) -> None:
+            while len(inflight) > limit:
+                for result in inflight.popleft().result():
+                    summary.add(result)
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        for chunk in iter_chunks(lines, chunk_size):
+            inflight.append(executor.submit(interpret_chunk, chunk))
+            drain(max_inflight)
+        drain(0)
+    return summary.to_dict()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="批量重跑语音意图解析")
+    parser.add_argument("input", help="输入 JSONL 文件，- 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出 JSONL 文件，默认标准输出")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="工作进程数，默认 CPU 核数")
+    parser.add_argument("-c", "--chunk-size", type=int, default=settings.BATCH_CHUNK_SIZE, help="每块的语句数")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run_batch(source, target, args.workers, args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
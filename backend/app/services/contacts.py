@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.batch import LineTooLongError
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {char: index for index, char in enumerate(B58_ALPHABET)}
+
+CONTACT_FIELDS = ("name", "address", "note")
+MAX_NAME_LENGTH = 64
+MAX_NOTE_LENGTH = 256
+
+
+def b58decode(value: str) -> bytes:
+    """Base58 解码（比特币字母表，Solana 地址使用）"""
+    number = 0
+    for char in value:
+        digit = B58_INDEX.get(char)
+        if digit is None:
+            raise ValueError(f"非法的 Base58 字符: {char!r}")
+        number = number * 58 + digit
+    leading_zeros = len(value) - len(value.lstrip("1"))
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    return b"\x00" * leading_zeros + body
+
+
+@lru_cache(maxsize=settings.CONTACT_ADDRESS_CACHE_SIZE)
+def address_error(address: str) -> Optional[str]:
+    """校验 Solana 地址（Base58 解码后为 32 字节），合法时返回 None，否则返回错误原因"""
+    if not 32 <= len(address) <= 44:
+        return "地址长度必须在 32 到 44 个字符之间"
+    try:
+        decoded = b58decode(address)
+    except ValueError as e:
+        return str(e)
+    if len(decoded) != 32:
+        return f"地址解码后应为 32 字节，实际为 {len(decoded)} 字节"
+    return None
+
+
+def validate_addresses(addresses: Iterable[str]) -> Dict[str, Optional[str]]:
+    """批量校验地址，同一批内重复的地址只校验一次"""
+    return {address: address_error(address) for address in set(addresses)}
+
+
+def validate_contact(contact: Dict[str, Any]) -> Optional[str]:
+    """校验联系人字段（不含地址），合法时返回 None"""
+    name = contact.get("name")
+    if not isinstance(name, str) or not name.strip():
+        return "缺少必需字段: name"
+    if len(name) > MAX_NAME_LENGTH:
+        return f"name 不能超过 {MAX_NAME_LENGTH} 个字符"
+    address = contact.get("address")
+    if not isinstance(address, str) or not address.strip():
+        return "缺少必需字段: address"
+    note = contact.get("note") or ""
+    if not isinstance(note, str) or len(note) > MAX_NOTE_LENGTH:
+        return f"note 必须是不超过 {MAX_NOTE_LENGTH} 个字符的字符串"
+    return None
+
+
+async def aiter_csv_records(
+    lines: AsyncIterator[str], max_record_bytes: int = 0
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """增量解析 CSV，首行为表头；引号内的换行会跟下一行合并后再解析
+
+    max_record_bytes 大于 0 时，单条记录（含引号内的多行）超过上限即输出错误行并停止解析。
+    """
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    pending_bytes = 0
+    # 已合并行中引号数的奇偶，每行只数一次，多行字段不会反复扫描前面的内容
+    open_quote = False
+    row_number = 0
+    try:
+        async for line in lines:
+            pending.append(line)
+            if max_record_bytes:
+                pending_bytes += len(line.encode("utf-8")) + 1
+                if pending_bytes > max_record_bytes:
+                    yield row_number + 1, {"_error": f"单条记录超过 {max_record_bytes} 字节上限，后续内容已忽略"}
+                    return
+            if line.count('"') % 2:
+                open_quote = not open_quote
+            if open_quote:
+                continue
+            text = "\n".join(pending)
+            pending = []
+            pending_bytes = 0
+            if not text.strip():
+                continue
+            values = next(csv.reader([text]))
+            if header is None:
+                header = [value.strip().lstrip("\ufeff").lower() for value in values]
+                continue
+            row_number += 1
+            yield row_number, dict(zip(header, (value.strip() for value in values)))
+    except LineTooLongError as e:
+        yield row_number + 1, {"_error": f"{e}，后续内容已忽略"}
+        return
+    if pending:
+        row_number += 1
+        yield row_number, {"_error": "引号未闭合"}
+
+
+async def aiter_jsonl_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    row_number = 0
+    try:
+        async for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row_number, {"_error": "不是合法的 JSON"}
+                continue
+            yield row_number, record if isinstance(record, dict) else {"_error": "每行必须是 JSON 对象"}
+    except LineTooLongError as e:
+        yield row_number + 1, {"_error": f"{e}，后续内容已忽略"}
+
+
+async def import_records(
+    records: AsyncIterator[Tuple[int, Dict[str, Any]]],
+    known_addresses: Set[str],
+    insert: Callable[[List[Dict[str, str]]], None],
+    chunk_size: int,
+    max_rows: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """分块校验并写入联系人
+
+    逐行输出失败记录 {"row": n, "error": "..."}，最后输出 {"summary": {...}}。
+    地址已存在（包括文件中前面的行）的记录视为重复并跳过。
+    """
+    summary = {"rows": 0, "imported": 0, "failed": 0, "duplicates": 0}
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    def flush() -> List[Dict[str, Any]]:
+        errors = []
+        checked = validate_addresses(
+            record["address"].strip() for _, record in batch
+            if "_error" not in record and isinstance(record.get("address"), str)
+        )
+        accepted = []
+        for row, record in batch:
+            error = record.get("_error") or validate_contact(record)
+            address = record["address"].strip() if error is None else None
+            if error is None:
+                error = checked[address]
+            if error is None and address in known_addresses:
+                summary["duplicates"] += 1
+                error = "地址已存在"
+            if error is not None:
+                summary["failed"] += 1
+                errors.append({"row": row, "error": error})
+                continue
+            known_addresses.add(address)
+            accepted.append({
+                "name": record["name"].strip(),
+                "address": address,
+                "note": (record.get("note") or "").strip()
+            })
+        if accepted:
+            insert(accepted)
+            summary["imported"] += len(accepted)
+        batch.clear()
+        return errors
+
+    async for row, record in records:
+        if row > max_rows:
+            yield {"row": row, "error": f"超过单次导入上限 {max_rows} 行，后续内容已忽略"}
+            break
+        summary["rows"] = row
+        batch.append((row, record))
+        if len(batch) >= chunk_size:
+            for error in flush():
+                yield error
+    for error in flush():
+        yield error
+    yield {"summary": summary}
+
+
+def export_contacts(contacts: Iterable[Dict[str, Any]], fmt: str, chunk_size: int) -> Iterator[str]:
+    """按块导出联系人，避免一次性拼接完整文件"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(("id",) + CONTACT_FIELDS)
+
+    count = 0
+    for contact in contacts:
+        if writer is not None:
+            writer.writerow([contact.get("id", "")] + [contact.get(field, "") for field in CONTACT_FIELDS])
+        else:
+            buffer.write(json.dumps(contact, ensure_ascii=False) + "\n")
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,300 @@
+"""本地意图分类器：字符 n-gram 哈希特征 + NumPy 线性模型（softmax 回归）
+
+用法：python -m app.services.intent_classifier app/data/intent_utterances.jsonl
+     python -m app.services.intent_classifier app/data/intent_utterances.jsonl -q "给小明转5个sol" -q "你好"
+
+训练数据每行一个 JSON 对象（{"query": "...", "intent": "..."}）。
+训练时留出一部分样本，用其余样本训练模型，在留出样本上选择温度并评估；部署的就是这个模型，
+报告的准确率和校准误差即线上模型的指标。评估结果写到标准错误。
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+NGRAM_SIZES = (1, 2, 3)
+EPOCHS = 300
+LEARNING_RATE = 0.1
+L2 = 1e-4
+HOLDOUT_EVERY = 5
+# 训练流程变化时递增，使旧的模型缓存失效
+MODEL_FORMAT = 2
+TEMPERATURES = np.geomspace(0.05, 5, 81)
+
+# 稀疏特征：(特征下标, 特征值, 每行起始位置)
+Features = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class Prediction(NamedTuple):
+    intent: str
+    confidence: float
+    scores: Dict[str, float]
+
+
+def normalize(text: str) -> str:
+    """小写、数字统一为 0、合并空白，让金额等不同的说法共享特征"""
+    return re.sub(r"\s+", " ", re.sub(r"\d+(?:\.\d+)?", "0", text.lower())).strip()
+
+
+def vectorize(texts: Sequence[str], n_features: int) -> Features:
+    """字符 n-gram 计数哈希到 n_features 维，取 1 + log(tf) 后按行做 L2 归一化"""
+    indices: List[int] = []
+    values: List[float] = []
+    indptr = [0]
+    for text in texts:
+        padded = f"^{normalize(text)}$"
+        counts: Counter = Counter()
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                counts[zlib.crc32(padded[i:i + n].encode("utf-8")) % n_features] += 1
+        row = [1.0 + math.log(count) for count in counts.values()]
+        norm = math.sqrt(sum(v * v for v in row))
+        indices.extend(counts.keys())
+        values.extend(v / norm for v in row)
+        indptr.append(len(indices))
+    return (np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=np.float32),
+            np.asarray(indptr, dtype=np.int64))
+
+
+def _logits(features: Features, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    """整批一次计算：按行汇总各特征对应的权重行"""
+    indices, values, indptr = features
+    return np.add.reduceat(weights[indices] * values[:, None], indptr[:-1], axis=0) + bias
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def fit(features: Features, targets: np.ndarray, n_classes: int, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """全批量 Adam 训练 softmax 回归，按类别频率加权抵消样本不均衡"""
+    indices, values, indptr = features
+    n_samples = len(indptr) - 1
+    rows = np.repeat(np.arange(n_samples), np.diff(indptr))
+    counts = np.bincount(targets, minlength=n_classes)
+    sample_weight = (n_samples / (n_classes * np.maximum(counts, 1)))[targets] / n_samples
+    onehot = np.eye(n_classes, dtype=np.float32)[targets]
+
+    weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    params = [weights, bias]
+    moments = [[np.zeros_like(p), np.zeros_like(p)] for p in params]
+    beta1, beta2 = 0.9, 0.999
+    for step in range(1, EPOCHS + 1):
+        error = (_softmax(_logits(features, weights, bias)) - onehot) * sample_weight[:, None]
+        # 各类别的梯度按特征下标累加（bincount 比 np.add.at 快一个数量级）
+        contributions = values[:, None] * error[rows]
+        grad_w = L2 * weights + np.stack([
+            np.bincount(indices, weights=contributions[:, c], minlength=n_features) for c in range(n_classes)
+        ], axis=1).astype(np.float32)
+        grads = [grad_w, error.sum(axis=0)]
+        for param, grad, (m, v) in zip(params, grads, moments):
+            m *= beta1
+            m += (1 - beta1) * grad
+            v *= beta2
+            v += (1 - beta2) * grad * grad
+            param -= LEARNING_RATE * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+    return weights, bias
+
+
+def _nll(logits: np.ndarray, targets: np.ndarray, temperature: float) -> float:
+    probs = _softmax(logits / temperature)
+    return float(-np.log(probs[np.arange(len(targets)), targets] + 1e-12).mean())
+
+
+def calibration_error(probs: np.ndarray, targets: np.ndarray, bins: int = 10) -> float:
+    """期望校准误差（ECE）：各置信度区间内平均置信度与准确率之差的加权平均"""
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == targets
+    edges = np.linspace(0, 1, bins + 1)
+    error = 0.0
+    for low, high in zip(edges[:-1], edges[1:]):
+        mask = (confidence > low) & (confidence <= high)
+        if mask.any():
+            error += mask.mean() * abs(confidence[mask].mean() - correct[mask].mean())
+    return float(error)
+
+
+def load_examples(path: str) -> Tuple[List[str], List[str]]:
+    texts, intents = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["query"])
+                intents.append(record["intent"])
+    return texts, intents
+
+
+class IntentClassifier:
+    """意图分类器
+
+    模型不随代码提交：首次使用时按训练数据训练，并缓存到 model_path（以训练数据和超参数的摘要为键），
+    其他工作进程和下次启动直接加载。推理只有特征哈希和一次稀疏矩阵乘，批量输入在一次矩阵运算中完成。
+    """
+
+    def __init__(self, data_path: str, model_path: str, n_features: int):
+        self.data_path = data_path
+        self.model_path = model_path
+        self.n_features = n_features
+        self.labels: List[str] = []
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+        self.temperature = 1.0
+        self.metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"predictions": 0, "batches": 0, "total_us": 0.0, "max_batch_us": 0.0}
+
+    @property
+    def loaded(self) -> bool:
+        return self.weights is not None
+
+    def _digest(self) -> str:
+        digest = hashlib.sha256()
+        with open(self.data_path, "rb") as f:
+            digest.update(f.read())
+        digest.update(repr((MODEL_FORMAT, self.n_features, NGRAM_SIZES, EPOCHS, LEARNING_RATE, L2, HOLDOUT_EVERY)).encode())
+        return digest.hexdigest()
+
+    def load(self) -> None:
+        """加载缓存的模型；训练数据变化或缓存不存在时重新训练"""
+        with self._lock:
+            if self.loaded:
+                return
+            digest = self._digest()
+            if os.path.exists(self.model_path):
+                with np.load(self.model_path) as model:
+                    if str(model["digest"]) == digest:
+                        self._set(model["weights"], model["bias"], float(model["temperature"]),
+                                  [str(label) for label in model["labels"]],
+                                  json.loads(str(model["metrics"])))
+                        return
+            self._train(digest)
+
+    def _set(self, weights: np.ndarray, bias: np.ndarray, temperature: float,
+             labels: List[str], metrics: Dict[str, Any]) -> None:
+        self.weights, self.bias, self.temperature = weights, bias, temperature
+        self.labels, self.metrics = labels, metrics
+
+    def _train(self, digest: str) -> None:
+        started = time.perf_counter()
+        texts, intents = load_examples(self.data_path)
+        labels = sorted(set(intents))
+        targets = np.array([labels.index(intent) for intent in intents])
+
+        # 每类每 HOLDOUT_EVERY 条留出一条，用于选择温度和评估。温度只对在其余样本上训练的模型有效，
+        # 用全部样本重新训练会让模型更自信、温度失准，所以直接部署这个模型
+        seen: Counter = Counter()
+        holdout = np.zeros(len(texts), dtype=bool)
+        for i, intent in enumerate(intents):
+            holdout[i] = seen[intent] % HOLDOUT_EVERY == HOLDOUT_EVERY - 1
+            seen[intent] += 1
+        train_idx, held_idx = np.flatnonzero(~holdout), np.flatnonzero(holdout)
+        weights, bias = fit(vectorize([texts[i] for i in train_idx], self.n_features),
+                            targets[train_idx], len(labels), self.n_features)
+        held_logits = _logits(vectorize([texts[i] for i in held_idx], self.n_features), weights, bias)
+        held_targets = targets[held_idx]
+        temperature = float(min(TEMPERATURES, key=lambda t: _nll(held_logits, held_targets, t)))
+
+        metrics = {
+            "examples": len(texts),
+            "trained_on": len(train_idx),
+            "holdout": len(held_idx),
+            "holdout_accuracy": round(float((held_logits.argmax(axis=1) == held_targets).mean()), 4),
+            "holdout_ece_raw": round(calibration_error(_softmax(held_logits), held_targets), 4),
+            "holdout_ece": round(calibration_error(_softmax(held_logits / temperature), held_targets), 4),
+        }
+        metrics["train_seconds"] = round(time.perf_counter() - started, 3)
+        self._set(weights, bias, temperature, labels, metrics)
+
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        tmp_path = f"{self.model_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, weights=weights, bias=bias, temperature=temperature, labels=np.array(labels),
+                 digest=digest, metrics=json.dumps(metrics))
+        os.replace(tmp_path, self.model_path)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """返回 (len(texts), len(labels)) 的校准后概率"""
+        self.load()
+        started = time.perf_counter()
+        probs = _softmax(_logits(vectorize(texts, self.n_features), self.weights, self.bias) / self.temperature)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        self.stats["predictions"] += len(texts)
+        self.stats["batches"] += 1
+        self.stats["total_us"] += elapsed_us
+        self.stats["max_batch_us"] = max(self.stats["max_batch_us"], elapsed_us)
+        return probs
+
+    def classify_batch(self, texts: Sequence[str]) -> List[Prediction]:
+        if not texts:
+            return []
+        probs = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        return [
+            Prediction(self.labels[j], round(float(row[j]), 4),
+                       {label: round(float(p), 4) for label, p in zip(self.labels, row)})
+            for row, j in zip(probs, best)
+        ]
+
+    def classify(self, text: str) -> Prediction:
+        return self.classify_batch([text])[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            "loaded": self.loaded,
+            "labels": self.labels,
+            "temperature": round(self.temperature, 3),
+            **self.metrics,
+            "avg_batch_us": round(self.stats["total_us"] / batches, 1) if batches else 0.0,
+            "predictions": self.stats["predictions"],
+            "max_batch_us": round(self.stats["max_batch_us"], 1),
+        }
+
+
+intent_classifier = IntentClassifier(
+    data_path=settings.INTENT_TRAINING_DATA,
+    model_path=settings.INTENT_MODEL_PATH,
+    n_features=settings.INTENT_HASH_FEATURES,
+)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="训练并评估本地意图分类器")
+    parser.add_argument("data", nargs="?", default=settings.INTENT_TRAINING_DATA, help="训练数据 JSONL 文件")
+    parser.add_argument("-o", "--model", default=settings.INTENT_MODEL_PATH, help="模型缓存文件")
+    parser.add_argument("-q", "--query", action="append", default=[], help="要分类的语句，可重复")
+    args = parser.parse_args(argv)
+
+    classifier = IntentClassifier(args.data, args.model, settings.INTENT_HASH_FEATURES)
+    classifier.load()
+    for prediction in classifier.classify_batch(args.query):
+        print(json.dumps(prediction._asdict(), ensure_ascii=False))
+
+    texts, _ = load_examples(args.data)
+    started = time.perf_counter()
+    for text in texts:
+        classifier.classify(text)
+    single_us = (time.perf_counter() - started) / len(texts) * 1e6
+    started = time.perf_counter()
+    classifier.classify_batch(texts)
+    batch_us = (time.perf_counter() - started) / len(texts) * 1e6
+    print(json.dumps({**classifier.get_stats(), "single_us": round(single_us, 1),
+                      "batch_us_per_query": round(batch_us, 1)}, ensure_ascii=False, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
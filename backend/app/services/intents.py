@@ -0,0 +1,177 @@
+"""语音意图的规则解析与置信度调整
+
+不依赖 FastAPI 和路由模块，批量解析的工作进程只需导入本模块和分类器。
+"""
+import re
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.intent_classifier import Prediction
+
+# 支出统计的时间说法 -> 统计区间
+SPENDING_PERIOD_WORDS = [
+    ("上个月", "last_month"),
+    ("上月", "last_month"),
+    ("今天", "today"),
+    ("今年", "this_year"),
+    ("最近一周", "last_7_days"),
+    ("最近7天", "last_7_days"),
+    ("最近30天", "last_30_days"),
+    ("最近一个月", "last_30_days"),
+]
+
+
+def _tool_intent(intent: str, tool_id: str, arguments: Dict[str, Any], confirmation_message: str,
+                 requires_confirmation: bool = False) -> Dict[str, Any]:
+    return {
+        "intent": intent,
+        "requires_confirmation": requires_confirmation,
+        "tool_calls": [{
+            "id": tool_id,
+            "function": {
+                "name": tool_id,
+                "arguments": arguments
+            }
+        }],
+        "confirmation_message": confirmation_message
+    }
+
+
+def _currency(query: str, default: Optional[str] = "SOL") -> Optional[str]:
+    if "usdc" in query:
+        return "USDC"
+    if "sol" in query:
+        return "SOL"
+    return default
+
+
+def spending_intent(query: str, counterparty: Optional[str] = None) -> Dict[str, Any]:
+    period = next((p for word, p in SPENDING_PERIOD_WORDS if word in query), "this_month")
+    arguments = {"period": period}
+    if counterparty:
+        arguments["counterparty"] = counterparty
+    currency = _currency(query, default=None)
+    if currency:
+        arguments["currency"] = currency
+    return _tool_intent("query_spending", "query_spending", arguments, "您要查询支出统计，是否确认？")
+
+
+def portfolio_intent(query: str) -> Dict[str, Any]:
+    return _tool_intent("query_portfolio", "query_portfolio", {}, "您要查询全部资产，是否确认？")
+
+
+def balance_intent(query: str) -> Dict[str, Any]:
+    currency = _currency(query)
+    return _tool_intent(
+        "query_balance", "query_balance", {"currency": currency}, f"您要查询 {currency} 余额，是否确认？"
+    )
+
+
+def transactions_intent(query: str) -> Dict[str, Any]:
+    return _tool_intent(
+        "query_transactions", "query_transactions", {"limit": 10, "offset": 0}, "您要查看交易记录，是否确认？"
+    )
+
+
+# 不需要提取参数、可以直接由分类结果构造的意图
+INTENT_BUILDERS = {
+    "query_spending": spending_intent,
+    "query_portfolio": portfolio_intent,
+    "query_balance": balance_intent,
+    "query_transactions": transactions_intent,
+}
+
+# 分类器识别出意图但规则未能提取参数时的追问
+CLARIFY_MESSAGES = {
+    "transfer": "请告诉我收款人和金额，例如：转账给 Alice 1 SOL",
+}
+
+DEFAULT_MESSAGE = "您好！我是您的语音助手，有什么可以帮助您的吗？"
+
+
+def parse_voice_intent(query: str) -> Dict[str, Any]:
+    """解析语音意图"""
+    query = query.lower().strip()
+    
+    # 支出统计意图
+    spending_match = re.search(
+        r'(?:给|向)\s*([a-zA-Z0-9\u4e00-\u9fa5]{2,20}?)\s*(?:一共|总共|共)?(?:转账?|付|发)(?:了|过)\s*(?:多少|几)', query
+    )
+    if spending_match or re.search(r'(?:花|转|付)了多少|支出', query):
+        return spending_intent(query, spending_match.group(1) if spending_match else None)
+    
+    # 转账意图
+    transfer_patterns = [
+        r'(?:转账|发送|转给|给)\s*([a-zA-Z0-9\u4e00-\u9fa5]{2,20})\s*(\d+(?:\.\d+)?)\s*(?:个)?(?:sol|usdc)?',
+        r'向\s*([a-zA-Z0-9\u4e00-\u9fa5]{2,20})\s*转账\s*(\d+(?:\.\d+)?)\s*(?:个)?(?:sol|usdc)?'
+    ]
+    
+    for pattern in transfer_patterns:
+        match = re.search(pattern, query)
+        if match:
+            recipient = match.group(1)
+            amount = float(match.group(2))
+            currency = "USDC" if "usdc" in query else "SOL"  # 默认为 SOL
+            
+            return _tool_intent(
+                "transfer", "transfer_sol",
+                {"recipient": recipient, "amount": amount, "currency": currency},
+                f"您要向 {recipient} 转账 {amount} {currency}，是否确认？",
+                requires_confirmation=True
+            )
+    
+    # 全部资产查询意图
+    if any(word in query for word in ["资产", "持仓", "所有余额", "全部余额", "portfolio"]):
+        return portfolio_intent(query)
+    
+    # 余额查询意图
+    if any(word in query for word in ["余额", "账户", "钱包", "balance"]):
+        return balance_intent(query)
+    
+    # 交易记录查询
+    if any(word in query for word in ["交易记录", "历史记录", "交易历史"]):
+        return transactions_intent(query)
+    
+    # 默认为直接响应
+    return {
+        "intent": "direct_response",
+        "requires_confirmation": False,
+        "message": DEFAULT_MESSAGE,
+        "tool_calls": None
+    }
+
+
+def apply_confidence(query: str, intent_data: Dict[str, Any], prediction: Optional[Prediction]) -> Dict[str, Any]:
+    """结合分类器置信度调整规则解析结果
+
+    - 规则命中：置信度取分类器对该意图的概率，低于 INTENT_CONFIRM_CONFIDENCE 时要求确认
+    - 规则未命中：只有分类器置信度不低于 INTENT_CLASSIFIER_ONLY_CONFIDENCE 时才改判，不需要提取参数的意图
+      直接构造，需要参数的返回 clarify 意图追问（置信度为被追问意图的概率）；否则保持 direct_response，
+      置信度取分类器对 direct_response 的概率
+    - 置信度低于 INTENT_MIN_CONFIDENCE 时标记 low_confidence，由调用方走兜底
+    """
+    if prediction is None:
+        return intent_data
+    
+    confidence = prediction.scores.get(intent_data["intent"], 0.0)
+    if intent_data["intent"] == "direct_response" and prediction.intent != "direct_response" \
+            and prediction.confidence >= settings.INTENT_CLASSIFIER_ONLY_CONFIDENCE:
+        builder = INTENT_BUILDERS.get(prediction.intent)
+        if builder is not None:
+            intent_data = builder(query.lower().strip())
+            confidence = prediction.confidence
+        elif prediction.intent in CLARIFY_MESSAGES:
+            intent_data = {
+                "intent": "clarify",
+                "requires_confirmation": False,
+                "message": CLARIFY_MESSAGES[prediction.intent],
+                "tool_calls": None
+            }
+            confidence = prediction.confidence
+    intent_data = {**intent_data, "confidence": confidence}
+    
+    if confidence < settings.INTENT_MIN_CONFIDENCE:
+        intent_data["low_confidence"] = True
+    if intent_data.get("tool_calls") and confidence < settings.INTENT_CONFIRM_CONFIDENCE:
+        intent_data["requires_confirmation"] = True
+    return intent_data
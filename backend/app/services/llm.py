@@ -0,0 +1,261 @@
+import asyncio
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.circuit_breaker import CircuitBreaker, get_breaker
+from app.core.config import settings
+
+SYSTEM_PROMPT = (
+    "你是 Solana Earphone 语音助手的意图解析器。"
+    "根据用户的语音指令选择合适的工具并给出参数；"
+    "如果没有合适的工具，直接用一句简短的中文回答。"
+)
+
+
+def normalize_query(query: str) -> str:
+    """归一化查询文本：全角转半角、小写、去除空白和标点"""
+    text = unicodedata.normalize("NFKC", query).lower()
+    return "".join(
+        ch for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith("P")
+    )
+
+
+def build_tool_specs(tools: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """将工具目录转换为 function calling 格式"""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool["id"],
+                "description": f"{tool['name']}：{tool['description']}",
+                "parameters": tool["parameters"],
+            },
+        }
+        for tool in tools
+    ]
+
+
+class LLMInterpreter:
+    """规则未命中时的大模型意图解析
+
+    - 以归一化查询为键的 LRU 缓存，相同说法只调用一次模型
+    - 相同查询的并发请求合并为一次上游调用
+    - 每次解析有严格的时间预算，超时立即放弃，上游调用在后台完成后仍会写入缓存
+    - 使用流式响应增量拼接工具调用
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        timeout_ms: float,
+        request_timeout: float,
+        cache_size: int,
+        cache_ttl: float,
+        breaker: CircuitBreaker,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout_ms / 1000
+        self.request_timeout = request_timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.breaker = breaker
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.stats = {"cache_hits": 0, "coalesced": 0, "calls": 0, "timeouts": 0, "errors": 0,
+                      "short_circuited": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.LLM_FALLBACK_ENABLED and bool(self.base_url)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.request_timeout,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _on_done(self, key: str, started: float, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            self.breaker.record_cancelled()
+            return
+        if task.exception() is not None:
+            self.breaker.record_failure()
+            self.stats["errors"] += 1
+            return
+        self.breaker.record_success(time.monotonic() - started)
+        result = task.result()
+        if result is not None:
+            self._cache_put(key, result)
+
+    async def interpret(self, query: str, tools: Sequence[Dict[str, Any]],
+                        catalog_version: int = 0) -> Optional[Dict[str, Any]]:
+        """解析意图，超时或失败时返回 None；工具目录版本变化后旧的缓存结果不再命中"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        key = f"{catalog_version}:{normalized}"
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            # 上游持续失败或变慢时直接回退，不再占用时间预算
+            if not self.breaker.allow():
+                self.stats["short_circuited"] += 1
+                return None
+            self.stats["calls"] += 1
+            started = time.monotonic()
+            task = asyncio.ensure_future(self._complete(query, tools))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, started, t))
+        else:
+            self.stats["coalesced"] += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return None
+        except Exception:
+            return None
+
+    async def _complete(self, query: str, tools: Sequence[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        payload = {
+            "model": self.model,
+            "stream": True,
+            "temperature": 0,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": query},
+            ],
+            "tools": build_tool_specs(tools),
+            "tool_choice": "auto",
+        }
+
+        content: List[str] = []
+        calls: Dict[int, Dict[str, Any]] = {}
+        async with self._get_client().stream("POST", "/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choice = json.loads(data)["choices"][0]
+                delta = choice.get("delta") or {}
+                if delta.get("content"):
+                    content.append(delta["content"])
+                for call in delta.get("tool_calls") or []:
+                    slot = calls.setdefault(call.get("index", 0), {"name": "", "arguments": []})
+                    function = call.get("function") or {}
+                    if function.get("name"):
+                        slot["name"] = function["name"]
+                    if function.get("arguments"):
+                        slot["arguments"].append(function["arguments"])
+                if choice.get("finish_reason"):
+                    break
+
+        return self._to_intent(content, calls, tools)
+
+    def _to_intent(
+        self,
+        content: List[str],
+        calls: Dict[int, Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        tools_by_id = {tool["id"]: tool for tool in tools}
+        tool_calls = []
+        for index in sorted(calls):
+            name = calls[index]["name"]
+            if name not in tools_by_id:
+                continue
+            arguments = json.loads("".join(calls[index]["arguments"]) or "{}")
+            tool_calls.append({
+                "id": name,
+                "function": {"name": name, "arguments": arguments},
+            })
+
+        if tool_calls:
+            tool = tools_by_id[tool_calls[0]["id"]]
+            # 大模型给出的工具调用一律需要用户确认
+            return {
+                "intent": "transfer" if tool["id"] == "transfer_sol" else tool["id"],
+                "requires_confirmation": True,
+                "tool_calls": tool_calls,
+                "confirmation_message": f"您要执行{tool['name']}，是否确认？",
+                "confidence": None,
+            }
+
+        message = "".join(content).strip()
+        if not message:
+            return None
+        return {
+            "intent": "direct_response",
+            "requires_confirmation": False,
+            "message": message,
+            "tool_calls": None,
+            "confidence": None,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "cache_entries": len(self._cache),
+            "inflight": len(self._inflight),
+            "circuit": self.breaker.state,
+            **self.stats,
+        }
+
+
+llm_interpreter = LLMInterpreter(
+    base_url=settings.LLM_BASE_URL,
+    api_key=settings.OPENAI_API_KEY,
+    model=settings.LLM_MODEL,
+    timeout_ms=settings.LLM_TIMEOUT_MS,
+    request_timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+    cache_size=settings.LLM_CACHE_SIZE,
+    cache_ttl=settings.LLM_CACHE_TTL_SECONDS,
+    breaker=get_breaker("llm"),
+)
@@ -0,0 +1,92 @@
+"""本地大模型桩服务，兼容 OpenAI chat completions 的工具调用和流式响应
+
+启动：uvicorn app.services.llm_stub:app --port 8090
+然后设置 LLM_FALLBACK_ENABLED=True、LLM_BASE_URL=http://127.0.0.1:8090/v1
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="LLM Stub")
+
+# 模拟上游延迟（毫秒）
+STUB_DELAY_MS = float(os.getenv("LLM_STUB_DELAY_MS", "50"))
+
+
+def choose_tool(query: str, tool_names: List[str]) -> Optional[Dict[str, Any]]:
+    """用简单关键词模拟模型的工具选择"""
+    city = re.search(r"([一-龥]{2,4}?)(?:的)?天气", query)
+    if city and "weather_query" in tool_names:
+        return {"name": "weather_query", "arguments": {"city": city.group(1)}}
+    if re.search(r"(多少钱|资产|还剩)", query) and "query_balance" in tool_names:
+        return {"name": "query_balance", "arguments": {"currency": "SOL"}}
+    if re.search(r"(最近.*(转|付)|账单)", query) and "query_transactions" in tool_names:
+        return {"name": "query_transactions", "arguments": {"limit": 10, "offset": 0}}
+    return None
+
+
+def chunk(completion_id: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    await asyncio.sleep(STUB_DELAY_MS / 1000)
+
+    query = next((m["content"] for m in reversed(body["messages"]) if m["role"] == "user"), "")
+    tool_names = [t["function"]["name"] for t in body.get("tools", [])]
+    tool = choose_tool(query, tool_names)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    if not body.get("stream"):
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        if tool:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+                "type": "function",
+                "function": {"name": tool["name"], "arguments": json.dumps(tool["arguments"], ensure_ascii=False)},
+            }]
+        else:
+            message["content"] = "抱歉，我还不能处理这个请求。"
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "model": "stub",
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool else "stop"}],
+        }
+
+    async def events():
+        if tool:
+            arguments = json.dumps(tool["arguments"], ensure_ascii=False)
+            yield chunk(completion_id, {"tool_calls": [{
+                "index": 0,
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+                "type": "function",
+                "function": {"name": tool["name"], "arguments": ""},
+            }]})
+            # 分两段发送参数，模拟增量输出
+            middle = len(arguments) // 2
+            for part in (arguments[:middle], arguments[middle:]):
+                yield chunk(completion_id, {"tool_calls": [{"index": 0, "function": {"arguments": part}}]})
+            yield chunk(completion_id, {}, "tool_calls")
+        else:
+            for part in ("抱歉，", "我还不能处理这个请求。"):
+                yield chunk(completion_id, {"content": part})
+            yield chunk(completion_id, {}, "stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.settings_store import settings_store
+from app.services.alerts import alert_engine
+
+logger = logging.getLogger(__name__)
+
+# 事件类别 -> 控制是否推送的通知设置
+CATEGORY_SETTINGS = {
+    "transaction": "transaction_notifications",
+    "security": "security_alerts",
+    "price_alert": "price_alerts",
+}
+CATEGORIES: FrozenSet[str] = frozenset(CATEGORY_SETTINGS)
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+# 等待广播到 Redis 的事件数上限，Redis 变慢时丢弃新事件而不阻塞发布方
+FANOUT_QUEUE_SIZE = 10000
+# 订阅断开后的重连间隔（秒），指数退避到上限
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+
+# (事件 ID, 类别, 已编码的 SSE 帧)
+Event = Tuple[int, str, bytes]
+
+
+def encode_event(event_id: Optional[int], category: str, data: Dict[str, Any]) -> bytes:
+    """编码为 SSE 帧，同一事件推给多个连接时只编码一次
+
+    event_id 为 None 时不带 id 字段，浏览器保留原来的 Last-Event-ID，重连补发不受影响。
+    """
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {category}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """单个推送连接
+
+    队列有界，写满时丢弃最旧的事件并记下丢弃数，下次发送时通知客户端重新拉取。
+    """
+
+    __slots__ = ("user_id", "topics", "maxsize", "queue", "wakeup", "dropped",
+                 "last_sent", "heartbeat_due", "closed")
+
+    def __init__(self, user_id: Any, topics: FrozenSet[str], maxsize: int):
+        self.user_id = user_id
+        self.topics = topics
+        self.maxsize = maxsize
+        self.queue: Deque[bytes] = deque()
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.last_sent = time.monotonic()
+        self.heartbeat_due = False
+        self.closed = False
+
+    def offer(self, frame: bytes) -> None:
+        if len(self.queue) >= self.maxsize:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(frame)
+        self.wakeup.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
+
+
+class NotificationHub:
+    """按用户扇出的服务端推送中心
+
+    - 每个用户对应一组连接，发布时只遍历该用户的连接
+    - 事件编码一次，所有连接共享同一份字节
+    - 心跳由一个后台任务统一发起，只唤醒空闲超过心跳间隔的连接，不为每个连接单独计时
+    - 每个用户保留最近若干事件，断线重连时按 Last-Event-ID 补发
+    - 多个工作进程时通过 Redis 频道互相转发事件（fanout_enabled），用户连到任意进程都能收到；
+      未开启时连接只能收到本进程发布的事件，只能单进程运行
+
+    事件 ID 取微秒时间戳（同一进程内严格递增），不同进程发布的事件也能按 Last-Event-ID 比较先后。
+    """
+
+    CHANNEL = "notifications:events"
+
+    def __init__(self, queue_size: int, heartbeat_seconds: float, replay_size: int,
+                 max_connections: int, max_connections_per_user: int,
+                 redis_url: str = "", fanout_enabled: bool = False):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.replay_size = replay_size
+        self.max_connections = max_connections
+        self.max_connections_per_user = max_connections_per_user
+        self.redis_url = redis_url
+        self.fanout_enabled = fanout_enabled
+        # 区分自己发布的事件，订阅到时不重复投递
+        self.origin = uuid.uuid4().hex
+        self._subscribers: Dict[Any, Set[Subscriber]] = defaultdict(set)
+        self._recent: Dict[Any, Deque[Event]] = defaultdict(lambda: deque(maxlen=self.replay_size))
+        self._last_id = 0
+        self._connections = 0
+        self._task: Optional[asyncio.Task] = None
+        self._redis = None
+        self._outbox: Optional["asyncio.Queue[str]"] = None
+        self._fanout_tasks: List[asyncio.Task] = []
+        self.listening = False
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "muted": 0, "rejected": 0,
+                      "forwarded": 0, "received": 0, "fanout_dropped": 0, "fanout_errors": 0, "reconnects": 0}
+
+    def _enabled(self, user_id: Any, category: str) -> bool:
+        notifications = settings_store.get(user_id).get("notifications", {})
+        return notifications.get(CATEGORY_SETTINGS[category], True)
+
+    def publish(self, user_id: Any, category: str, data: Dict[str, Any]) -> Optional[int]:
+        """向用户推送事件，返回事件 ID；用户关闭了该类通知时返回 None"""
+        if category not in CATEGORIES:
+            raise ValueError(f"未知的通知类别: {category}")
+        if not self._enabled(user_id, category):
+            self.stats["muted"] += 1
+            return None
+
+        event_id = self._next_id()
+        frame = encode_event(event_id, category, {**data, "ts": time.time()})
+        self.stats["published"] += 1
+        self._deliver(user_id, event_id, category, frame)
+        if self._outbox is not None:
+            message = json.dumps({"origin": self.origin, "user_id": user_id, "id": event_id,
+                                  "category": category, "frame": frame.decode("utf-8")}, ensure_ascii=False)
+            try:
+                self._outbox.put_nowait(message)
+            except asyncio.QueueFull:
+                self.stats["fanout_dropped"] += 1
+        return event_id
+
+    def _next_id(self) -> int:
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def _deliver(self, user_id: Any, event_id: int, category: str, frame: bytes) -> None:
+        """投递给本进程中该用户的连接，并保留用于重连补发"""
+        self._recent[user_id].append((event_id, category, frame))
+        for subscriber in self._subscribers.get(user_id, ()):
+            if category in subscriber.topics:
+                subscriber.offer(frame)
+                self.stats["delivered"] += 1
+
+    def admit(self) -> bool:
+        """检查是否还能接受新连接，已达全局上限时计入 rejected"""
+        if self._connections >= self.max_connections:
+            self.stats["rejected"] += 1
+            return False
+        return True
+
+    def subscribe(self, user_id: Any, topics: Optional[Iterable[str]] = None,
+                  last_event_id: Optional[int] = None) -> Optional[Subscriber]:
+        """注册连接；超过全局连接上限时返回 None，超过单用户上限时关闭该用户最早的连接"""
+        if self._connections >= self.max_connections:
+            self.stats["rejected"] += 1
+            return None
+
+        subscriber = Subscriber(user_id, frozenset(topics) & CATEGORIES if topics else CATEGORIES, self.queue_size)
+        user_subscribers = self._subscribers[user_id]
+        active = [s for s in user_subscribers if not s.closed]
+        if len(active) >= self.max_connections_per_user:
+            min(active, key=lambda s: s.last_sent).close()
+        user_subscribers.add(subscriber)
+        self._connections += 1
+
+        if last_event_id is not None:
+            for event_id, category, frame in self._recent.get(user_id, ()):
+                if event_id > last_event_id and category in subscriber.topics:
+                    subscriber.offer(frame)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        user_subscribers = self._subscribers.get(subscriber.user_id)
+        if user_subscribers is None or subscriber not in user_subscribers:
+            return
+        user_subscribers.discard(subscriber)
+        self._connections -= 1
+        if not user_subscribers:
+            del self._subscribers[subscriber.user_id]
+
+    async def stream(self, user_id: Any, topics: Optional[Iterable[str]] = None,
+                     last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """按 SSE 格式输出用户的事件
+
+        连接在响应开始输出时才注册、在生成器结束时注销：客户端在响应开始前断开时生成器不会启动，
+        不会留下订阅和连接计数。
+        """
+        subscriber = self.subscribe(user_id, topics=topics, last_event_id=last_event_id)
+        if subscriber is None:
+            return
+        try:
+            yield f"retry: {int(self.heartbeat_seconds * 1000)}\n\n".encode("ascii")
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                if subscriber.closed:
+                    return
+                frames = []
+                if subscriber.dropped:
+                    self.stats["dropped"] += subscriber.dropped
+                    frames.append(encode_event(None, "dropped", {"count": subscriber.dropped}))
+                    subscriber.dropped = 0
+                frames.extend(subscriber.queue)
+                subscriber.queue.clear()
+                if not frames and subscriber.heartbeat_due:
+                    frames.append(HEARTBEAT_FRAME)
+                subscriber.heartbeat_due = False
+                if frames:
+                    subscriber.last_sent = time.monotonic()
+                    yield b"".join(frames)
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def start(self, client=None) -> None:
+        """启动心跳任务；开启跨进程转发时连接 Redis 并启动转发和订阅任务
+
+        client 为 Redis 客户端（测试时可传入），不传时按 redis_url 创建。
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None:
+            self._task = loop.create_task(self._heartbeat_loop())
+        if not self.fanout_enabled:
+            if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+                logger.warning("未开启 NOTIFY_FANOUT_ENABLED，多个工作进程时推送只能送达连接在发布进程上的客户端")
+            return
+        if self._redis is not None:
+            return
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(self.redis_url, decode_responses=True, socket_connect_timeout=2)
+        self._redis = client
+        self._outbox = asyncio.Queue(maxsize=FANOUT_QUEUE_SIZE)
+        self._fanout_tasks = [loop.create_task(self._forward_loop()), loop.create_task(self._listen_loop())]
+
+    async def stop(self) -> None:
+        for task in [self._task, *self._fanout_tasks]:
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._fanout_tasks = []
+        self._outbox = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+        for user_subscribers in list(self._subscribers.values()):
+            for subscriber in list(user_subscribers):
+                subscriber.close()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds / 2)
+            idle_before = time.monotonic() - self.heartbeat_seconds
+            for user_subscribers in self._subscribers.values():
+                for subscriber in user_subscribers:
+                    if subscriber.last_sent <= idle_before:
+                        subscriber.heartbeat_due = True
+                        subscriber.wakeup.set()
+
+    async def _forward_loop(self) -> None:
+        """把本进程发布的事件广播给其他进程；Redis 不可用时丢弃并计数，不影响本进程推送"""
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self._redis.publish(self.CHANNEL, message)
+                self.stats["forwarded"] += 1
+            except Exception as e:
+                self.stats["fanout_errors"] += 1
+                logger.warning("通知转发失败: %s", e)
+
+    async def _listen_loop(self) -> None:
+        """订阅其他进程发布的事件，连接断开后按指数退避重连"""
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                self.listening = True
+                delay = RECONNECT_DELAY_SECONDS
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._on_remote(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("通知订阅断开，%.0f 秒后重连: %s", delay, e)
+            finally:
+                self.listening = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            self.stats["reconnects"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    def _on_remote(self, data: str) -> None:
+        try:
+            event = json.loads(data)
+            if event["origin"] == self.origin:
+                return
+            user_id, event_id, category, frame = event["user_id"], event["id"], event["category"], event["frame"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("忽略无法解析的通知消息")
+            return
+        self.stats["received"] += 1
+        self._deliver(user_id, event_id, category, frame.encode("utf-8"))
+
+    def on_price_alerts(self, triggered: List[Dict[str, Any]]) -> None:
+        """价格提醒触发后推送给对应用户"""
+        for event in triggered:
+            data = {k: v for k, v in event.items() if k != "user_id"}
+            self.publish(event["user_id"], "price_alert", data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "connections": self._connections,
+            "users": len(self._subscribers),
+            "heartbeat_running": self._task is not None,
+            "fanout": self.fanout_enabled,
+            "fanout_listening": self.listening,
+            **self.stats,
+        }
+
+
+notification_hub = NotificationHub(
+    queue_size=settings.NOTIFY_QUEUE_SIZE,
+    heartbeat_seconds=settings.NOTIFY_HEARTBEAT_SECONDS,
+    replay_size=settings.NOTIFY_REPLAY_SIZE,
+    max_connections=settings.NOTIFY_MAX_CONNECTIONS,
+    max_connections_per_user=settings.NOTIFY_MAX_CONNECTIONS_PER_USER,
+    redis_url=settings.REDIS_URL,
+    fanout_enabled=settings.NOTIFY_FANOUT_ENABLED,
+)
+alert_engine.subscribe(notification_hub.on_price_alerts)
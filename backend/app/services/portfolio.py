@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.core.circuit_breaker import LastGoodCache
+from app.core.config import settings
+from app.services.prices import price_cache
+from app.services.solana_rpc import (
+    LAMPORTS_PER_SOL, TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID, RPCError, SolanaRPC, solana_rpc
+)
+
+# 常见 SPL 代币的 mint 地址 -> 符号
+KNOWN_MINTS = {
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC",
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCE8BenwNYB": "USDT",
+    "2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo": "PYUSD",
+}
+
+# 代币账户分属两个程序，需要分别查询
+TOKEN_PROGRAM_IDS = (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+
+
+# 上游不可用时返回的最近一次链上结果
+_last_good: LastGoodCache[Tuple[Dict[str, Any], List[Dict[str, Any]]]] = LastGoodCache()
+
+
+def _asset(currency: str, balance: float, **extra: Any) -> Dict[str, Any]:
+    price = price_cache.get(currency)
+    return {
+        "currency": currency,
+        "balance": balance,
+        "price": price,
+        "usd_value": round(balance * price, 6) if price is not None else None,
+        "price_stale": price is not None and price_cache.is_stale(currency, settings.PRICE_STALE_SECONDS),
+        **extra,
+    }
+
+
+def build_portfolio(owner: str, balance_result: Dict[str, Any],
+                    token_results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """将 getBalance 和各代币程序的 getTokenAccountsByOwner 结果与缓存价格合并"""
+    assets: List[Dict[str, Any]] = [_asset("SOL", balance_result["value"] / LAMPORTS_PER_SOL, decimals=9)]
+
+    # 同一 mint 可能有多个代币账户，按 mint 汇总
+    tokens: Dict[str, Dict[str, Any]] = {}
+    accounts = (account for token_result in token_results for account in token_result["value"])
+    for account in accounts:
+        info = account["account"]["data"]["parsed"]["info"]
+        amount = info["tokenAmount"]
+        entry = tokens.setdefault(info["mint"], {"raw": 0, "decimals": amount["decimals"], "accounts": 0})
+        entry["raw"] += int(amount["amount"])
+        entry["accounts"] += 1
+
+    for mint, entry in sorted(tokens.items()):
+        if entry["raw"] == 0:
+            continue
+        symbol = KNOWN_MINTS.get(mint, mint[:4] + "…" + mint[-4:])
+        assets.append(_asset(
+            symbol, entry["raw"] / 10 ** entry["decimals"],
+            decimals=entry["decimals"], mint=mint, accounts=entry["accounts"]
+        ))
+
+    priced = [asset["usd_value"] for asset in assets if asset["usd_value"] is not None]
+    return {
+        "address": owner,
+        "slot": balance_result["context"]["slot"],
+        "assets": assets,
+        "total_usd_value": round(sum(priced), 2),
+        "unpriced_assets": sum(1 for asset in assets if asset["usd_value"] is None),
+    }
+
+
+async def fetch_portfolio(owner: str, rpc: SolanaRPC = solana_rpc) -> Dict[str, Any]:
+    """一次批量 RPC 获取 SOL 余额和全部 SPL Token / Token-2022 代币余额
+
+    RPC 失败或熔断时使用该地址最近一次成功的链上结果（按当前价格重新估值），并标记 stale。
+    """
+    config = {"commitment": rpc.commitment}
+
+    async def load() -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        balance_result, *token_results = await rpc.batch([
+            ("getBalance", [owner, config]),
+            *(("getTokenAccountsByOwner", [owner, {"programId": program_id}, {**config, "encoding": "jsonParsed"}])
+              for program_id in TOKEN_PROGRAM_IDS),
+        ])
+        return balance_result, token_results
+
+    (balance_result, token_results), stale = await _last_good.fetch(owner, load, fallback_on=(RPCError,))
+    portfolio = build_portfolio(owner, balance_result, token_results)
+    portfolio["stale"] = stale or any(asset["price_stale"] for asset in portfolio["assets"])
+    return portfolio
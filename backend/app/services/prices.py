@@ -0,0 +1,95 @@
+import asyncio
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+PriceListener = Callable[[str, float], None]
+
+
+class PriceCache:
+    """最新价格缓存，价格更新时通知订阅者"""
+
+    def __init__(self, initial: Dict[str, float]):
+        self._prices = dict(initial)
+        self._updated_at = {currency: time.time() for currency in initial}
+        self._listeners: List[PriceListener] = []
+
+    def get(self, currency: str) -> Optional[float]:
+        return self._prices.get(currency.upper())
+
+    def is_stale(self, currency: str, max_age: float) -> bool:
+        """价格超过 max_age 秒未更新（行情源不可用）"""
+        updated_at = self._updated_at.get(currency.upper())
+        return updated_at is None or time.time() - updated_at > max_age
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            currency: {"price": price, "updated_at": self._updated_at[currency]}
+            for currency, price in self._prices.items()
+        }
+
+    def subscribe(self, listener: PriceListener) -> None:
+        self._listeners.append(listener)
+
+    def update(self, currency: str, price: float) -> None:
+        currency = currency.upper()
+        self._prices[currency] = price
+        self._updated_at[currency] = time.time()
+        for listener in self._listeners:
+            listener(currency, price)
+
+
+class SimulatedPriceFeed:
+    """本地模拟行情：对非稳定币做几何随机游走，稳定币按原价刷新"""
+
+    def __init__(self, cache: PriceCache, interval: float, volatility: float,
+                 currencies: Optional[List[str]] = None, stablecoins: Optional[List[str]] = None):
+        self.cache = cache
+        self.interval = interval
+        self.volatility = volatility
+        self.currencies = currencies or ["SOL"]
+        self.stablecoins = stablecoins or ["USDC"]
+        self._task: Optional[asyncio.Task] = None
+
+    def tick(self) -> None:
+        """生成一次行情"""
+        for currency in self.currencies:
+            price = self.cache.get(currency)
+            if price is None:
+                continue
+            shock = random.gauss(0, self.volatility)
+            self.cache.update(currency, round(price * math.exp(shock), 6))
+        for currency in self.stablecoins:
+            price = self.cache.get(currency)
+            if price is not None:
+                self.cache.update(currency, price)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.tick()
+
+
+price_cache = PriceCache({"SOL": 20.5, "USDC": 1.0})
+
+price_feed = SimulatedPriceFeed(
+    price_cache,
+    interval=settings.PRICE_FEED_INTERVAL_SECONDS,
+    volatility=settings.PRICE_FEED_VOLATILITY,
+)
@@ -0,0 +1,173 @@
+"""按采集日志回放流量并对比延迟
+
+用法：python -m app.services.replay var/capture --speed 2
+     python -m app.services.replay var/capture --base-url http://localhost:8001
+
+默认在进程内驱动 main:app（会执行应用的启动和停止钩子）；--speed 为回放倍速，0 表示不保持原始节奏、尽快发送。
+采集时令牌已被清除，回放时按记录中的用户声明重新签发访问令牌。
+"""
+import argparse
+import asyncio
+import base64
+import glob
+import gzip
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.core.security import create_access_token
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """读取采集目录或单个分段文件，按请求时间排序"""
+    files = sorted(glob.glob(os.path.join(path, "capture-*.jsonl.gz"))) if os.path.isdir(path) else [path]
+    records = []
+    for name in files:
+        with gzip.open(name, "rt", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Replayer:
+    """按原始时间间隔（可加速）并发回放请求"""
+
+    def __init__(self, client: httpx.AsyncClient, speed: float, concurrency: int):
+        self.client = client
+        self.speed = speed
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._tokens: Dict[str, str] = {}
+        self.results: List[Dict[str, Any]] = []
+
+    def _token_for(self, claims: Dict[str, Any]) -> str:
+        key = json.dumps(claims, sort_keys=True)
+        if key not in self._tokens:
+            self._tokens[key] = create_access_token(claims)
+        return self._tokens[key]
+
+    def _build_request(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {k: v for k, v in record["headers"].items() if k not in ("host", "content-length")}
+        if record.get("auth"):
+            headers["authorization"] = f"Bearer {self._token_for(record['auth'])}"
+        body = record.get("body")
+        encoding = record.get("body_encoding")
+        content = None
+        if encoding in ("json", "form"):
+            content = body.encode("utf-8")
+        elif encoding == "base64":
+            content = base64.b64decode(body)
+        # redacted：采集时无法清洗的请求体只记录了摘要，回放时不带请求体
+        url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        return {"method": record["method"], "url": url, "headers": headers, "content": content}
+
+    async def _send(self, record: Dict[str, Any]) -> None:
+        async with self.semaphore:
+            request = self._build_request(record)
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(**request)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            self.results.append({
+                "route": f"{record['method']} {record['path']}",
+                "recorded_ms": record["latency_ms"],
+                "replayed_ms": (time.perf_counter() - started) * 1000,
+                "recorded_status": record["status"],
+                "replayed_status": status,
+            })
+
+    async def run(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        t0 = records[0]["t"]
+        started = time.perf_counter()
+        tasks = []
+        for record in records:
+            if self.speed > 0:
+                delay = (record["t"] - t0) / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._send(record)))
+        await asyncio.gather(*tasks)
+
+    def report(self) -> Dict[str, Any]:
+        routes: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for result in self.results:
+            routes[result["route"]].append(result)
+
+        rows = []
+        for route, results in sorted(routes.items()):
+            recorded = [r["recorded_ms"] for r in results]
+            replayed = [r["replayed_ms"] for r in results]
+            row = {"route": route, "count": len(results)}
+            for pct in (50, 95, 99):
+                before, after = _percentile(recorded, pct), _percentile(replayed, pct)
+                row[f"p{pct}_recorded_ms"] = round(before, 2)
+                row[f"p{pct}_replayed_ms"] = round(after, 2)
+                row[f"p{pct}_delta_ms"] = round(after - before, 2)
+            row["status_mismatches"] = sum(1 for r in results if r["recorded_status"] != r["replayed_status"])
+            rows.append(row)
+        return {"requests": len(self.results), "routes": rows}
+
+
+def _format_table(report: Dict[str, Any]) -> Iterator[str]:
+    yield f"{'route':<48}{'count':>7}{'p50 rec':>10}{'p50 rep':>10}{'Δp50':>9}{'p95 rec':>10}{'p95 rep':>10}{'Δp95':>9}{'status≠':>9}"
+    for row in report["routes"]:
+        yield (
+            f"{row['route'][:47]:<48}{row['count']:>7}"
+            f"{row['p50_recorded_ms']:>10.2f}{row['p50_replayed_ms']:>10.2f}{row['p50_delta_ms']:>+9.2f}"
+            f"{row['p95_recorded_ms']:>10.2f}{row['p95_replayed_ms']:>10.2f}{row['p95_delta_ms']:>+9.2f}"
+            f"{row['status_mismatches']:>9}"
+        )
+
+
+async def replay(path: str, speed: float, concurrency: int, base_url: Optional[str]) -> Dict[str, Any]:
+    records = load_records(path)
+    async with AsyncExitStack() as stack:
+        if base_url:
+            client = httpx.AsyncClient(base_url=base_url, timeout=30)
+        else:
+            from main import app
+
+            # 进程内回放不经过 ASGI 服务器，需要自己执行应用的启动和停止钩子（预加载设置、分类器等）
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(app=app, base_url="http://replay", timeout=30)
+        await stack.enter_async_context(client)
+        replayer = Replayer(client, speed, concurrency)
+        await replayer.run(records)
+    return replayer.report()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="回放采集的流量并对比延迟")
+    parser.add_argument("path", help="采集目录或分段文件")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示尽快发送")
+    parser.add_argument("--concurrency", type=int, default=64, help="最大并发请求数")
+    parser.add_argument("--base-url", default=None, help="回放到运行中的服务，默认进程内驱动 main:app")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(replay(args.path, args.speed, args.concurrency, args.base_url))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"回放请求数: {report['requests']}")
+        for line in _format_table(report):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
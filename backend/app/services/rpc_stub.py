@@ -0,0 +1,157 @@
+"""本地 Solana RPC 桩服务，支持 JSON-RPC 批量请求
+
+启动：uvicorn app.services.rpc_stub:app --port 8899
+然后设置 SOLANA_RPC_URL=http://127.0.0.1:8899
+"""
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Union
+
+from fastapi import FastAPI
+
+from app.services.contacts import B58_ALPHABET
+from app.services.solana_rpc import TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+app = FastAPI(title="Solana RPC Stub")
+
+# 模拟上游延迟（毫秒）
+STUB_DELAY_MS = float(os.getenv("RPC_STUB_DELAY_MS", "20"))
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+UNKNOWN_MINT = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+PYUSD_MINT = "2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo"
+STARTED_AT = time.time()
+
+# 请求计数，便于确认调用方确实合并了请求
+STATS = {"http_requests": 0, "calls": 0}
+
+
+def b58encode(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, digit = divmod(number, 58)
+        encoded = B58_ALPHABET[digit] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + encoded
+
+
+def current_slot() -> int:
+    return 250_000_000 + int((time.time() - STARTED_AT) / 0.4)
+
+
+def _seed(owner: str) -> int:
+    return int.from_bytes(hashlib.sha256(owner.encode("utf-8")).digest()[:4], "big")
+
+
+def _context(value: Any) -> Dict[str, Any]:
+    return {"context": {"slot": current_slot(), "apiVersion": "stub"}, "value": value}
+
+
+def _token_account(owner: str, mint: str, amount: int, decimals: int, index: int,
+                   program_id: str = TOKEN_PROGRAM_ID) -> Dict[str, Any]:
+    return {
+        "pubkey": hashlib.sha256(f"{owner}:{mint}:{index}".encode()).hexdigest()[:44],
+        "account": {
+            "owner": program_id,
+            "lamports": 2039280,
+            "executable": False,
+            "data": {
+                "program": "spl-token" if program_id == TOKEN_PROGRAM_ID else "spl-token-2022",
+                "space": 165,
+                "parsed": {
+                    "type": "account",
+                    "info": {
+                        "owner": owner,
+                        "mint": mint,
+                        "state": "initialized",
+                        "tokenAmount": {
+                            "amount": str(amount),
+                            "decimals": decimals,
+                            "uiAmount": amount / 10 ** decimals,
+                            "uiAmountString": str(amount / 10 ** decimals),
+                        },
+                    },
+                },
+            },
+        },
+    }
+
+
+def get_balance(owner: str, *_: Any) -> Dict[str, Any]:
+    return _context(42_500_000_000 + _seed(owner) % 1_000_000_000)
+
+
+def get_token_accounts_by_owner(owner: str, account_filter: Dict[str, Any], *_: Any) -> Dict[str, Any]:
+    program_id = account_filter.get("programId")
+    if program_id == TOKEN_2022_PROGRAM_ID:
+        return _context([_token_account(owner, PYUSD_MINT, 25_000_000, 6, 0, program_id=program_id)])
+    if program_id != TOKEN_PROGRAM_ID:
+        raise ValueError(f"不支持的代币程序: {program_id}")
+    seed = _seed(owner)
+    return _context([
+        _token_account(owner, USDC_MINT, 100_000_000, 6, 0),
+        _token_account(owner, USDC_MINT, 50_000_000, 6, 1),
+        _token_account(owner, UNKNOWN_MINT, 1_000 + seed % 1000, 0, 0),
+        _token_account(owner, "So11111111111111111111111111111111111111112", 0, 9, 0),
+    ])
+
+
+def get_slot(*_: Any) -> int:
+    return current_slot()
+
+
+def _block_height(slot: int) -> int:
+    return slot - 12_000_000
+
+
+def get_latest_blockhash(*_: Any) -> Dict[str, Any]:
+    slot = current_slot()
+    blockhash = b58encode(hashlib.sha256(f"blockhash:{slot}".encode()).digest())
+    return _context({"blockhash": blockhash, "lastValidBlockHeight": _block_height(slot) + 150})
+
+
+def get_block_height(*_: Any) -> int:
+    return _block_height(current_slot())
+
+
+def get_recent_prioritization_fees(*_: Any) -> List[Dict[str, int]]:
+    slot = current_slot()
+    return [{"slot": slot - i, "prioritizationFee": (slot - i) * 7919 % 20_000} for i in range(150)]
+
+
+METHODS: Dict[str, Callable[..., Any]] = {
+    "getBalance": get_balance,
+    "getTokenAccountsByOwner": get_token_accounts_by_owner,
+    "getSlot": get_slot,
+    "getLatestBlockhash": get_latest_blockhash,
+    "getBlockHeight": get_block_height,
+    "getRecentPrioritizationFees": get_recent_prioritization_fees,
+}
+
+
+def handle(request: Dict[str, Any]) -> Dict[str, Any]:
+    STATS["calls"] += 1
+    method = METHODS.get(request.get("method"))
+    if method is None:
+        return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+    try:
+        result = method(*request.get("params", []))
+    except (TypeError, ValueError) as e:
+        return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32602, "message": str(e)}}
+    return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+
+@app.post("/")
+async def rpc(body: Union[List[Dict[str, Any]], Dict[str, Any]]):
+    STATS["http_requests"] += 1
+    await asyncio.sleep(STUB_DELAY_MS / 1000)
+    if isinstance(body, list):
+        return [handle(request) for request in body]
+    return handle(body)
+
+
+@app.get("/stats")
+async def stats():
+    return STATS
@@ -0,0 +1,254 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """按 RFC 7386 JSON Merge Patch 合并，返回新对象，不修改入参"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+class UserSettingsStore:
+    """按用户隔离的设置存储
+
+    - 启动时预加载已持久化的设置，之后的读取只访问内存
+    - 更新使用 JSON Merge Patch，嵌套字段（如 voice_settings.volume）单独生效
+    - 写入延迟批量落盘，窗口内同一用户的多次更新只写一次；落盘失败的用户留待下次重试
+    - 后台任务定期比对文件的修改时间，重新加载其他工作进程落盘的更新
+    - 读取返回副本，调用方修改返回值不会影响缓存和默认设置
+    """
+
+    def __init__(self, defaults: Dict[str, Any], storage_dir: str, flush_interval_ms: float,
+                 reload_interval_ms: float = 2000):
+        self.defaults = defaults
+        self.storage_dir = storage_dir
+        self.flush_interval = flush_interval_ms / 1000
+        self.reload_interval = reload_interval_ms / 1000
+        self._cache: Dict[int, Dict[str, Any]] = {}
+        # 缓存对应的文件修改时间（纳秒），None 表示文件不存在
+        self._mtimes: Dict[int, Optional[int]] = {}
+        self._dirty: Set[int] = set()
+        # 正在落盘的用户，写入完成前不参与重新加载
+        self._flushing: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
+        self.stats = {"updates": 0, "writes": 0, "flushes": 0, "reloads": 0, "flush_failures": 0}
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.storage_dir, f"{user_id}.json")
+
+    def _mtime(self, user_id: int) -> Optional[int]:
+        try:
+            return os.stat(self._path(user_id)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _current(self, user_id: int) -> Dict[str, Any]:
+        """返回缓存中的设置（内部使用，不可修改）"""
+        current = self._cache.get(user_id)
+        if current is None:
+            # 首次访问才读盘，之后的外部更新由后台任务发现
+            mtime = self._mtime(user_id)
+            current = self._load(user_id) if mtime is not None else self.defaults
+            self._cache[user_id] = current
+            self._mtimes[user_id] = mtime
+        return current
+
+    def get(self, user_id: int) -> Dict[str, Any]:
+        """获取用户设置（副本）"""
+        return copy.deepcopy(self._current(user_id))
+
+    def _load(self, user_id: int) -> Dict[str, Any]:
+        try:
+            with open(self._path(user_id), encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        return merge_patch(self.defaults, stored)
+
+    def preload(self) -> None:
+        """一次性加载所有已持久化的用户设置"""
+        os.makedirs(self.storage_dir, exist_ok=True)
+        for name in os.listdir(self.storage_dir):
+            user_id, ext = os.path.splitext(name)
+            if ext == ".json" and user_id.isdigit():
+                self._current(int(user_id))
+
+    def user_ids(self) -> List[int]:
+        """已加载（含已持久化）设置的用户 ID"""
+        return sorted(self._cache)
+
+    def update(self, user_id: int, patch: Dict[str, Any]) -> Dict[str, Any]:
+        """合并更新用户设置，返回更新后的设置（副本）"""
+        updated = merge_patch(self._current(user_id), patch)
+        self._cache[user_id] = updated
+        self._dirty.add(user_id)
+        self.stats["updates"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return copy.deepcopy(updated)
+
+    def start(self) -> None:
+        """启动后台落盘和重新加载任务"""
+        if self._task is not None:
+            return
+        self.preload()
+        self._wakeup = asyncio.Event()
+        if self._dirty:
+            self._wakeup.set()
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._flush_loop())
+        self._reload_task = loop.create_task(self._reload_loop())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余更新"""
+        for task in (self._task, self._reload_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._reload_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # 等待一个合并窗口，让连续的更新只落盘一次
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            if not await self.flush():
+                # 落盘失败的用户已放回待写集合，下一个窗口重试
+                self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """将所有待写入的设置落盘，失败时保留待写状态并返回 False"""
+        if not self._dirty:
+            return True
+        users = set(self._dirty)
+        pending = {user_id: self._cache[user_id] for user_id in users}
+        self._dirty -= users
+        self._flushing = users
+        try:
+            await asyncio.to_thread(self._write_all, pending)
+        except Exception as e:
+            # 写入期间又有更新的用户本就在待写集合中，放回去不会覆盖新数据
+            self._dirty |= users
+            self.stats["flush_failures"] += 1
+            self.last_error = str(e)
+            logger.exception("用户设置落盘失败（%s 个用户），稍后重试", len(users))
+            return False
+        finally:
+            self._flushing = set()
+        self.stats["flushes"] += 1
+        self.stats["writes"] += len(pending)
+        self.last_error = None
+        return True
+
+    def refresh(self, user_id: int) -> bool:
+        """立即比对单个用户的文件，需要在其他工作进程的写入之上修改时调用"""
+        if user_id not in self._cache:
+            self._current(user_id)
+            return False
+        if user_id in self._dirty or user_id in self._flushing:
+            return False
+        mtime = self._mtime(user_id)
+        if mtime is None or mtime == self._mtimes.get(user_id):
+            return False
+        self._cache[user_id] = self._load(user_id)
+        self._mtimes[user_id] = mtime
+        self.stats["reloads"] += 1
+        return True
+
+    async def _reload_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload_changed()
+            except Exception:
+                logger.exception("检查用户设置文件变化失败")
+
+    async def reload_changed(self) -> int:
+        """重新加载被其他工作进程修改过的设置，返回重新加载的用户数"""
+        user_ids = list(self._cache)
+        mtimes = await asyncio.to_thread(lambda: {user_id: self._mtime(user_id) for user_id in user_ids})
+        changed = [
+            user_id for user_id, mtime in mtimes.items()
+            if mtime is not None and mtime != self._mtimes.get(user_id)
+        ]
+        loaded = await asyncio.to_thread(lambda: {user_id: self._load(user_id) for user_id in changed})
+        reloaded = 0
+        for user_id, data in loaded.items():
+            # 本进程还有未落盘的更新时以内存为准，等自己落盘后再比对
+            if user_id in self._dirty or user_id in self._flushing:
+                continue
+            self._cache[user_id] = data
+            self._mtimes[user_id] = mtimes[user_id]
+            reloaded += 1
+        self.stats["reloads"] += reloaded
+        return reloaded
+
+    def _write_all(self, pending: Dict[int, Dict[str, Any]]) -> None:
+        os.makedirs(self.storage_dir, exist_ok=True)
+        for user_id, data in pending.items():
+            path = self._path(user_id)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            # 记录自己写入后的修改时间，避免下次读取时把自己的写入当成外部更新
+            self._mtimes[user_id] = os.stat(path).st_mtime_ns
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "cached_users": len(self._cache),
+            "dirty": len(self._dirty),
+            "running": self._task is not None and not self._task.done(),
+            "last_error": self.last_error,
+            **self.stats,
+        }
+
+
+# 默认用户设置
+DEFAULT_SETTINGS = {
+    "theme": "dark",
+    "language": "zh-CN",
+    "voice_settings": {
+        "rate": 1.0,
+        "pitch": 1.0,
+        "volume": 1.0
+    },
+    "notifications": {
+        "transaction_notifications": True,
+        "price_alerts": True,
+        "security_alerts": True
+    }
+}
+
+settings_store = UserSettingsStore(
+    defaults=DEFAULT_SETTINGS,
+    storage_dir=settings.SETTINGS_STORAGE_DIR,
+    flush_interval_ms=settings.SETTINGS_FLUSH_INTERVAL_MS,
+    reload_interval_ms=settings.SETTINGS_RELOAD_INTERVAL_MS,
+)
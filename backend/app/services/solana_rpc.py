@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from app.core.config import settings
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM_ID = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
+LAMPORTS_PER_SOL = 1_000_000_000
+
+# (方法名, 参数)
+RPCCall = Tuple[str, List[Any]]
+
+
+class RPCError(Exception):
+    """RPC 请求失败（网络错误、HTTP 错误或 JSON-RPC 错误）"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class SolanaRPC:
+    """Solana JSON-RPC 客户端，支持把多个调用合并为一次批量请求"""
+
+    def __init__(self, url: str, timeout: float, commitment: str, breaker: CircuitBreaker):
+        self.url = url
+        self.timeout = timeout
+        self.commitment = commitment
+        self.breaker = breaker
+        self._ids = itertools.count(1)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.stats = {"requests": 0, "calls": 0, "errors": 0, "short_circuited": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send(self, payload: Any) -> Any:
+        response = await self._get_client().post(self.url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _post(self, payload: Any) -> Any:
+        """经熔断器发送请求；熔断期间立即失败，不等待超时"""
+        try:
+            self.breaker.check()
+        except CircuitOpenError as e:
+            self.stats["short_circuited"] += 1
+            raise RPCError(str(e)) from e
+        self.stats["requests"] += 1
+        started = time.monotonic()
+        try:
+            reply = await self._send(payload)
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        except (httpx.HTTPError, ValueError) as e:
+            self.breaker.record_failure()
+            self.stats["errors"] += 1
+            raise RPCError(f"RPC 请求失败: {e}") from e
+        self.breaker.record_success(time.monotonic() - started)
+        return reply
+
+    @staticmethod
+    def _unwrap(reply: Dict[str, Any]) -> Any:
+        error = reply.get("error")
+        if error:
+            raise RPCError(error.get("message", "RPC 错误"), error.get("code"))
+        return reply.get("result")
+
+    async def call(self, method: str, params: Optional[List[Any]] = None) -> Any:
+        """单个调用"""
+        self.stats["calls"] += 1
+        reply = await self._post({"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []})
+        return self._unwrap(reply)
+
+    async def batch(self, calls: Sequence[RPCCall]) -> List[Any]:
+        """批量调用：一次 HTTP 往返，结果按调用顺序返回，任一调用出错即抛出 RPCError"""
+        ids = [next(self._ids) for _ in calls]
+        self.stats["calls"] += len(calls)
+        replies = await self._post([
+            {"jsonrpc": "2.0", "id": call_id, "method": method, "params": params}
+            for call_id, (method, params) in zip(ids, calls)
+        ])
+        if not isinstance(replies, list):
+            self.stats["errors"] += 1
+            raise RPCError(f"批量请求失败: {self._unwrap(replies)}")
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for call_id in ids:
+            if call_id not in by_id:
+                raise RPCError(f"批量响应缺少 id={call_id} 的结果")
+            results.append(self._unwrap(by_id[call_id]))
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "circuit": self.breaker.state}
+
+
+solana_rpc = SolanaRPC(
+    url=settings.SOLANA_RPC_URL,
+    timeout=settings.SOLANA_RPC_TIMEOUT_SECONDS,
+    commitment=settings.SOLANA_COMMITMENT,
+    breaker=get_breaker("solana_rpc"),
+)
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 支持的统计区间
+PERIODS = ("today", "last_7_days", "last_30_days", "this_month", "last_month", "this_year")
+
+# 自定义区间允许的日期范围 [EARLIEST_DATE, LATEST_DATE]
+EARLIEST_DATE = date(2000, 1, 1)
+LATEST_DATE = date(2100, 1, 1)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def resolve_period(period: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """将统计区间名称转换为 [start, end) 日期范围"""
+    today = today or datetime.utcnow().date()
+    tomorrow = today + timedelta(days=1)
+    if period == "today":
+        return today, tomorrow
+    if period == "last_7_days":
+        return today - timedelta(days=6), tomorrow
+    if period == "last_30_days":
+        return today - timedelta(days=29), tomorrow
+    if period == "this_month":
+        return _month_start(today), tomorrow
+    if period == "last_month":
+        end = _month_start(today)
+        return _month_start(end - timedelta(days=1)), end
+    if period == "this_year":
+        return date(today.year, 1, 1), tomorrow
+    raise ValueError(f"不支持的统计区间: {period}")
+
+
+def check_range(start: date, end: date, max_days: int) -> None:
+    """校验自定义区间 [start, end)，不合法时抛出 ValueError"""
+    if start >= end:
+        raise ValueError("start 必须早于 end")
+    if start < EARLIEST_DATE or end > LATEST_DATE:
+        raise ValueError(f"日期必须在 {EARLIEST_DATE.isoformat()} 到 {LATEST_DATE.isoformat()} 之间")
+    if (end - start).days > max_days:
+        raise ValueError(f"区间不能超过 {max_days} 天")
+
+
+def split_range(start: date, end: date) -> Iterator[Tuple[str, Any]]:
+    """将 [start, end) 拆成按天和按月的桶：首尾不足一个月的部分按天，中间按整月"""
+    day = start
+    while day < end:
+        # 最后一个月（date.max 所在月）没有下个月，按天处理
+        if day.day == 1 and (day.year, day.month) != (date.max.year, 12) and _next_month(day) <= end:
+            yield "month", (day.year, day.month)
+            day = _next_month(day)
+        else:
+            yield "day", day
+            day += timedelta(days=1)
+
+
+class SpendingAggregates:
+    """转账支出的增量聚合
+
+    每笔转账记录时更新 (用户, 收款方, 币种) 下的日桶和月桶，
+    区间查询只遍历区间内的桶，代价与交易笔数无关。
+    """
+
+    def __init__(self):
+        # user_id -> (收款方归一化名称, 币种) -> {"day": {date: [金额, 笔数]}, "month": {(年, 月): [金额, 笔数]}}
+        self._series: Dict[Any, Dict[Tuple[str, str], Dict[str, Dict[Any, List[float]]]]] = defaultdict(dict)
+        # (user_id, 收款方归一化名称) -> 显示名称，按用户隔离，避免一个用户的写法出现在另一个用户的统计里
+        self._display_names: Dict[Tuple[Any, str], str] = {}
+
+    @staticmethod
+    def _normalize(counterparty: str) -> str:
+        return counterparty.strip().casefold()
+
+    def record(self, user_id: Any, counterparty: str, currency: str, amount: float,
+               timestamp: Optional[datetime] = None) -> None:
+        """记录一笔转账"""
+        timestamp = timestamp or datetime.utcnow()
+        key = self._normalize(counterparty)
+        self._display_names.setdefault((user_id, key), counterparty.strip())
+        series = self._series[user_id].setdefault(
+            (key, currency.upper()), {"day": {}, "month": {}}
+        )
+        day = timestamp.date()
+        for granularity, bucket in (("day", day), ("month", (day.year, day.month))):
+            totals = series[granularity].setdefault(bucket, [0.0, 0])
+            totals[0] += amount
+            totals[1] += 1
+
+    def summarize(self, user_id: Any, start: date, end: date,
+                  counterparty: Optional[str] = None, currency: Optional[str] = None) -> Dict[str, Any]:
+        """统计 [start, end) 区间内的支出，按收款方和币种分组"""
+        counterparty_key = self._normalize(counterparty) if counterparty else None
+        currency_key = currency.upper() if currency else None
+        buckets = list(split_range(start, end))
+
+        groups = []
+        for (key, cur), series in self._series.get(user_id, {}).items():
+            if counterparty_key is not None and key != counterparty_key:
+                continue
+            if currency_key is not None and cur != currency_key:
+                continue
+            total, count = 0.0, 0
+            for granularity, bucket in buckets:
+                totals = series[granularity].get(bucket)
+                if totals is not None:
+                    total += totals[0]
+                    count += totals[1]
+            if count:
+                groups.append({
+                    "counterparty": self._display_names[(user_id, key)],
+                    "currency": cur,
+                    "total": round(total, 9),
+                    "count": count,
+                })
+
+        totals_by_currency: Dict[str, float] = defaultdict(float)
+        for group in groups:
+            totals_by_currency[group["currency"]] += group["total"]
+
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "groups": sorted(groups, key=lambda g: g["total"], reverse=True),
+            "totals": {cur: round(total, 9) for cur, total in totals_by_currency.items()},
+        }
+
+
+spending_aggregates = SpendingAggregates()
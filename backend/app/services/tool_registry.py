@@ -0,0 +1,290 @@
+import asyncio
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境下只有单进程写入
+    fcntl = None
+
+# 内置工具（在 voice.execute_tool 中有执行逻辑，不能通过开发者接口修改或删除）
+BUILTIN_TOOLS = [
+    {
+        "id": "transfer_sol",
+        "name": "SOL转账",
+        "description": "在Solana网络上转账SOL代币",
+        "category": "blockchain",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "recipient": {"type": "string", "description": "接收方地址或联系人"},
+                "amount": {"type": "number", "description": "转账金额"},
+                "currency": {"type": "string", "enum": ["SOL", "USDC"], "default": "SOL"}
+            },
+            "required": ["recipient", "amount"]
+        }
+    },
+    {
+        "id": "query_balance",
+        "name": "查询余额",
+        "description": "查询钱包余额",
+        "category": "blockchain",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "currency": {"type": "string", "enum": ["SOL", "USDC"], "description": "货币类型"}
+            }
+        }
+    },
+    {
+        "id": "query_portfolio",
+        "name": "查询全部资产",
+        "description": "一次查询钱包中 SOL 和所有 SPL 代币的余额及美元估值",
+        "category": "blockchain",
+        "parameters": {
+            "type": "object",
+            "properties": {}
+        }
+    },
+    {
+        "id": "query_transactions",
+        "name": "查询交易记录",
+        "description": "查询交易历史记录",
+        "category": "blockchain",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "limit": {"type": "number", "default": 10, "description": "返回记录数量"},
+                "offset": {"type": "number", "default": 0, "description": "偏移量"}
+            }
+        }
+    },
+    {
+        "id": "query_spending",
+        "name": "查询支出统计",
+        "description": "统计一段时间内向某个联系人或全部联系人的转账金额",
+        "category": "blockchain",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "period": {
+                    "type": "string",
+                    "enum": ["today", "last_7_days", "last_30_days", "this_month", "last_month", "this_year"],
+                    "default": "this_month",
+                    "description": "统计区间"
+                },
+                "counterparty": {"type": "string", "description": "收款方，不填则统计全部"},
+                "currency": {"type": "string", "enum": ["SOL", "USDC"], "description": "货币类型，不填则统计全部"}
+            }
+        }
+    },
+    {
+        "id": "weather_query",
+        "name": "天气查询",
+        "description": "查询指定城市的天气信息",
+        "category": "utility",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "city": {"type": "string", "description": "城市名称"},
+                "country": {"type": "string", "description": "国家代码", "default": "CN"}
+            },
+            "required": ["city"]
+        }
+    }
+]
+
+
+class RegistrySnapshot:
+    """工具目录快照
+
+    构造时深拷贝工具定义，不与内置定义、写入方的工作副本或调用方传入的对象共享；发布后不再修改，
+    读取方拿到引用即可直接使用，不需要加锁，也不会读到更新到一半的目录。
+    """
+
+    __slots__ = ("version", "tools", "by_id", "updated_at")
+
+    def __init__(self, version: int, tools: List[Dict[str, Any]], updated_at: float):
+        self.version = version
+        self.tools: Tuple[Dict[str, Any], ...] = tuple(copy.deepcopy(tools))
+        self.by_id: Dict[str, Dict[str, Any]] = {tool["id"]: tool for tool in self.tools}
+        self.updated_at = updated_at
+
+    def get(self, tool_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(tool_id)
+
+    def list(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        if category:
+            return [tool for tool in self.tools if tool["category"] == category]
+        return list(self.tools)
+
+
+class ToolRegistry:
+    """可热更新的工具目录
+
+    - 读取方通过 snapshot 属性拿到当前快照，替换快照是一次引用赋值
+    - 写入方串行执行：在最新目录的副本上修改，落盘后再整体替换快照（写时复制）
+    - 文件只保存自定义工具，快照总是由代码中的内置工具加上文件中的自定义工具组成，
+      升级新增的内置工具不会被旧版本写入的文件覆盖
+    - 目录持久化到共享文件，其他工作进程定期检查文件变化并加载更新的版本，无需重启
+    """
+
+    def __init__(self, builtin: List[Dict[str, Any]], path: str, poll_interval: float):
+        self.builtin: Tuple[Dict[str, Any], ...] = tuple(copy.deepcopy(builtin))
+        self.builtin_ids = frozenset(tool["id"] for tool in builtin)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._snapshot = self._build(0, [], time.time())
+        self._file_state: Optional[Tuple[int, int]] = None
+        self._write_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"reloads": 0, "commits": 0}
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        return self._snapshot
+
+    def is_builtin(self, tool_id: str) -> bool:
+        return tool_id in self.builtin_ids
+
+    def _build(self, version: int, custom: List[Dict[str, Any]], updated_at: float) -> RegistrySnapshot:
+        return RegistrySnapshot(version, [*self.builtin, *custom], updated_at)
+
+    def _custom(self, snapshot: RegistrySnapshot) -> List[Dict[str, Any]]:
+        return copy.deepcopy([tool for tool in snapshot.tools if not self.is_builtin(tool["id"])])
+
+    def _read_file(self) -> Optional[Tuple[int, List[Dict[str, Any]], float]]:
+        """读取 (版本, 自定义工具, 更新时间)"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # 旧版本的文件保存的是完整目录（键为 tools），其中的内置工具一律以代码为准
+        custom = data.get("custom_tools", data.get("tools", []))
+        custom = [tool for tool in custom if not self.is_builtin(tool["id"])]
+        return data["version"], custom, data.get("updated_at", 0.0)
+
+    def reload(self) -> bool:
+        """文件有变化且版本更新时替换快照，返回是否替换"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        state = (stat.st_mtime_ns, stat.st_size)
+        if state == self._file_state:
+            return False
+        self._file_state = state
+        loaded = self._read_file()
+        if loaded is None or loaded[0] <= self._snapshot.version:
+            return False
+        self._snapshot = self._build(*loaded)
+        self.stats["reloads"] += 1
+        return True
+
+    def _commit(self, mutate: Callable[[List[Dict[str, Any]]], None]) -> RegistrySnapshot:
+        """在写锁内基于最新目录生成并落盘新快照（在线程中执行）
+
+        mutate 只修改自定义工具列表。
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            loaded = self._read_file()
+            if loaded is None or loaded[0] < self._snapshot.version:
+                version, custom = self._snapshot.version, self._custom(self._snapshot)
+            else:
+                version, custom = loaded[0], loaded[1]
+            mutate(custom)
+            snapshot = self._build(version + 1, custom, time.time())
+
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": snapshot.version, "updated_at": snapshot.updated_at, "custom_tools": custom},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        return snapshot
+
+    async def _apply(self, mutate: Callable[[List[Dict[str, Any]]], None]) -> RegistrySnapshot:
+        async with self._write_lock:
+            snapshot = await asyncio.to_thread(self._commit, mutate)
+            # 落盘期间轮询可能已加载其他工作进程写入的更新版本，不能用旧版本覆盖
+            if snapshot.version > self._snapshot.version:
+                self._snapshot = snapshot
+            self.stats["commits"] += 1
+            return snapshot
+
+    async def create(self, tool: Dict[str, Any]) -> RegistrySnapshot:
+        """新增工具"""
+        if self.is_builtin(tool["id"]):
+            raise ValueError(f"工具已存在: {tool['id']}")
+
+        def mutate(tools: List[Dict[str, Any]]) -> None:
+            if any(t["id"] == tool["id"] for t in tools):
+                raise ValueError(f"工具已存在: {tool['id']}")
+            tools.append(copy.deepcopy(tool))
+        return await self._apply(mutate)
+
+    async def update(self, tool_id: str, changes: Dict[str, Any]) -> RegistrySnapshot:
+        """更新工具（只替换给出的字段）"""
+        if self.is_builtin(tool_id):
+            raise PermissionError("内置工具不能修改")
+
+        def mutate(tools: List[Dict[str, Any]]) -> None:
+            for index, tool in enumerate(tools):
+                if tool["id"] == tool_id:
+                    tools[index] = {**tool, **changes, "id": tool_id}
+                    return
+            raise LookupError(f"工具不存在: {tool_id}")
+        return await self._apply(mutate)
+
+    async def delete(self, tool_id: str) -> RegistrySnapshot:
+        """删除工具"""
+        if self.is_builtin(tool_id):
+            raise PermissionError("内置工具不能删除")
+
+        def mutate(tools: List[Dict[str, Any]]) -> None:
+            for index, tool in enumerate(tools):
+                if tool["id"] == tool_id:
+                    del tools[index]
+                    return
+            raise LookupError(f"工具不存在: {tool_id}")
+        return await self._apply(mutate)
+
+    def start(self) -> None:
+        """加载已持久化的目录并启动变更检查任务"""
+        self.reload()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.reload()
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {"version": snapshot.version, "tools": len(snapshot.tools), **self.stats}
+
+
+tool_registry = ToolRegistry(
+    BUILTIN_TOOLS,
+    path=settings.TOOL_REGISTRY_PATH,
+    poll_interval=settings.TOOL_REGISTRY_POLL_SECONDS,
+)
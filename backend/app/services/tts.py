@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import io
+import json
+import math
+import mmap
+import os
+import wave
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+
+class Synthesizer:
+    """语音合成器接口，返回 WAV 字节"""
+
+    name = "base"
+
+    def synthesize(self, text: str, rate: float, pitch: float, volume: float) -> bytes:
+        raise NotImplementedError
+
+
+class StubSynthesizer(Synthesizer):
+    """本地开发用的合成桩：每个字符生成一段音调，结果可确定复现"""
+
+    name = "stub"
+    sample_rate = 16000
+
+    def synthesize(self, text: str, rate: float, pitch: float, volume: float) -> bytes:
+        samples_per_char = int(self.sample_rate * 0.08 / max(rate, 0.1))
+        amplitude = 0.3 * 32767 * max(0.0, min(volume, 1.0))
+        pcm = array("h")
+        for ch in text:
+            freq = (220 + (ord(ch) % 12) * 20) * pitch
+            step = 2 * math.pi * freq / self.sample_rate
+            pcm.extend(int(amplitude * math.sin(step * i)) for i in range(samples_per_char))
+
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(pcm.tobytes())
+        return buf.getvalue()
+
+
+SYNTHESIZERS: Dict[str, Callable[[], Synthesizer]] = {
+    "stub": StubSynthesizer,
+}
+
+
+def create_synthesizer(name: Optional[str] = None) -> Synthesizer:
+    """按名称创建语音合成器"""
+    factory = SYNTHESIZERS.get(name or settings.TTS_SYNTHESIZER)
+    if factory is None:
+        raise ValueError(f"未知的语音合成器: {name or settings.TTS_SYNTHESIZER}")
+    return factory()
+
+
+class TTSCache:
+    """内容寻址的 TTS 音频磁盘缓存
+
+    - 键为文本、语音参数和合成器名称的 SHA-256
+    - 命中时通过 mmap 直接返回文件内容，不经过合成器
+    - 按 LRU 淘汰，磁盘占用不超过 max_bytes
+    - 常驻的 mmap（每个占一个文件描述符）最多 max_open_maps 个，按 LRU 释放
+    """
+
+    def __init__(self, directory: str, max_bytes: int, synthesizer: Synthesizer, max_open_maps: int = 64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_open_maps = max_open_maps
+        self.synthesizer = synthesizer
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._total_bytes = 0
+        self._loaded = False
+
+    def _load(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".wav"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def key_for(self, text: str, rate: float, pitch: float, volume: float) -> str:
+        payload = json.dumps(
+            [self.synthesizer.name, text, round(rate, 3), round(pitch, 3), round(volume, 3)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def lookup(self, key: str) -> Optional[mmap.mmap]:
+        """查找缓存，命中时返回只读内存映射"""
+        if not self._loaded:
+            self._load()
+        if key not in self._entries:
+            # 其他 worker 可能已经写入了同一键
+            try:
+                self._add(key, os.path.getsize(self._path(key)))
+            except OSError:
+                return None
+        mapped = self._maps.get(key)
+        if mapped is None or mapped.closed:
+            try:
+                with open(self._path(key), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self._forget(key)
+                return None
+            self._maps[key] = mapped
+            while len(self._maps) > self.max_open_maps:
+                # 只释放缓存的引用：正在发送的响应仍持有引用，发送完成后自动关闭
+                self._maps.popitem(last=False)
+        self._maps.move_to_end(key)
+        self._entries.move_to_end(key)
+        return mapped
+
+    async def get_or_synthesize(self, text: str, rate: float, pitch: float, volume: float) -> Dict[str, Any]:
+        """返回缓存的音频，未命中时合成并写入缓存（同一键的并发请求只合成一次）"""
+        key = self.key_for(text, rate, pitch, volume)
+        mapped = self.lookup(key)
+        if mapped is not None:
+            self.hits += 1
+            return {"key": key, "audio": mapped, "cached": True}
+
+        self.misses += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.get_running_loop().create_future()
+            self._pending[key] = pending
+            try:
+                data = await asyncio.to_thread(self._synthesize_to_disk, key, text, rate, pitch, volume)
+                self._add(key, len(data))
+                pending.set_result(None)
+            except Exception as e:
+                pending.set_exception(e)
+                raise
+            finally:
+                self._pending.pop(key, None)
+        else:
+            await pending
+
+        mapped = self.lookup(key)
+        if mapped is None:
+            raise RuntimeError("TTS 缓存写入失败")
+        return {"key": key, "audio": mapped, "cached": False}
+
+    def _synthesize_to_disk(self, key: str, text: str, rate: float, pitch: float, volume: float) -> bytes:
+        data = self.synthesizer.synthesize(text, rate, pitch, volume)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        return data
+
+    def _add(self, key: str, size: int) -> None:
+        if key in self._entries:
+            self._total_bytes -= self._entries[key]
+        self._entries[key] = size
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            try:
+                os.remove(self._path(oldest))
+            except OSError:
+                pass
+
+    def _forget(self, key: str) -> None:
+        self._total_bytes -= self._entries.pop(key, 0)
+        # 不主动关闭 mmap：正在发送的响应仍持有引用，释放后自动关闭
+        self._maps.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "open_maps": len(self._maps),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+tts_cache = TTSCache(
+    directory=settings.TTS_CACHE_DIR,
+    max_bytes=settings.TTS_CACHE_MAX_BYTES,
+    max_open_maps=settings.TTS_CACHE_MAX_OPEN_MAPS,
+    synthesizer=create_synthesizer(),
+)
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.solana_rpc import RPCError, SolanaRPC, solana_rpc
+
+logger = logging.getLogger(__name__)
+
+# 每个签名的基础手续费（lamports）
+BASE_FEE_LAMPORTS = 5000
+
+
+class TransferContext(NamedTuple):
+    """签名交易所需的链上参数"""
+    blockhash: str
+    last_valid_block_height: int
+    slot: int
+    base_fee_lamports: int
+    priority_fee_micro_lamports: int
+    fetched_at: float
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "recent_blockhash": self.blockhash,
+            "last_valid_block_height": self.last_valid_block_height,
+            "fee_lamports": self.base_fee_lamports,
+            "priority_fee_micro_lamports": self.priority_fee_micro_lamports,
+            "context_age_ms": round(self.age() * 1000, 1),
+        }
+
+
+def estimate_priority_fee(samples: List[Dict[str, Any]], percentile: float) -> int:
+    """按最近区块的优先费取分位数"""
+    fees = sorted(sample["prioritizationFee"] for sample in samples)
+    if not fees:
+        return 0
+    return fees[min(len(fees) - 1, int(len(fees) * percentile / 100))]
+
+
+class BlockhashPrefetcher:
+    """后台预取最新区块哈希和手续费估计
+
+    区块哈希约 150 个区块（约 60 秒）后过期。后台按固定间隔刷新，转账时直接读取内存中的结果，
+    不再发起准备性的 RPC 请求；只有缓存超过 max_age（连续刷新失败）时才同步拉取并计为未命中。
+    未启动后台任务时，只有 fetch_on_demand 为 True 才按需拉取，结果在 max_age 内被后续转账复用；
+    否则不发起网络请求，直接返回 None。并发的未命中共用同一次拉取。
+    """
+
+    def __init__(self, rpc: SolanaRPC, refresh_interval: float, max_age: float, fee_percentile: float,
+                 fetch_on_demand: bool = True):
+        self.rpc = rpc
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.fee_percentile = fee_percentile
+        self.fetch_on_demand = fetch_on_demand
+        self._context: Optional[TransferContext] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self.stats = {"refreshes": 0, "refresh_errors": 0, "hits": 0, "misses": 0, "coalesced": 0,
+                      "fetch_errors": 0, "unavailable": 0, "last_refresh_ms": 0.0, "max_refresh_lag_ms": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def refresh(self) -> TransferContext:
+        """一次批量请求拉取区块哈希和优先费"""
+        started = time.monotonic()
+        latest, fees = await self.rpc.batch([
+            ("getLatestBlockhash", [{"commitment": self.rpc.commitment}]),
+            ("getRecentPrioritizationFees", [[]]),
+        ])
+        context = TransferContext(
+            blockhash=latest["value"]["blockhash"],
+            last_valid_block_height=latest["value"]["lastValidBlockHeight"],
+            slot=latest["context"]["slot"],
+            base_fee_lamports=BASE_FEE_LAMPORTS,
+            priority_fee_micro_lamports=estimate_priority_fee(fees, self.fee_percentile),
+            fetched_at=time.monotonic(),
+        )
+        self._context = context
+        self.stats["refreshes"] += 1
+        self.stats["last_refresh_ms"] = round((context.fetched_at - started) * 1000, 1)
+        return context
+
+    def current(self) -> Optional[TransferContext]:
+        """返回未过期的预取结果，不发起请求"""
+        context = self._context
+        if context is None or context.age() > self.max_age:
+            return None
+        return context
+
+    async def acquire(self) -> Optional[TransferContext]:
+        """获取签名参数
+
+        没有可用的预取结果时同步拉取，拉取失败抛出 RPCError；
+        既未启动后台刷新又未开启按需拉取时不发起请求，返回 None。
+        """
+        context = self.current()
+        if context is not None:
+            self.stats["hits"] += 1
+            return context
+        if not self.running and not self.fetch_on_demand:
+            self.stats["unavailable"] += 1
+            return None
+        self.stats["misses"] += 1
+        task = self._inflight
+        if task is None:
+            task = self._inflight = asyncio.get_running_loop().create_task(self.refresh())
+            task.add_done_callback(self._clear_inflight)
+        else:
+            self.stats["coalesced"] += 1
+        try:
+            # 单个调用方被取消不影响其他等待同一次拉取的调用方
+            return await asyncio.shield(task)
+        except RPCError:
+            self.stats["fetch_errors"] += 1
+            raise
+
+    def _clear_inflight(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+        if not task.cancelled():
+            # 所有等待方都已取消时，避免未读取的异常告警
+            task.exception()
+
+    def _reap(self) -> None:
+        """清理已退出的后台任务，异常退出时记录日志"""
+        task = self._task
+        if task is not None and task.done():
+            self._task = None
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("区块哈希预取任务异常退出", exc_info=task.exception())
+
+    def start(self) -> None:
+        """启动后台刷新；之前的任务已异常退出时重新启动"""
+        self._reap()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        self._reap()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                delay = self.refresh_interval
+            except RPCError:
+                self.stats["refresh_errors"] += 1
+                delay = min(1.0, self.refresh_interval)
+            scheduled = time.monotonic() + delay
+            await asyncio.sleep(delay)
+            lag_ms = (time.monotonic() - scheduled) * 1000
+            self.stats["max_refresh_lag_ms"] = round(max(self.stats["max_refresh_lag_ms"], lag_ms), 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        context = self._context
+        return {
+            "running": self.running,
+            "age_ms": round(context.age() * 1000, 1) if context else None,
+            "slot": context.slot if context else None,
+            **self.stats,
+        }
+
+
+blockhash_prefetcher = BlockhashPrefetcher(
+    solana_rpc,
+    refresh_interval=settings.BLOCKHASH_REFRESH_SECONDS,
+    max_age=settings.BLOCKHASH_MAX_AGE_SECONDS,
+    fee_percentile=settings.PRIORITY_FEE_PERCENTILE,
+    fetch_on_demand=settings.BLOCKHASH_ON_DEMAND_FETCH,
+)
@@ -2,6 +2,8 @@ from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -10,16 +12,68 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # 导入路由模块
-from app.routers import auth, voice, blockchain, tools, user
+from app.routers import auth, voice, blockchain, tools, user, notifications, dev
 from app.core.config import settings
 from app.core.security import verify_token
+from app.core.loop_monitor import loop_monitor
+from app.core.revocation import revocation_registry
+from app.core.capture import TrafficCaptureMiddleware, capture_writer
+from app.core.audit import audit_log, audit_reader
+from app.core.circuit_breaker import breaker_stats
+from app.services.llm import llm_interpreter
+from app.services.settings_store import settings_store
+from app.services.batch import shutdown_executor
+from app.services.prices import price_cache, price_feed
+from app.services.alerts import alert_engine, alert_store, start_alert_store
+from app.services.notifications import notification_hub
+from app.services.tool_registry import tool_registry
+from app.services.solana_rpc import solana_rpc
+from app.services.tx_prefetch import blockhash_prefetcher
+from app.services.intent_classifier import intent_classifier
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动和停止后台任务"""
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    settings_store.start()
+    start_alert_store()
+    tool_registry.start()
+    if settings.INTENT_CLASSIFIER_ENABLED:
+        # 首次启动需要训练（约 1 秒），之后直接加载缓存的模型
+        await asyncio.to_thread(intent_classifier.load)
+    await revocation_registry.start()
+    if settings.CAPTURE_ENABLED:
+        capture_writer.start()
+    if settings.AUDIT_ENABLED:
+        audit_log.start()
+    if settings.PRICE_FEED_SIMULATED:
+        price_feed.start()
+    await notification_hub.start()
+    if settings.BLOCKHASH_PREFETCH_ENABLED:
+        blockhash_prefetcher.start()
+    yield
+    await blockhash_prefetcher.stop()
+    await notification_hub.stop()
+    await price_feed.stop()
+    capture_writer.stop()
+    audit_log.stop()
+    shutdown_executor()
+    await revocation_registry.stop()
+    await tool_registry.stop()
+    await alert_store.stop()
+    await settings_store.stop()
+    await llm_interpreter.aclose()
+    await solana_rpc.aclose()
+    await loop_monitor.stop()
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="Solana Earphone API",
     description="语音智能助手后端服务",
     version="1.0.0",
-    openapi_url=f"/{settings.API_VERSION}/openapi.json"
+    openapi_url=f"/{settings.API_VERSION}/openapi.json",
+    lifespan=lifespan
 )
 
 # 配置 CORS
@@ -31,6 +85,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 流量采集（默认关闭）
+if settings.CAPTURE_ENABLED:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        writer=capture_writer,
+        sample_rate=settings.CAPTURE_SAMPLE_RATE,
+        path_prefixes=[f"/{settings.API_VERSION}/api{prefix}" for prefix in settings.CAPTURE_PATH_PREFIXES],
+        max_body_bytes=settings.CAPTURE_MAX_BODY_BYTES
+    )
+
 # 安全认证
 security = HTTPBearer()
 
@@ -46,7 +110,37 @@ async def root():
 # 健康检查
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": "2025-06-16T14:30:00Z"}
+    audit_running = audit_log.running
+    return {
+        "status": "healthy" if audit_running or not settings.AUDIT_ENABLED else "degraded",
+        "timestamp": "2025-06-16T14:30:00Z",
+        "event_loop": loop_monitor.lag_summary(),
+        "audit_log": {"running": audit_running, "failures": audit_log.stats["failures"]}
+    }
+
+# 运行时指标
+@app.get("/metrics")
+async def metrics():
+    return {
+        "event_loop": {
+            **loop_monitor.lag_summary(),
+            "offenders": loop_monitor.offender_report()
+        },
+        "llm_fallback": llm_interpreter.get_stats(),
+        "settings_store": settings_store.get_stats(),
+        "token_revocation": revocation_registry.get_stats(),
+        "traffic_capture": capture_writer.get_stats(),
+        "audit_log": audit_log.get_stats(),
+        "audit_index": audit_reader.get_stats(),
+        "price_alerts": alert_engine.get_stats(),
+        "prices": price_cache.snapshot(),
+        "notifications": notification_hub.get_stats(),
+        "tool_registry": tool_registry.get_stats(),
+        "solana_rpc": solana_rpc.get_stats(),
+        "blockhash_prefetch": blockhash_prefetcher.get_stats(),
+        "intent_classifier": intent_classifier.get_stats(),
+        "circuit_breakers": breaker_stats()
+    }
 
 # 包含路由
 app.include_router(auth.router, prefix=f"/{settings.API_VERSION}/api/auth", tags=["authentication"])
@@ -54,6 +148,8 @@ app.include_router(voice.router, prefix=f"/{settings.API_VERSION}/api", tags=["v
 app.include_router(blockchain.router, prefix=f"/{settings.API_VERSION}/api/blockchain", tags=["blockchain"])
 app.include_router(tools.router, prefix=f"/{settings.API_VERSION}/api/tools", tags=["tools"])
 app.include_router(user.router, prefix=f"/{settings.API_VERSION}/api/user", tags=["user"])
+app.include_router(dev.router, prefix=f"/{settings.API_VERSION}/api/dev", tags=["developer"])
+app.include_router(notifications.router, prefix=f"/{settings.API_VERSION}/api/notifications", tags=["notifications"])
 
 # 全局异常处理
 @app.exception_handler(Exception)
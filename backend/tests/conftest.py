@@ -0,0 +1,23 @@
+import httpx
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.services import rpc_stub
+from app.services.solana_rpc import SolanaRPC
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def rpc(monkeypatch):
+    """直接驱动进程内 RPC 桩服务的客户端"""
+    monkeypatch.setattr(rpc_stub, "STUB_DELAY_MS", 0)
+    breaker = CircuitBreaker("test_rpc", failure_rate=0.5, slow_call_ms=2000, window=20,
+                             min_calls=10, reset_timeout=30, half_open_calls=1)
+    client = SolanaRPC("http://stub/", timeout=5, commitment="confirmed", breaker=breaker)
+    client._client = httpx.AsyncClient(app=rpc_stub.app, base_url="http://stub")
+    yield client
+    await client.aclose()
@@ -0,0 +1,101 @@
+import pytest
+
+from app.services import alerts
+from app.services.alerts import PriceAlertEngine, ThresholdIndex, _naive_scan
+from app.services.settings_store import UserSettingsStore
+
+
+def test_upward_crossing_is_open_below_closed_above():
+    index = ThresholdIndex("above", price=10.0)
+    for alert_id, threshold in enumerate([10.0, 10.5, 11.0, 11.5], start=1):
+        index.add(threshold, alert_id)
+
+    # (10, 11]：等于起点的不触发，等于终点的触发
+    assert index.move(11.0) == [2, 3]
+    assert index.move(11.2) == []
+    assert len(index) == 2
+
+
+def test_downward_crossing_is_closed_below_open_above():
+    index = ThresholdIndex("below", price=11.0)
+    for alert_id, threshold in enumerate([9.5, 10.0, 10.5, 11.0], start=1):
+        index.add(threshold, alert_id)
+
+    # [10, 11)：等于终点的触发，等于起点的不触发
+    assert index.move(10.0) == [3, 2]
+    assert index.move(9.8) == []
+    assert len(index) == 2
+
+
+def test_thresholds_crossed_backwards_are_rearmed():
+    index = ThresholdIndex("above", price=12.0)
+    index.add(11.0, 1)
+    assert index.move(12.5) == []
+    # 价格回落到阈值以下后再上穿才触发
+    assert index.move(10.0) == []
+    assert index.move(11.0) == [1]
+
+
+def test_removed_alerts_are_skipped_and_compacted():
+    index = ThresholdIndex("above", price=0.0)
+    index.bulk_add((float(i), i) for i in range(1, 3001))
+    for i in range(1, 3000):
+        assert index.remove(float(i), i)
+    assert not index.remove(1.0, 1)
+    assert len(index._armed) < 3000
+    assert index.move(5000.0) == [3000]
+
+
+def test_unplaced_alerts_wait_for_first_price():
+    index = ThresholdIndex("above")
+    index.add(5.0, 1)
+    assert index.move(4.0) == []
+    assert index.move(6.0) == [1]
+
+
+def test_engine_matches_naive_scan():
+    engine = PriceAlertEngine()
+    engine.seed_price("SOL", 20.0)
+    engine.add_alerts_bulk(
+        (i % 7, "SOL", "above" if i % 2 else "below", 18.0 + (i % 41) * 0.1) for i in range(500)
+    )
+    prices = [20.0, 21.0, 19.5, 18.0, 22.0, 20.0, 22.1]
+    for last, price in zip(prices, prices[1:]):
+        expected = set(_naive_scan(engine._alerts, "SOL", last, price))
+        triggered = engine.on_price("SOL", price)
+        assert {event["id"] for event in triggered} == expected
+
+
+def test_seed_price_does_not_trigger():
+    engine = PriceAlertEngine()
+    engine.seed_price("SOL", 10.0)
+    alert = engine.add_alert(1, "sol", "above", 11.0)
+    engine.seed_price("SOL", 12.0)
+    assert engine.on_price("SOL", 12.5) == []
+    assert engine.list_alerts(1) == [alert]
+
+
+@pytest.fixture
+def shared_store(tmp_path, monkeypatch):
+    store = UserSettingsStore({"alerts": []}, str(tmp_path), flush_interval_ms=0)
+    monkeypatch.setattr(alerts, "alert_store", store)
+    return tmp_path
+
+
+@pytest.mark.anyio
+async def test_save_merges_alerts_from_other_workers(shared_store, monkeypatch):
+    worker_a = alerts.alert_store
+    worker_b = UserSettingsStore({"alerts": []}, str(shared_store), flush_interval_ms=0)
+    first = {"id": alerts.new_alert_id(), "currency": "SOL", "direction": "above", "threshold": 30.0}
+    second = {"id": alerts.new_alert_id(), "currency": "SOL", "direction": "below", "threshold": 10.0}
+
+    alerts.save_user_alerts(1, added=[first])
+    await worker_a.flush()
+
+    monkeypatch.setattr(alerts, "alert_store", worker_b)
+    assert alerts.save_user_alerts(1, added=[second]) == [first, second]
+    await worker_b.flush()
+
+    monkeypatch.setattr(alerts, "alert_store", worker_a)
+    assert alerts.save_user_alerts(1, removed=[first["id"]]) == [second]
+    assert first["id"] != second["id"]
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+
+from app.services.audio import AudioStream, EnergyVAD, RingBuffer, StubASRBackend
+
+
+def tone(samples: int, amplitude: int) -> bytes:
+    t = np.arange(samples)
+    return (amplitude * np.sin(2 * np.pi * 440 * t / 16000)).astype("<i2").tobytes()
+
+
+def test_ring_buffer_truncates_when_full():
+    ring = RingBuffer(8)
+    assert ring.write(memoryview(b"abcdef")) == 6
+    # 缓冲区满时只写入剩余空间，调用方需先消费再继续写
+    assert ring.write(memoryview(b"ghijk")) == 2
+    assert ring.free == 0
+
+    out = memoryview(bytearray(4))
+    assert ring.read_into(out) == 4
+    assert bytes(out) == b"abcd"
+    assert ring.write(memoryview(b"XYZ")) == 3
+    rest = memoryview(bytearray(8))
+    assert ring.read_into(rest) == 7
+    assert bytes(rest[:7]) == b"efghXYZ"
+
+
+def test_large_chunk_is_drained_through_fixed_ring():
+    stream = AudioStream(sample_rate=16000)
+    capacity = stream.ring.capacity
+    chunk = tone(16000 * 10, 8000)
+    assert len(chunk) > capacity * 4
+
+    stream.push(chunk)
+
+    assert stream.ring.capacity == capacity
+    assert len(stream.ring) < stream.frame_bytes
+    assert stream.total_frames == len(chunk) // stream.frame_bytes
+    assert stream.voiced_frames == stream.total_frames
+
+
+def test_many_small_chunks_do_not_grow_buffer():
+    stream = AudioStream(sample_rate=16000)
+    capacity = stream.ring.capacity
+    data = tone(16000, 8000)
+    for i in range(0, len(data), 7):
+        stream.push(data[i:i + 7])
+        assert len(stream.ring) < stream.frame_bytes
+
+    assert stream.ring.capacity == capacity
+    assert stream.finish() != ""
+    assert stream.asr.voiced_bytes == len(data)
+
+
+def test_vad_rms_matches_reference():
+    vad = EnergyVAD(threshold_db=-45.0, hangover_frames=0)
+    frame = tone(320, 200)
+    samples = memoryview(frame).cast("h")
+    reference = math.sqrt(sum(s * s for s in samples) / len(samples))
+    assert (reference >= vad.threshold) == vad.is_speech(memoryview(frame))
+
+    loud = np.full(320, -32768, dtype="<i2").tobytes()
+    assert vad.is_speech(memoryview(loud))
+
+
+def test_vad_hangover_and_silence_trimming():
+    vad = EnergyVAD(threshold_db=-45.0, hangover_frames=2)
+    silence = memoryview(bytes(640))
+    speech = memoryview(tone(320, 8000))
+
+    assert not vad.is_speech(silence)
+    assert vad.is_speech(speech)
+    assert vad.is_speech(silence)
+    assert vad.is_speech(silence)
+    assert not vad.is_speech(silence)
+    assert not vad.is_speech(memoryview(b""))
+
+
+def test_silent_stream_yields_empty_transcript():
+    stream = AudioStream(sample_rate=16000)
+    stream.push(bytes(16000 * 2))
+    assert stream.finish() == ""
+    assert stream.voiced_frames == 0
+    assert isinstance(stream.asr, StubASRBackend)
@@ -0,0 +1,67 @@
+import json
+import os
+import time
+
+from app.core.audit import AuditLog, AuditReader
+
+
+def write_segment(directory, name, records):
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_query_orders_by_record_time_across_segments(tmp_path):
+    # 两个工作进程各写一个分段，文件名顺序与记录时间交错
+    write_segment(tmp_path, "audit-20250101-000000-1-0.jsonl",
+                  [{"t": 1.0, "kind": "transfer", "user": 1}, {"t": 3.0, "kind": "transfer", "user": 1}])
+    write_segment(tmp_path, "audit-20250101-000000-2-0.jsonl",
+                  [{"t": 2.0, "kind": "transfer", "user": 1}, {"t": 4.0, "kind": "transfer", "user": 2}])
+    reader = AuditReader(str(tmp_path))
+
+    assert [r["t"] for r in reader.query(user_id=1)] == [3.0, 2.0, 1.0]
+    assert [r["t"] for r in reader.query(user_id=1, limit=2)] == [3.0, 2.0]
+
+
+def test_query_indexes_new_records_incrementally(tmp_path):
+    path = tmp_path / "audit-20250101-000000-1-0.jsonl"
+    write_segment(tmp_path, path.name, [{"t": 1.0, "kind": "tool", "user": 1, "session": "s"}])
+    reader = AuditReader(str(tmp_path))
+    assert len(reader.query(session_id="s")) == 1
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"t": 2.0, "kind": "tool", "user": 1, "session": "s", "sig": "x"}) + "\n")
+        f.write('{"t": 3.0, "user"')  # 未写完的行留到下次
+    assert [r["t"] for r in reader.query(session_id="s")] == [2.0, 1.0]
+    assert reader.query(signature="x", user_id=2) == []
+    assert reader.stats["corrupt"] == 0
+
+
+def test_writer_survives_commit_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.core.audit.RESTART_DELAY_SECONDS", 0)
+    log = AuditLog(str(tmp_path), commit_window_ms=1, max_batch=10, segment_bytes=1 << 20, queue_size=100)
+    original = log._commit
+    calls = {"n": 0}
+
+    def flaky(batch):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise OSError("disk full")
+        original(batch)
+
+    monkeypatch.setattr(log, "_commit", flaky)
+    log.start()
+    try:
+        log.append("transfer", 1)
+        deadline = time.monotonic() + 5
+        while log.stats["failures"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert log.running
+
+        log.append("transfer", 1, signature="after")
+    finally:
+        log.stop()
+
+    assert log.stats["failures"] == 1
+    assert log.stats["lost"] == 1
+    assert [r["sig"] for r in AuditReader(str(tmp_path)).query(user_id=1)] == ["after"]
@@ -0,0 +1,73 @@
+
+import pytest
+
+from app.services import batch
+
+
+@pytest.fixture(autouse=True)
+def no_classifier(monkeypatch):
+    # 只验证解析和容错，分类器由 test_intents 覆盖
+    monkeypatch.setattr(batch.settings, "INTENT_CLASSIFIER_ENABLED", False)
+
+
+def test_interpret_chunk_isolates_bad_records():
+    lines = [
+        '{"id": 1, "query": "查询余额"}',
+        '{"id": 2, "query": 123}',
+        '[1, 2]',
+        '{"id": 3}',
+        'not json',
+        '"给小明转5个sol"',
+    ]
+    results = batch.interpret_chunk(lines)
+
+    assert len(results) == len(lines)
+    assert results[0]["intent"] == "query_balance"
+    for result, line in zip(results[1:5], lines[1:5]):
+        assert result["line"] == line
+        assert "error" in result
+    assert results[5]["intent"] == "transfer"
+
+
+def test_interpret_chunk_bad_record_with_classifier(monkeypatch):
+    monkeypatch.setattr(batch.settings, "INTENT_CLASSIFIER_ENABLED", True)
+    calls = []
+
+    class Recorder:
+        def classify_batch(self, queries):
+            assert all(isinstance(query, str) for query in queries)
+            calls.append(list(queries))
+            return [None] * len(queries)
+
+    monkeypatch.setattr("app.services.intent_classifier.intent_classifier", Recorder())
+    results = batch.interpret_chunk(['{"query": 123}', '{"query": "你好"}'])
+
+    assert calls == [["你好"]]
+    assert "error" in results[0]
+    assert results[1]["intent"] == "direct_response"
+
+
+def test_iter_chunks_skips_blank_lines():
+    assert list(batch.iter_chunks(["a\n", "\n", "b", "c", "  "], 2)) == [["a", "b"], ["c"]]
+
+
+def test_summary_counts_errors_and_coverage():
+    summary = batch.BatchSummary()
+    for result in batch.interpret_chunk(['"查询余额"', '"你好"', '{"query": 1}']):
+        summary.add(result)
+    report = summary.to_dict()
+
+    assert report["total"] == 3
+    assert report["errors"] == 1
+    assert report["coverage"] == round(1 / 3, 4)
+
+
+@pytest.mark.anyio
+async def test_aiter_lines_handles_split_multibyte_characters():
+    data = "查询余额\n你好".encode("utf-8")
+
+    async def chunks():
+        for i in range(len(data)):
+            yield data[i:i + 1]
+
+    assert [line async for line in batch.aiter_lines(chunks())] == ["查询余额", "你好"]
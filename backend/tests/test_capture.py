@@ -0,0 +1,55 @@
+import base64
+import hashlib
+import json
+
+from app.core.capture import REDACTED, CaptureWriter, _encode_body
+
+
+def make_record(**overrides):
+    record = {
+        "t": 1.0, "method": "POST", "path": "/v1/api/auth/login", "query": "",
+        "headers": [(b"content-type", b"application/json"), (b"authorization", b"Bearer x.y.z")],
+        "body": b"", "truncated": False, "status": 200, "latency_ms": 1.0,
+    }
+    record.update(overrides)
+    return record
+
+
+def serialize(record):
+    return CaptureWriter("unused", 1, 1, 1, 1)._serialize(record)
+
+
+def test_json_fields_are_scrubbed():
+    encoding, body = _encode_body(b'{"username": "a", "password": "secret", "nested": [{"token": "t"}]}',
+                                  "application/json")
+    assert encoding == "json"
+    assert json.loads(body) == {"username": "a", "password": REDACTED, "nested": [{"token": REDACTED}]}
+
+
+def test_unparseable_json_keeps_only_digest():
+    raw = b'{"password": "secret"'
+    encoding, body = _encode_body(raw, "application/json; charset=utf-8")
+
+    assert encoding == "redacted"
+    assert "secret" not in body
+    assert hashlib.sha256(raw).hexdigest() in body
+    assert f"length={len(raw)}" in body
+
+
+def test_form_fields_are_scrubbed():
+    encoding, body = _encode_body(b"username=a&password=secret", "application/x-www-form-urlencoded")
+    assert encoding == "form"
+    assert "secret" not in body and "username=a" in body
+
+
+def test_other_bodies_are_base64():
+    encoding, body = _encode_body(b"\x00\x01", "application/octet-stream")
+    assert (encoding, base64.b64decode(body)) == ("base64", b"\x00\x01")
+
+
+def test_query_params_and_headers_are_scrubbed():
+    serialized = serialize(make_record(query="access_token=abc&Token=def&page=2&empty="))
+
+    assert "abc" not in serialized["query"] and "def" not in serialized["query"]
+    assert "page=2" in serialized["query"] and "empty=" in serialized["query"]
+    assert "authorization" not in serialized["headers"]
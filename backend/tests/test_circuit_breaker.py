@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, LastGoodCache
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = {"failure_rate": 0.5, "slow_call_ms": 100, "window": 10, "min_calls": 4,
+               "reset_timeout": 0, "half_open_calls": 2, **overrides}
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_only_after_min_calls():
+    breaker = make_breaker()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    # 样本数不足 min_calls 时即使全部失败也不打开
+    assert breaker.state == CLOSED
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_failure_rate():
+    breaker = make_breaker()
+    for ok in (True, True, False, True, True, False, True):
+        breaker.allow()
+        if ok:
+            breaker.record_success(0.01)
+        else:
+            breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_success(0.5)
+    assert breaker.state == OPEN
+    assert breaker.stats["slow_calls"] == 4
+    assert breaker.stats["failures"] == 0
+
+
+def test_open_rejects_until_reset_timeout():
+    breaker = make_breaker(reset_timeout=60)
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.check()
+    assert 0 < excinfo.value.retry_after <= 60
+    assert breaker.stats["rejected"] == 1
+
+
+def open_breaker(**overrides) -> CircuitBreaker:
+    breaker = make_breaker(**overrides)
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_half_open_limits_trials_and_closes_after_successes():
+    breaker = open_breaker()
+
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert breaker.allow()
+    # 试探名额用完后拒绝
+    assert not breaker.allow()
+
+    breaker.record_success(0.01)
+    assert breaker.state == HALF_OPEN
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial_failure_reopens():
+    breaker = open_breaker(reset_timeout=60)
+    breaker._opened_at -= 60
+
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats["opened"] == 2
+
+
+def test_cancelled_trial_returns_its_slot():
+    breaker = open_breaker()
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_cancelled()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+@pytest.mark.anyio
+async def test_call_records_cancellation_without_failure():
+    breaker = open_breaker()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    task = asyncio.ensure_future(breaker.call(hang))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == HALF_OPEN
+    assert breaker._trials == 0
+    assert breaker.stats["failures"] == 4
+
+
+@pytest.mark.anyio
+async def test_last_good_cache_returns_stale_value_on_failure():
+    cache = LastGoodCache(max_entries=2)
+
+    async def ok():
+        return {"balance": 1}
+
+    async def fail():
+        raise ConnectionError("down")
+
+    assert await cache.fetch("a", ok, (ConnectionError,)) == ({"balance": 1}, False)
+    assert await cache.fetch("a", fail, (ConnectionError,)) == ({"balance": 1}, True)
+    assert cache.stats == {"fresh": 1, "stale": 1}
+
+    # 没有旧值或异常不在降级范围内时抛出原异常
+    with pytest.raises(ConnectionError):
+        await cache.fetch("b", fail, (ConnectionError,))
+    with pytest.raises(ConnectionError):
+        await cache.fetch("a", fail, (ValueError,))
+
+
+@pytest.mark.anyio
+async def test_last_good_cache_evicts_least_recent():
+    cache = LastGoodCache(max_entries=2)
+
+    async def value():
+        return 1
+
+    async def fail():
+        raise ConnectionError("down")
+
+    for key in ("a", "b", "c"):
+        await cache.fetch(key, value, (ConnectionError,))
+    with pytest.raises(ConnectionError):
+        await cache.fetch("a", fail, (ConnectionError,))
+    assert await cache.fetch("c", fail, (ConnectionError,)) == (1, True)
@@ -0,0 +1,148 @@
+import pytest
+
+from app.services.batch import LineTooLongError, aiter_lines
+from app.services.contacts import (
+    B58_ALPHABET, address_error, aiter_csv_records, aiter_jsonl_records,
+    b58decode, import_records, validate_contact,
+)
+
+# System Program 地址：32 个全零字节
+SYSTEM_PROGRAM = "1" * 32
+VALID_ADDRESS = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+
+
+async def agen(items):
+    for item in items:
+        yield item
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def csv_records(text: str, chunk: int = 5, max_bytes: int = 0):
+    data = text.encode("utf-8")
+    chunks = [data[i:i + chunk] for i in range(0, len(data), chunk)]
+    return aiter_csv_records(aiter_lines(agen(chunks), max_bytes), max_bytes)
+
+
+def test_b58decode_known_values():
+    assert b58decode("") == b""
+    assert b58decode("1") == b"\x00"
+    assert b58decode("2") == b"\x01"
+    assert b58decode("z") == bytes([57])
+    assert b58decode("21") == bytes([58])
+    assert b58decode("111z") == b"\x00\x00\x00" + bytes([57])
+    assert b58decode(SYSTEM_PROGRAM) == bytes(32)
+
+
+@pytest.mark.parametrize("char", ["0", "O", "I", "l", "+", "/"])
+def test_b58decode_rejects_characters_outside_alphabet(char):
+    assert char not in B58_ALPHABET
+    with pytest.raises(ValueError):
+        b58decode("2" + char)
+
+
+def test_address_error():
+    assert address_error(SYSTEM_PROGRAM) is None
+    assert address_error(VALID_ADDRESS) is None
+    assert "长度" in address_error("abc")
+    assert "长度" in address_error("2" * 45)
+    assert "Base58" in address_error("0" * 32)
+    # 长度合法但解码后不是 32 字节
+    assert "32 字节" in address_error("z" * 44)
+
+
+def test_validate_contact():
+    assert validate_contact({"name": "Alice", "address": VALID_ADDRESS}) is None
+    assert "name" in validate_contact({"name": " ", "address": VALID_ADDRESS})
+    assert "name" in validate_contact({"name": "x" * 65, "address": VALID_ADDRESS})
+    assert "address" in validate_contact({"name": "Alice"})
+    assert "note" in validate_contact({"name": "Alice", "address": VALID_ADDRESS, "note": "x" * 257})
+    assert "note" in validate_contact({"name": "Alice", "address": VALID_ADDRESS, "note": 1})
+
+
+@pytest.mark.anyio
+async def test_csv_quoted_multiline_fields():
+    text = (
+        "\ufeffName,Address,Note\n"
+        f'Alice,{VALID_ADDRESS},"第一行\n第二行, 含逗号"\n'
+        f'"Bob ""B""",{SYSTEM_PROGRAM},"a\n\nb"\n'
+        "\n"
+        f"Carol,{VALID_ADDRESS},plain\n"
+    )
+    rows = await collect(csv_records(text))
+
+    assert rows == [
+        (1, {"name": "Alice", "address": VALID_ADDRESS, "note": "第一行\n第二行, 含逗号"}),
+        (2, {"name": 'Bob "B"', "address": SYSTEM_PROGRAM, "note": "a\n\nb"}),
+        (3, {"name": "Carol", "address": VALID_ADDRESS, "note": "plain"}),
+    ]
+
+
+@pytest.mark.anyio
+async def test_csv_unclosed_quote_is_reported():
+    rows = await collect(csv_records(f'name,address,note\nAlice,{VALID_ADDRESS},"open\nmore\n'))
+    assert rows == [(1, {"_error": "引号未闭合"})]
+
+
+@pytest.mark.anyio
+async def test_aiter_lines_bounds_unterminated_line():
+    chunks = [b"x" * 100] * 100
+    lines = aiter_lines(agen(chunks), max_line_bytes=1000)
+    with pytest.raises(LineTooLongError):
+        await collect(lines)
+
+
+@pytest.mark.anyio
+async def test_aiter_lines_splits_multibyte_characters_across_chunks():
+    data = "名字\n地址\n".encode("utf-8")
+    chunks = [data[i:i + 1] for i in range(len(data))]
+    assert await collect(aiter_lines(agen(chunks), max_line_bytes=6)) == ["名字", "地址"]
+
+
+@pytest.mark.anyio
+async def test_csv_oversized_line_stops_with_row_error():
+    text = f"name,address,note\nAlice,{VALID_ADDRESS},ok\nBob,{VALID_ADDRESS},{'x' * 500}\nCarol,x,y\n"
+    rows = await collect(csv_records(text, chunk=64, max_bytes=200))
+
+    assert rows[0][0] == 1 and rows[0][1]["name"] == "Alice"
+    assert rows[1][0] == 2 and "200 字节上限" in rows[1][1]["_error"]
+    assert len(rows) == 2
+
+
+@pytest.mark.anyio
+async def test_csv_oversized_multiline_record_stops():
+    body = "\n".join(["y" * 50] * 10)
+    text = f'name,address,note\nAlice,{VALID_ADDRESS},"{body}"\n'
+    rows = await collect(csv_records(text, max_bytes=200))
+    assert rows == [(1, {"_error": "单条记录超过 200 字节上限，后续内容已忽略"})]
+
+
+@pytest.mark.anyio
+async def test_jsonl_oversized_line_is_reported():
+    lines = aiter_lines(agen([b'{"name": "a"}\n', b"z" * 300]), max_line_bytes=100)
+    rows = await collect(aiter_jsonl_records(lines))
+    assert rows[0] == (1, {"name": "a"})
+    assert rows[1][0] == 2 and "100 字节上限" in rows[1][1]["_error"]
+
+
+@pytest.mark.anyio
+async def test_import_records_summary():
+    text = (
+        "name,address,note\n"
+        f"Alice,{VALID_ADDRESS},\n"
+        f"Dup,{VALID_ADDRESS},\n"
+        "Bad,0OIl0OIl0OIl0OIl0OIl0OIl0OIl0OIl,\n"
+        f"Known,{SYSTEM_PROGRAM},\n"
+    )
+    inserted = []
+    results = await collect(import_records(
+        csv_records(text), {SYSTEM_PROGRAM}, inserted.extend, chunk_size=2, max_rows=100
+    ))
+
+    assert [c["name"] for c in inserted] == ["Alice"]
+    errors = {item["row"]: item["error"] for item in results if "row" in item}
+    assert errors[2] == "地址已存在" and errors[4] == "地址已存在"
+    assert "Base58" in errors[3]
+    assert results[-1] == {"summary": {"rows": 4, "imported": 1, "failed": 3, "duplicates": 2}}
@@ -0,0 +1,126 @@
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services import batch
+from app.services.intent_classifier import IntentClassifier, Prediction
+from app.services.intents import apply_confidence, parse_voice_intent
+
+TRAINING_DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app", "data", "intent_utterances.jsonl")
+LABELS = ("direct_response", "query_balance", "query_portfolio", "query_spending", "query_transactions", "transfer")
+
+
+def prediction(**scores: float) -> Prediction:
+    """构造分类结果，未给出的类别平分剩余概率"""
+    rest = (1 - sum(scores.values())) / (len(LABELS) - len(scores))
+    full = {label: scores.get(label, rest) for label in LABELS}
+    intent = max(full, key=full.get)
+    return Prediction(intent, full[intent], full)
+
+
+@pytest.fixture(scope="module")
+def classifier(tmp_path_factory):
+    model_path = tmp_path_factory.mktemp("model") / "intent_model.npz"
+    trained = IntentClassifier(TRAINING_DATA, str(model_path), settings.INTENT_HASH_FEATURES)
+    trained.load()
+    return trained
+
+
+def test_without_prediction_rules_are_unchanged():
+    intent_data = parse_voice_intent("查询余额")
+    assert apply_confidence("查询余额", intent_data, None) is intent_data
+
+
+def test_rule_hit_uses_score_of_rule_intent():
+    result = apply_confidence("查询余额", parse_voice_intent("查询余额"),
+                              prediction(query_balance=0.9, direct_response=0.05))
+    assert result["intent"] == "query_balance"
+    assert result["confidence"] == 0.9
+    assert not result["requires_confirmation"]
+    assert "low_confidence" not in result
+
+
+def test_rule_hit_below_confirm_threshold_requires_confirmation():
+    result = apply_confidence("查询余额", parse_voice_intent("查询余额"),
+                              prediction(query_balance=0.6, direct_response=0.3))
+    assert result["requires_confirmation"]
+    assert "low_confidence" not in result
+
+
+def test_rule_hit_below_min_confidence_is_flagged():
+    result = apply_confidence("查询余额", parse_voice_intent("查询余额"),
+                              prediction(query_balance=0.3, direct_response=0.6))
+    assert result["intent"] == "query_balance"
+    assert result["low_confidence"]
+    assert result["requires_confirmation"]
+
+
+def test_classifier_only_below_threshold_keeps_direct_response():
+    query = "帮我看看天气"
+    result = apply_confidence(query, parse_voice_intent(query),
+                              prediction(query_balance=0.59, direct_response=0.4))
+    assert result["intent"] == "direct_response"
+    assert result["tool_calls"] is None
+    # 置信度是返回意图（direct_response）的概率
+    assert result["confidence"] == 0.4
+    assert result["low_confidence"]
+
+
+def test_classifier_only_above_threshold_builds_tool_call():
+    query = "我的币还剩多少"
+    assert parse_voice_intent(query)["intent"] == "direct_response"
+    result = apply_confidence(query, parse_voice_intent(query), prediction(query_balance=0.85))
+    assert result["intent"] == "query_balance"
+    assert result["tool_calls"][0]["id"] == "query_balance"
+    assert result["confidence"] == 0.85
+
+
+def test_classifier_only_threshold_is_configurable(monkeypatch):
+    monkeypatch.setattr(settings, "INTENT_CLASSIFIER_ONLY_CONFIDENCE", 0.6)
+    query = "我的币还剩多少"
+    result = apply_confidence(query, parse_voice_intent(query), prediction(query_balance=0.7))
+    assert result["intent"] == "query_balance"
+    # 低于 INTENT_CONFIRM_CONFIDENCE 的工具调用要求确认
+    assert result["requires_confirmation"]
+
+
+def test_transfer_without_arguments_returns_clarify():
+    query = "给小明转点钱"
+    result = apply_confidence(query, parse_voice_intent(query), prediction(transfer=0.9))
+    assert result["intent"] == "clarify"
+    assert result["tool_calls"] is None
+    assert "收款人和金额" in result["message"]
+    assert result["confidence"] == 0.9
+
+
+def test_trained_classifier_keeps_out_of_domain_text_as_direct_response(classifier):
+    for query in ("帮我看看天气", "帮我订一张机票", "讲个笑话"):
+        result = apply_confidence(query, parse_voice_intent(query), classifier.classify(query))
+        assert result["intent"] == "direct_response", query
+        assert result["tool_calls"] is None
+
+
+def test_batch_and_single_predictions_match(classifier):
+    queries = ["给小明转5个sol", "查询余额", "我有哪些资产", "上个月给alice转了多少", "你好", "帮我看看天气"]
+    singles = [classifier.classify(query) for query in queries]
+    batched = classifier.classify_batch(queries)
+    for single, batch_prediction in zip(singles, batched):
+        assert single.intent == batch_prediction.intent
+        assert single.confidence == pytest.approx(batch_prediction.confidence, abs=1e-4)
+        assert single.scores == pytest.approx(batch_prediction.scores, abs=1e-4)
+
+
+def test_interpret_chunk_matches_single_query_path(classifier, monkeypatch):
+    monkeypatch.setattr("app.services.intent_classifier.intent_classifier", classifier)
+    queries = ["给小明转5个sol", "查询余额", "我有哪些资产", "给小明转点钱", "帮我看看天气"]
+    lines = [f'{{"id": {i}, "query": "{query}"}}' for i, query in enumerate(queries)] + ["not json"]
+
+    results = batch.interpret_chunk(lines)
+
+    assert "error" in results[-1]
+    for query, result in zip(queries, results):
+        single = apply_confidence(query, parse_voice_intent(query), classifier.classify(query))
+        assert result["intent"] == single["intent"]
+        assert result["confidence"] == pytest.approx(single["confidence"], abs=1e-4)
+        assert result["tool_calls"] == single["tool_calls"]
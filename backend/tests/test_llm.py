@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.services import llm_stub
+from app.services.llm import LLMInterpreter
+from app.services.tool_registry import BUILTIN_TOOLS
+
+
+def make_interpreter(timeout_ms: float = 1000) -> LLMInterpreter:
+    breaker = CircuitBreaker("test_llm", failure_rate=0.5, slow_call_ms=2000, window=20,
+                             min_calls=10, reset_timeout=30, half_open_calls=1)
+    interpreter = LLMInterpreter("http://stub/v1", api_key="", model="stub", timeout_ms=timeout_ms,
+                                 request_timeout=5, cache_size=16, cache_ttl=60, breaker=breaker)
+    interpreter._client = httpx.AsyncClient(app=llm_stub.app, base_url="http://stub/v1")
+    return interpreter
+
+
+@pytest.fixture
+async def llm(monkeypatch):
+    monkeypatch.setattr(llm_stub, "STUB_DELAY_MS", 0)
+    interpreter = make_interpreter()
+    yield interpreter
+    await interpreter.aclose()
+
+
+@pytest.mark.anyio
+async def test_streamed_tool_call_is_assembled(llm):
+    result = await llm.interpret("北京的天气怎么样", BUILTIN_TOOLS)
+
+    # 桩服务把参数拆成两段发送
+    assert result["intent"] == "weather_query"
+    assert result["requires_confirmation"] is True
+    assert result["tool_calls"] == [{"id": "weather_query",
+                                     "function": {"name": "weather_query", "arguments": {"city": "北京"}}}]
+
+
+@pytest.mark.anyio
+async def test_streamed_content_is_assembled(llm):
+    result = await llm.interpret("讲个笑话", BUILTIN_TOOLS)
+    assert result["intent"] == "direct_response"
+    assert result["message"] == "抱歉，我还不能处理这个请求。"
+
+
+@pytest.mark.anyio
+async def test_normalized_repeat_hits_cache(llm):
+    first = await llm.interpret("北京的天气怎么样？", BUILTIN_TOOLS)
+    second = await llm.interpret("北京的天气 怎么样", BUILTIN_TOOLS)
+
+    assert second == first
+    assert llm.stats["calls"] == 1
+    assert llm.stats["cache_hits"] == 1
+
+    # 工具目录版本变化后不再命中旧结果
+    await llm.interpret("北京的天气怎么样", BUILTIN_TOOLS, catalog_version=1)
+    assert llm.stats["calls"] == 2
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_queries_share_one_call(llm, monkeypatch):
+    monkeypatch.setattr(llm_stub, "STUB_DELAY_MS", 20)
+    results = await asyncio.gather(*(llm.interpret("上海的天气", BUILTIN_TOOLS) for _ in range(5)))
+
+    assert all(result == results[0] for result in results)
+    assert llm.stats["calls"] == 1
+    assert llm.stats["coalesced"] == 4
+
+
+@pytest.mark.anyio
+async def test_timeout_returns_none_and_caches_late_result(monkeypatch):
+    monkeypatch.setattr(llm_stub, "STUB_DELAY_MS", 100)
+    interpreter = make_interpreter(timeout_ms=10)
+    try:
+        assert await interpreter.interpret("广州的天气", BUILTIN_TOOLS) is None
+        assert interpreter.stats["timeouts"] == 1
+
+        # 上游调用在后台完成后写入缓存
+        while interpreter._inflight:
+            await asyncio.sleep(0.02)
+        assert (await interpreter.interpret("广州的天气", BUILTIN_TOOLS))["intent"] == "weather_query"
+        assert interpreter.stats["cache_hits"] == 1
+    finally:
+        await interpreter.aclose()
+
+
+@pytest.mark.anyio
+async def test_interpret_query_falls_back_to_rules_on_timeout(monkeypatch):
+    from app.routers import voice
+
+    monkeypatch.setattr(settings, "INTENT_CLASSIFIER_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_FALLBACK_ENABLED", False)
+    expected = await voice.interpret_query("杭州的天气")
+
+    monkeypatch.setattr(settings, "LLM_FALLBACK_ENABLED", True)
+    monkeypatch.setattr(llm_stub, "STUB_DELAY_MS", 100)
+    interpreter = make_interpreter(timeout_ms=10)
+    monkeypatch.setattr(voice, "llm_interpreter", interpreter)
+    try:
+        assert await voice.interpret_query("杭州的天气") == expected
+        assert interpreter.stats["timeouts"] == 1
+    finally:
+        while interpreter._inflight:
+            await asyncio.sleep(0.02)
+        await interpreter.aclose()
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from app.services import notifications
+from app.services.notifications import NotificationHub
+
+
+class FakeBroker:
+    """进程内的发布订阅，代替 Redis 频道"""
+
+    def __init__(self):
+        self.queues = []
+
+    def client(self):
+        return FakeRedis(self)
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.broker.queues.append(self.queue)
+
+    async def listen(self):
+        while True:
+            message = await self.queue.get()
+            if isinstance(message, Exception):
+                raise message
+            yield {"type": "message", "data": message}
+
+    async def aclose(self):
+        if self.queue in self.broker.queues:
+            self.broker.queues.remove(self.queue)
+
+
+class FakeRedis:
+    def __init__(self, broker):
+        self.broker = broker
+
+    def pubsub(self):
+        return FakePubSub(self.broker)
+
+    async def publish(self, channel, message):
+        for queue in list(self.broker.queues):
+            queue.put_nowait(message)
+
+    async def aclose(self):
+        pass
+
+
+def make_hub(**kwargs):
+    return NotificationHub(queue_size=8, heartbeat_seconds=60, replay_size=8, max_connections=10,
+                           max_connections_per_user=2, **kwargs)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture(autouse=True)
+def all_enabled(monkeypatch):
+    monkeypatch.setattr(NotificationHub, "_enabled", lambda self, user_id, category: True)
+
+
+@pytest.mark.anyio
+async def test_events_reach_subscribers_on_other_workers():
+    broker = FakeBroker()
+    publisher, receiver = make_hub(fanout_enabled=True), make_hub(fanout_enabled=True)
+    await publisher.start(broker.client())
+    await receiver.start(broker.client())
+    await settle()
+    try:
+        local = publisher.subscribe(1)
+        remote = receiver.subscribe(1)
+        event_id = publisher.publish(1, "transaction", {"amount": 1})
+        await settle()
+
+        assert len(local.queue) == 1
+        assert list(remote.queue) == list(local.queue)
+        assert f"id: {event_id}".encode() in remote.queue[0]
+        # 自己转发出去的事件不会重复投递
+        assert publisher.stats["received"] == 0
+        assert receiver.stats["received"] == 1
+
+        # 连到另一个进程重连时也能按 Last-Event-ID 补发
+        replayed = receiver.subscribe(1, last_event_id=event_id - 1)
+        assert len(replayed.queue) == 1
+    finally:
+        await publisher.stop()
+        await receiver.stop()
+
+
+@pytest.mark.anyio
+async def test_listener_reconnects_after_disconnect(monkeypatch):
+    monkeypatch.setattr(notifications, "RECONNECT_DELAY_SECONDS", 0)
+    broker = FakeBroker()
+    hub = make_hub(fanout_enabled=True)
+    await hub.start(broker.client())
+    await settle()
+    try:
+        assert hub.get_stats()["fanout_listening"]
+        broker.queues[0].put_nowait(ConnectionError("lost"))
+        await settle()
+
+        assert hub.stats["reconnects"] == 1
+        assert hub.get_stats()["fanout_listening"]
+        assert len(broker.queues) == 1
+    finally:
+        await hub.stop()
+
+
+@pytest.mark.anyio
+async def test_event_ids_increase_within_a_worker():
+    hub = make_hub()
+    ids = [hub.publish(1, "security", {}) for _ in range(3)]
+    assert ids == sorted(set(ids))
+
+
+@pytest.mark.anyio
+async def test_without_fanout_publish_stays_local():
+    hub = make_hub()
+    await hub.start()
+    try:
+        hub.publish(1, "transaction", {})
+        assert hub.get_stats()["fanout"] is False
+        assert hub.stats["forwarded"] == 0
+    finally:
+        await hub.stop()
@@ -0,0 +1,72 @@
+import pytest
+
+from app.services import rpc_stub
+from app.services.portfolio import fetch_portfolio
+from app.services.solana_rpc import TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID, RPCError
+
+OWNER = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+
+
+@pytest.mark.anyio
+async def test_fetch_portfolio_sends_one_batch(rpc):
+    before = dict(rpc_stub.STATS)
+    portfolio = await fetch_portfolio(OWNER, rpc=rpc)
+
+    assert rpc_stub.STATS["http_requests"] == before["http_requests"] + 1
+    assert rpc_stub.STATS["calls"] == before["calls"] + 3
+    assets = {asset["currency"]: asset for asset in portfolio["assets"]}
+    assert assets["SOL"]["balance"] > 0
+    # 同一 mint 的两个代币账户汇总为一项
+    assert assets["USDC"]["balance"] == 150
+    assert assets["USDC"]["accounts"] == 2
+    # Token-2022 程序下的代币账户也被计入
+    assert assets["PYUSD"]["balance"] == 25
+    # 余额为 0 的代币不展示
+    assert "So11111111111111111111111111111111111111112" not in {asset.get("mint") for asset in portfolio["assets"]}
+
+
+@pytest.mark.anyio
+async def test_batch_results_follow_call_order(rpc):
+    config = {"commitment": "confirmed", "encoding": "jsonParsed"}
+    slot, legacy, token_2022 = await rpc.batch([
+        ("getSlot", []),
+        ("getTokenAccountsByOwner", [OWNER, {"programId": TOKEN_PROGRAM_ID}, config]),
+        ("getTokenAccountsByOwner", [OWNER, {"programId": TOKEN_2022_PROGRAM_ID}, config]),
+    ])
+
+    assert isinstance(slot, int)
+    assert {account["account"]["owner"] for account in legacy["value"]} == {TOKEN_PROGRAM_ID}
+    assert {account["account"]["owner"] for account in token_2022["value"]} == {TOKEN_2022_PROGRAM_ID}
+
+
+@pytest.mark.anyio
+async def test_batch_error_reply_raises(rpc):
+    with pytest.raises(RPCError) as excinfo:
+        await rpc.batch([("getSlot", []), ("getNoSuchMethod", [])])
+    assert excinfo.value.code == -32601
+
+
+@pytest.mark.anyio
+async def test_single_call_error_reply_raises(rpc):
+    with pytest.raises(RPCError) as excinfo:
+        await rpc.call("getTokenAccountsByOwner", [OWNER, {"programId": "unknown"}])
+    assert excinfo.value.code == -32602
+
+
+@pytest.mark.anyio
+async def test_fetch_portfolio_falls_back_to_last_good(rpc, monkeypatch):
+    owner = "FallbackOwner111111111111111111111111111111"
+    fresh = await fetch_portfolio(owner, rpc=rpc)
+
+    monkeypatch.delitem(rpc_stub.METHODS, "getBalance")
+    cached = await fetch_portfolio(owner, rpc=rpc)
+
+    assert cached["stale"] is True
+    assert cached["assets"][0]["balance"] == fresh["assets"][0]["balance"]
+
+
+@pytest.mark.anyio
+async def test_fetch_portfolio_without_cached_result_raises(rpc, monkeypatch):
+    monkeypatch.delitem(rpc_stub.METHODS, "getBalance")
+    with pytest.raises(RPCError):
+        await fetch_portfolio("NeverFetchedOwner11111111111111111111111111", rpc=rpc)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import revocation
+from app.core.revocation import RevocationFilter, RevocationRegistry
+
+
+class FakeRedis:
+    """进程内的有序集合和发布订阅，代替 Redis"""
+
+    def __init__(self):
+        self.zset = {}
+        self.queues = []
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def zadd(self, key, mapping, nx=False):
+        added = 0
+        for member, score in mapping.items():
+            if nx and member in self.zset:
+                continue
+            added += member not in self.zset
+            self.zset[member] = score
+        return added
+
+    async def zremrangebyscore(self, key, low, high):
+        expired = [m for m, s in self.zset.items() if s <= high]
+        for member in expired:
+            del self.zset[member]
+        return len(expired)
+
+    async def zrangebyscore(self, key, low, high, withscores=False):
+        return [(m, s) for m, s in self.zset.items() if s >= low]
+
+    async def publish(self, channel, message):
+        for queue in list(self.queues):
+            queue.put_nowait(message)
+
+    async def close(self):
+        pass
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.queues.append(self.queue)
+
+    async def listen(self):
+        while True:
+            message = await self.queue.get()
+            if isinstance(message, Exception):
+                raise message
+            yield {"type": "message", "data": message}
+
+    async def aclose(self):
+        if self.queue in self.redis.queues:
+            self.redis.queues.remove(self.queue)
+
+
+def make_registry():
+    return RevocationRegistry(RevocationFilter(1000, 0.01), redis_url="", sync_enabled=True)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_filter_has_no_false_negatives():
+    revocation_filter = RevocationFilter(capacity=5000, error_rate=0.01)
+    expires_at = time.time() + 3600
+    revoked = [uuid.uuid4().hex for _ in range(5000)] + ["not-hex-jti", "另一个"]
+    for jti in revoked:
+        revocation_filter.add(jti, expires_at)
+
+    assert all(revocation_filter.is_revoked(jti) for jti in revoked)
+    # 布隆过滤器误判由精确集合排除
+    assert not any(revocation_filter.is_revoked(uuid.uuid4().hex) for _ in range(5000))
+
+
+def test_prune_rebuilds_filter_without_losing_live_entries():
+    revocation_filter = RevocationFilter(capacity=100, error_rate=0.01)
+    now = time.time()
+    live = [uuid.uuid4().hex for _ in range(50)]
+    expired = [uuid.uuid4().hex for _ in range(50)]
+    for jti in live:
+        revocation_filter.add(jti, now + 3600)
+    for jti in expired:
+        revocation_filter.add(jti, now - 1)
+
+    assert revocation_filter.prune(now) == 50
+    assert all(revocation_filter.is_revoked(jti) for jti in live)
+    assert not any(revocation_filter.is_revoked(jti) for jti in expired)
+
+
+@pytest.mark.anyio
+async def test_claim_rejects_replay_across_workers():
+    redis = FakeRedis()
+    first, second = make_registry(), make_registry()
+    await first.start(redis)
+    await second.start(redis)
+    try:
+        jti, expires_at = uuid.uuid4().hex, time.time() + 60
+        assert await first.claim(jti, expires_at)
+        # 其他 worker 尚未收到广播时，ZADD NX 也会拒绝第二次使用
+        second.filter = RevocationFilter(1000, 0.01)
+        assert not await second.claim(jti, expires_at)
+        assert not await first.claim(jti, expires_at)
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+@pytest.mark.anyio
+async def test_listener_reconnects_and_resyncs(monkeypatch):
+    monkeypatch.setattr(revocation, "RECONNECT_DELAY_SECONDS", 0)
+    redis = FakeRedis()
+    registry = make_registry()
+    await registry.start(redis)
+    await settle()
+    try:
+        assert registry.get_stats()["synced"]
+        redis.queues[0].put_nowait(ConnectionError("lost"))
+        # 断开期间其他 worker 的吊销只写入了有序集合，广播没有送达
+        missed = uuid.uuid4().hex
+        await redis.zadd(RevocationRegistry.KEY, {missed: time.time() + 60})
+        await settle()
+
+        stats = registry.get_stats()
+        assert stats["reconnects"] == 1
+        assert stats["syncs"] == 2
+        assert stats["synced"]
+        assert registry.is_revoked(missed)
+
+        broadcast = uuid.uuid4().hex
+        await redis.publish(RevocationRegistry.CHANNEL, f"{broadcast}:{time.time() + 60}")
+        await settle()
+        assert registry.is_revoked(broadcast)
+    finally:
+        await registry.stop()
+
+
+def test_refresh_token_rotates_and_rejects_reuse():
+    from main import app
+    from app.core.security import create_refresh_token
+
+    client = TestClient(app)
+    token = create_refresh_token({"sub": "adminuser", "user_id": 3, "role": "admin"})
+
+    first = client.post("/v1/api/auth/refresh", json={"refresh_token": token})
+    assert first.status_code == 200
+    rotated = first.json()["refresh_token"]
+    assert rotated != token
+
+    assert client.post("/v1/api/auth/refresh", json={"refresh_token": token}).status_code == 401
+    assert client.post("/v1/api/auth/refresh", json={"refresh_token": rotated}).status_code == 200
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from app.services.settings_store import UserSettingsStore
+
+DEFAULTS = {"theme": "dark", "voice_settings": {"rate": 1.0, "volume": 1.0}}
+
+
+def make_store(path):
+    return UserSettingsStore(DEFAULTS, str(path), flush_interval_ms=0, reload_interval_ms=0)
+
+
+def test_update_merges_patch_and_returns_copies(tmp_path):
+    store = make_store(tmp_path)
+    updated = store.update(1, {"voice_settings": {"volume": 0.5}, "theme": None})
+
+    assert updated == {"voice_settings": {"rate": 1.0, "volume": 0.5}}
+    updated["voice_settings"]["rate"] = 9
+    assert store.get(1)["voice_settings"]["rate"] == 1.0
+    assert store.get(2) == DEFAULTS
+
+
+@pytest.mark.anyio
+async def test_flush_failure_keeps_users_dirty(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.update(1, {"theme": "light"})
+
+    def fail(pending):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_all", fail)
+    assert await store.flush() is False
+    stats = store.get_stats()
+    assert stats["dirty"] == 1
+    assert stats["flush_failures"] == 1
+    assert stats["last_error"] == "disk full"
+
+    monkeypatch.undo()
+    assert await store.flush() is True
+    assert store.get_stats()["dirty"] == 0
+    assert store.get_stats()["last_error"] is None
+    with open(os.path.join(tmp_path, "1.json"), encoding="utf-8") as f:
+        assert json.load(f)["theme"] == "light"
+
+
+@pytest.mark.anyio
+async def test_reload_changed_picks_up_other_workers(tmp_path):
+    store = make_store(tmp_path)
+    other = make_store(tmp_path)
+    assert store.get(1)["theme"] == "dark"
+
+    other.update(1, {"theme": "light"})
+    await other.flush()
+    # 读取只访问内存，外部写入要等后台检查
+    assert store.get(1)["theme"] == "dark"
+    assert await store.reload_changed() == 1
+    assert store.get(1)["theme"] == "light"
+    assert await store.reload_changed() == 0
+
+
+@pytest.mark.anyio
+async def test_reload_skips_users_with_pending_updates(tmp_path):
+    store = make_store(tmp_path)
+    other = make_store(tmp_path)
+    other.update(1, {"theme": "light"})
+    await other.flush()
+
+    store.update(1, {"theme": "blue"})
+    assert await store.reload_changed() == 0
+    assert store.get(1)["theme"] == "blue"
+
+
+def test_get_does_not_touch_disk_after_first_load(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.get(1)
+
+    def fail(path):
+        raise AssertionError("hot path stat")
+
+    monkeypatch.setattr(os, "stat", fail)
+    assert store.get(1) == DEFAULTS
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.spending import SpendingAggregates, check_range, resolve_period, split_range
+
+
+def test_split_range_uses_whole_months_in_the_middle():
+    buckets = list(split_range(date(2025, 1, 30), date(2025, 4, 2)))
+    assert buckets == [
+        ("day", date(2025, 1, 30)), ("day", date(2025, 1, 31)),
+        ("month", (2025, 2)), ("month", (2025, 3)),
+        ("day", date(2025, 4, 1)),
+    ]
+
+
+def test_split_range_handles_last_representable_month():
+    buckets = list(split_range(date(9999, 12, 1), date.max))
+    assert len(buckets) == 30 and all(kind == "day" for kind, _ in buckets)
+
+
+def test_resolve_period_last_month_across_year():
+    assert resolve_period("last_month", today=date(2025, 1, 15)) == (date(2024, 12, 1), date(2025, 1, 1))
+
+
+@pytest.mark.parametrize("start,end", [
+    (date(2025, 2, 1), date(2025, 1, 1)),
+    (date(1999, 12, 31), date(2000, 2, 1)),
+    (date(2099, 12, 1), date(9999, 12, 31)),
+    (date(2000, 1, 1), date(2099, 1, 1)),
+])
+def test_check_range_rejects_invalid_ranges(start, end):
+    with pytest.raises(ValueError):
+        check_range(start, end, max_days=3660)
+
+
+def test_summarize_counts_day_and_month_buckets():
+    aggregates = SpendingAggregates()
+    aggregates.record(1, "Alice", "sol", 1.5, timestamp=datetime(2025, 1, 31))
+    aggregates.record(1, "alice ", "SOL", 2.0, timestamp=datetime(2025, 2, 15))
+    aggregates.record(2, "Alice", "SOL", 9.0, timestamp=datetime(2025, 2, 15))
+
+    summary = aggregates.summarize(1, date(2025, 1, 31), date(2025, 3, 1))
+    assert summary["groups"] == [{"counterparty": "Alice", "currency": "SOL", "total": 3.5, "count": 2}]
+
+
+@pytest.fixture
+def client():
+    from main import app
+    from app.core.security import create_access_token
+
+    client = TestClient(app)
+    client.headers["Authorization"] = "Bearer " + create_access_token({"sub": "u", "user_id": 99})
+    return client
+
+
+@pytest.mark.parametrize("params", [
+    {"start": "9999-12-01", "end": "9999-12-31"},
+    {"start": "2000-01-01", "end": "2099-01-01"},
+    {"start": "2025-01-01"},
+    {"start": "2025-02-01", "end": "2025-01-01"},
+])
+def test_summary_rejects_bad_ranges_with_400(client, params):
+    assert client.get("/v1/api/blockchain/spending/summary", params=params).status_code == 400
+
+
+def test_summary_accepts_custom_range(client):
+    response = client.get("/v1/api/blockchain/spending/summary", params={"start": "2025-01-01", "end": "2025-02-01"})
+    assert response.status_code == 200
+    assert response.json()["start"] == "2025-01-01"
@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.tool_registry import ToolRegistry
+
+BUILTIN = [{"id": "builtin_tool", "name": "内置", "description": "内置工具", "category": "utility",
+            "parameters": {"type": "object", "properties": {}}}]
+
+
+def make_tool(tool_id):
+    return {"id": tool_id, "name": tool_id, "description": "自定义", "category": "custom",
+            "parameters": {"type": "object", "properties": {}}}
+
+
+def make_registry(tmp_path):
+    return ToolRegistry(BUILTIN, path=str(tmp_path / "tools.json"), poll_interval=60)
+
+
+@pytest.mark.anyio
+async def test_commit_does_not_replace_newer_snapshot_loaded_meanwhile(tmp_path, monkeypatch):
+    registry = make_registry(tmp_path)
+    other = make_registry(tmp_path)
+    commit = registry._commit
+
+    def commit_then_other_worker_writes(mutate):
+        snapshot = commit(mutate)
+        # 本进程落盘后、替换快照前，其他工作进程写入更新版本并被轮询加载
+        other.reload()
+        other._commit(lambda tools: tools.append(make_tool("other_tool")))
+        registry.reload()
+        return snapshot
+
+    monkeypatch.setattr(registry, "_commit", commit_then_other_worker_writes)
+    committed = await registry.create(make_tool("local_tool"))
+
+    assert committed.version == 1
+    assert registry.snapshot.version == 2
+    assert registry.snapshot.get("local_tool") is not None
+    assert registry.snapshot.get("other_tool") is not None
+
+
+@pytest.mark.anyio
+async def test_builtin_tools_cannot_be_modified(tmp_path):
+    registry = make_registry(tmp_path)
+    with pytest.raises(PermissionError):
+        await registry.delete("builtin_tool")
+    with pytest.raises(ValueError):
+        await registry.create(make_tool("builtin_tool"))
+
+
+@pytest.mark.anyio
+async def test_snapshots_are_isolated_from_callers(tmp_path):
+    registry = make_registry(tmp_path)
+    tool = make_tool("local_tool")
+    await registry.create(tool)
+    tool["name"] = "changed"
+
+    assert registry.snapshot.get("local_tool")["name"] == "local_tool"
+    reloaded = make_registry(tmp_path)
+    assert reloaded.reload()
+    assert [t["id"] for t in reloaded.snapshot.tools] == ["builtin_tool", "local_tool"]
@@ -0,0 +1,60 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.schemas import VoiceSettings
+from app.services.tts import StubSynthesizer, TTSCache
+
+
+def make_cache(tmp_path, **kwargs) -> TTSCache:
+    options = {"max_bytes": 10 * 1024 * 1024, "max_open_maps": 2, **kwargs}
+    return TTSCache(str(tmp_path), synthesizer=StubSynthesizer(), **options)
+
+
+@pytest.mark.anyio
+async def test_repeated_requests_hit_cache(tmp_path):
+    cache = make_cache(tmp_path)
+    first = await cache.get_or_synthesize("你好", 1.0, 1.0, 1.0)
+    second = await cache.get_or_synthesize("你好", 1.0, 1.0, 1.0)
+
+    assert not first["cached"] and second["cached"]
+    assert bytes(first["audio"]) == bytes(second["audio"])
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.anyio
+async def test_open_maps_are_bounded(tmp_path):
+    cache = make_cache(tmp_path)
+    keys = []
+    for text in ["一", "二", "三", "四", "五"]:
+        keys.append((await cache.get_or_synthesize(text, 1.0, 1.0, 1.0))["key"])
+
+    assert cache.stats()["entries"] == 5
+    assert cache.stats()["open_maps"] == 2
+    assert list(cache._maps) == keys[-2:]
+
+    # 被释放映射的条目仍可从磁盘重新映射
+    assert cache.lookup(keys[0]) is not None
+    assert list(cache._maps) == [keys[-1], keys[0]]
+
+
+@pytest.mark.anyio
+async def test_evicted_entries_release_maps_and_files(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=1)
+    first = (await cache.get_or_synthesize("一", 1.0, 1.0, 1.0))["key"]
+    await cache.get_or_synthesize("二", 1.0, 1.0, 1.0)
+
+    assert first not in cache._maps
+    assert not (tmp_path / f"{first}.wav").exists()
+
+
+@pytest.mark.parametrize("field,value", [
+    ("rate", 0.1), ("rate", 3.0), ("pitch", 0.0), ("pitch", 2.5), ("volume", -0.1), ("volume", 1.5),
+])
+def test_voice_settings_reject_out_of_range(field, value):
+    with pytest.raises(ValidationError):
+        VoiceSettings(**{field: value})
+
+
+def test_voice_settings_accept_bounds():
+    assert VoiceSettings(rate=0.5, pitch=2.0, volume=0.0).volume == 0.0
+    assert VoiceSettings().rate is None
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.services import rpc_stub
+from app.services.solana_rpc import RPCError
+from app.services.tx_prefetch import BlockhashPrefetcher
+
+
+def make_prefetcher(rpc) -> BlockhashPrefetcher:
+    return BlockhashPrefetcher(rpc, refresh_interval=10, max_age=45, fee_percentile=75)
+
+
+@pytest.mark.anyio
+async def test_acquire_fetches_on_demand_when_not_started(rpc):
+    prefetcher = make_prefetcher(rpc)
+    assert not prefetcher.running
+
+    first = await prefetcher.acquire()
+    second = await prefetcher.acquire()
+
+    assert first is not None and first.blockhash
+    assert second is first
+    assert prefetcher.stats["misses"] == 1
+    assert prefetcher.stats["hits"] == 1
+
+
+@pytest.mark.anyio
+async def test_acquire_raises_when_rpc_fails(rpc, monkeypatch):
+    monkeypatch.delitem(rpc_stub.METHODS, "getLatestBlockhash")
+    prefetcher = make_prefetcher(rpc)
+
+    with pytest.raises(RPCError):
+        await prefetcher.acquire()
+    assert prefetcher.stats["fetch_errors"] == 1
+
+
+@pytest.mark.anyio
+async def test_acquire_skips_network_when_on_demand_disabled(rpc, monkeypatch):
+    prefetcher = BlockhashPrefetcher(rpc, refresh_interval=10, max_age=45, fee_percentile=75,
+                                     fetch_on_demand=False)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("unexpected RPC call")
+
+    monkeypatch.setattr(rpc, "batch", fail)
+    assert await prefetcher.acquire() is None
+    assert prefetcher.stats["unavailable"] == 1
+    assert prefetcher.stats["misses"] == 0
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_share_one_fetch(rpc, monkeypatch):
+    prefetcher = make_prefetcher(rpc)
+    batch = rpc.batch
+    calls = []
+
+    async def counted(requests):
+        calls.append(requests)
+        await asyncio.sleep(0.01)
+        return await batch(requests)
+
+    monkeypatch.setattr(rpc, "batch", counted)
+    contexts = await asyncio.gather(*(prefetcher.acquire() for _ in range(5)))
+
+    assert len(calls) == 1
+    assert all(context is contexts[0] for context in contexts)
+    assert prefetcher.stats["misses"] == 5
+    assert prefetcher.stats["coalesced"] == 4
+
+
+@pytest.mark.anyio
+async def test_running_is_false_after_task_dies(rpc, monkeypatch):
+    prefetcher = make_prefetcher(rpc)
+
+    async def crash() -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(prefetcher, "_run", crash)
+    prefetcher.start()
+    await asyncio.sleep(0)
+    assert not prefetcher.running
+    assert not prefetcher.get_stats()["running"]
+
+    # 任务退出后可以重新启动
+    monkeypatch.delattr(prefetcher, "_run")
+    prefetcher.start()
+    assert prefetcher.running
+    await prefetcher.stop()
+    assert not prefetcher.running
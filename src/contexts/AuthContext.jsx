@@ -106,6 +106,9 @@ export function AuthProvider({ children }) {
       
       // 保存认证信息到 localStorage
       localStorage.setItem('auth_token', response.access_token);
+      if (response.refresh_token) {
+        localStorage.setItem('refresh_token', response.refresh_token);
+      }
       localStorage.setItem('user_id', response.user_id);
       localStorage.setItem('username', response.username);
       localStorage.setItem('user_role', response.role);
@@ -137,9 +140,13 @@ export function AuthProvider({ children }) {
   // 刷新令牌方法
   const refreshUserToken = async () => {
     try {
-      const response = await refreshToken();
+      const response = await refreshToken(localStorage.getItem('refresh_token'));
       
       localStorage.setItem('auth_token', response.access_token);
+      // 刷新令牌每次使用后轮换，旧的已失效
+      if (response.refresh_token) {
+        localStorage.setItem('refresh_token', response.refresh_token);
+      }
       
       dispatch({
         type: ActionTypes.REFRESH_TOKEN,
@@ -156,6 +163,7 @@ export function AuthProvider({ children }) {
   // 登出方法
   const logoutUser = () => {
     localStorage.removeItem('auth_token');
+    localStorage.removeItem('refresh_token');
     localStorage.removeItem('user_id');
     localStorage.removeItem('username');
     localStorage.removeItem('user_role');
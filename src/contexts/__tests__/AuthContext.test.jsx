@@ -232,6 +232,7 @@ describe('AuthContext', () => {
 
       // 验证 localStorage 清理
       expect(localStorageMock.removeItem).toHaveBeenCalledWith('auth_token');
+      expect(localStorageMock.removeItem).toHaveBeenCalledWith('refresh_token');
       expect(localStorageMock.removeItem).toHaveBeenCalledWith('user_id');
       expect(localStorageMock.removeItem).toHaveBeenCalledWith('username');
       expect(localStorageMock.removeItem).toHaveBeenCalledWith('user_role');
@@ -242,6 +243,7 @@ describe('AuthContext', () => {
     it('should refresh token successfully', async () => {
       const mockResponse = {
         access_token: 'new-refreshed-token',
+        refresh_token: 'new-refresh-token',
         token_type: 'bearer'
       };
 
@@ -252,6 +254,8 @@ describe('AuthContext', () => {
         switch (key) {
           case 'auth_token':
             return 'old-token';
+          case 'refresh_token':
+            return 'old-refresh-token';
           case 'user_id':
             return '123';
           case 'username':
@@ -269,7 +273,9 @@ describe('AuthContext', () => {
         await result.current.refreshUserToken();
       });
 
+      expect(apiClient.refreshToken).toHaveBeenCalledWith('old-refresh-token');
       expect(localStorageMock.setItem).toHaveBeenCalledWith('auth_token', 'new-refreshed-token');
+      expect(localStorageMock.setItem).toHaveBeenCalledWith('refresh_token', 'new-refresh-token');
       expect(result.current.isAuthenticated).toBe(true);
     });
 
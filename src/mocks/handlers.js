@@ -114,6 +114,7 @@ export const handlers = [
       ctx.status(200),
       ctx.json({
         access_token: token,
+        refresh_token: `mock_refresh_${user.id}_${Date.now()}`,
         token_type: 'bearer',
         user_id: user.id,
         username: user.username,
@@ -124,22 +125,23 @@ export const handlers = [
 
   // 刷新令牌
   rest.post('/v1/api/auth/refresh', (req, res, ctx) => {
-    const authHeader = req.headers.get('Authorization');
+    const refreshToken = req.body && req.body.refresh_token;
     
-    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+    if (!refreshToken) {
       return res(
         ctx.status(401),
-        ctx.json({ message: '无效的认证令牌' })
+        ctx.json({ message: '缺少刷新令牌' })
       );
     }
     
-    // 生成新token
+    // 生成新token，刷新令牌同时轮换
     const newToken = `mock_token_refresh_${Date.now()}`;
     
     return res(
       ctx.status(200),
       ctx.json({
         access_token: newToken,
+        refresh_token: `mock_refresh_${Date.now()}`,
         token_type: 'bearer'
       })
     );
@@ -155,9 +155,9 @@ class ApiClient {
     return this.post('/v1/api/auth/register', userData);
   }
 
-  // 刷新令牌
-  async refreshToken() {
-    return this.post('/v1/api/auth/refresh');
+  // 刷新令牌（刷新令牌一次性使用，响应中会返回轮换后的新刷新令牌）
+  async refreshToken(refreshToken = localStorage.getItem('refresh_token')) {
+    return this.post('/v1/api/auth/refresh', { refresh_token: refreshToken });
   }
 
   // 意图解析
@@ -208,7 +208,7 @@ const apiClient = new ApiClient();
 // 导出具体的API方法，便于使用
 export const login = (username, password) => apiClient.login(username, password);
 export const register = (userData) => apiClient.register(userData);
-export const refreshToken = () => apiClient.refreshToken();
+export const refreshToken = (token) => apiClient.refreshToken(token);
 export const interpret = (data) => apiClient.interpret(data);
 export const execute = (data) => apiClient.execute(data);
 export const getTools = () => apiClient.getTools();